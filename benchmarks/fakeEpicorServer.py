@@ -0,0 +1,404 @@
+# fakeEpicorServer.py
+
+import os
+import json
+import time
+import base64
+import socket
+import random
+import argparse
+import threading
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIRST_CASE_NUM = 10000
+FIRST_QUOTE_NUM = 50000
+
+_API_PREFIXES = ('/api/v2/efx/100/', '/api/v2/odata/100/')
+
+
+def fixture_file_name(endpoint: str, case_number: Optional[int] = None) -> str:
+    """
+    File a recorded response is kept in, e.g. 'CaseDev.GetCaseStatus.json' or 'CaseDev.GetCaseStatus.10001.json'.
+    """
+    name = endpoint.replace('/', '.')
+    if case_number is not None:
+        name += f'.{case_number}'
+    return name + '.json'
+
+
+class FakeEpicor:
+    """
+    In-memory stand-in for the Epicor functions and services the app calls. Responses are generated from a seed, or
+    replayed from recorded fixtures when one exists for the endpoint (and case).
+    """
+
+    def __init__(self, case_count: int = 200, attachments_per_case: int = 3, attachment_bytes: int = 256 * 1024,
+                 latency: float = 0.0, jitter: float = 0.0, endpoint_latency: Optional[Dict[str, float]] = None,
+                 fixtures_dir: Optional[str] = DEFAULT_FIXTURES_DIR, seed: int = 1):
+        """
+        :param case_count: Rows in the CaseTasks BAQ
+        :param attachments_per_case: Attachments listed for every case
+        :param attachment_bytes: Size of every attachment once decoded
+        :param latency: Seconds added before every response
+        :param jitter: Up to this many extra seconds, at random, on top of latency
+        :param endpoint_latency: Latency overrides by endpoint name, e.g. {'BaqSvc/CaseTasks/Data': 1.5}
+        :param fixtures_dir: Folder of recorded responses. None to always generate.
+        :param seed: Seed for generated data and jitter
+        """
+        self.case_count = case_count
+        self.attachments_per_case = attachments_per_case
+        self.latency = latency
+        self.jitter = jitter
+        self.endpoint_latency = endpoint_latency or {}
+        self.fixtures_dir = fixtures_dir
+        self.random = random.Random(seed)
+        self.case_numbers = list(range(FIRST_CASE_NUM, FIRST_CASE_NUM + case_count))
+
+        self._lock = threading.Lock()
+        self._next_quote_num = FIRST_QUOTE_NUM
+        self.request_counts: Dict[str, int] = {}
+        self.bytes_uploaded = 0
+
+        # Every attachment has the same content. Encoded once so serving it costs no more than the real thing.
+        self.attachment_base64 = base64.b64encode(self.random.randbytes(attachment_bytes)).decode()
+
+        self.routes = {
+            'CaseDev/GetCaseStatus': self.get_case_status,
+            'CaseDev/GetCaseComponents': self.get_case_components,
+            'CaseDev/GetCaseAttachment': self.get_case_attachment,
+            'CaseDev/AddDesignComponents': self.ok,
+            'CaseDev/UpdateCaseDesign': self.ok,
+            'CaseDev/CompleteTask': self.complete_task,
+            'CaseDev/AssignCurrentTask': self.ok,
+            'CaseDev/AddCaseComment': self.ok,
+            'CaseDev/UpdatePartandPrice': self.ok,
+            'CaseTools/UploadCaseAttachment': self.upload_case_attachment,
+            'QuoteUpdater/CreateQuoteForCase': self.create_quote_for_case,
+            'QuoteUpdater/UpdateQuote': self.ok,
+            'CaseQuoteAutomation/QuoteQuote': self.ok,
+            'CaseQuoteAutomation/GenerateAndAttachQuote': self.ok,
+            'Erp.BO.HelpDeskSvc/GetByID': self.get_by_id,
+            'Ice.BO.AttachmentSvc/DownloadFile': self.download_file,
+            'BaqSvc/CaseTasks/Data': self.case_tasks,
+        }
+
+    def delay_for(self, endpoint: str) -> float:
+        with self._lock:
+            jitter = self.random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.endpoint_latency.get(endpoint, self.latency) + jitter
+
+    def handle(self, method: str, endpoint: str, params: Dict[str, str], body: Dict) -> Tuple[int, Any]:
+        """
+        :return: (status code, response body). Bodies that are str are sent as-is.
+        """
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+        route = self.routes.get(endpoint)
+        if route is None:
+            return 404, {'Error': True, 'Message': f'Unknown endpoint: {endpoint}'}
+
+        case_number = body.get('CaseNum') or body.get('hdCaseNum') or params.get('hdCaseNum')
+        fixture = self.load_fixture(endpoint, int(case_number) if case_number else None)
+        if fixture is not None:
+            if isinstance(fixture, dict) and isinstance(fixture.get('value'), list):
+                # A recorded OData collection, e.g. CaseTasks. Answer the query like the generated data would.
+                return 200, dict(fixture, value=self.query_rows(fixture['value'], params))
+            return 200, fixture
+
+        return route(method, params, body)
+
+    def handle_batch(self, content_type: str, raw_body: bytes) -> Tuple[int, str, str]:
+        """
+        Answer an OData multipart/mixed $batch by running each part through handle().
+        :return: (status code, multipart body, content type)
+        """
+        with self._lock:
+            self.request_counts['$batch'] = self.request_counts.get('$batch', 0) + 1
+
+        boundary = content_type.split('boundary=', 1)[1].strip('"')
+        response_boundary = f'batchresponse_{boundary}'
+        lines = []
+        for part in raw_body.decode().split(f'--{boundary}')[1:]:
+            if part.startswith('--'):
+                break
+            # MIME headers, then the HTTP request: request line, headers, body
+            http_request = part.lstrip('\r\n').split('\r\n\r\n', 1)[1]
+            request_head, _, request_body = http_request.partition('\r\n\r\n')
+            method, target = request_head.split('\r\n', 1)[0].split(' ')[:2]
+            url = urlparse(target)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            endpoint = url.path
+            for prefix in _API_PREFIXES:
+                if prefix in endpoint:
+                    endpoint = endpoint.split(prefix, 1)[1]
+                    break
+
+            request_body = request_body.strip()
+            status, response = self.handle(method, endpoint, params, json.loads(request_body) if request_body else {})
+            payload = response if isinstance(response, str) else json.dumps(response)
+            lines += [f'--{response_boundary}', 'Content-Type: application/http', 'Content-Transfer-Encoding: binary',
+                      '', f'HTTP/1.1 {status} {"OK" if status < 400 else "Error"}',
+                      'Content-Type: application/json; charset=utf-8', '', payload]
+        lines += [f'--{response_boundary}--', '']
+        return 200, '\r\n'.join(lines), f'multipart/mixed; boundary={response_boundary}'
+
+    def load_fixture(self, endpoint: str, case_number: Optional[int]) -> Optional[Any]:
+        if not self.fixtures_dir:
+            return None
+        for name in (fixture_file_name(endpoint, case_number), fixture_file_name(endpoint)):
+            path = os.path.join(self.fixtures_dir, name)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        return None
+
+    @staticmethod
+    def ok(method: str, params: Dict, body: Dict):
+        return 200, {'Error': False, 'Message': 'OK'}
+
+    def is_known_case(self, case_number) -> bool:
+        try:
+            return FIRST_CASE_NUM <= int(case_number) < FIRST_CASE_NUM + self.case_count
+        except (TypeError, ValueError):
+            return False
+
+    def get_case_status(self, method: str, params: Dict, body: Dict):
+        case_number = body.get('CaseNum')
+        if not self.is_known_case(case_number):
+            return 200, {'Error': True, 'Message': 'Record not found'}
+        return 200, {
+            'Error': False,
+            'CaseNum': case_number,
+            'CaseOwner': 'Jane Doe',
+            'CurrentTask': 'Design',
+            'CaseDescription': f'Case {case_number} description\nSecond line',
+            'Qty': 1.0,
+            'UnitPrice': 150.0,
+            'DesignNeed': 'Need text ' * 20,
+            'DesignProblem': 'Problem text ' * 20,
+            'DesignSolution': 'Solution text ' * 20,
+        }
+
+    def get_case_components(self, method: str, params: Dict, body: Dict):
+        components = [{'ComponentName': f'Component {i}', 'ComponentType': 'BPM',
+                       'ComponentPurpose': 'Purpose text ' * 5} for i in range(5)]
+        return 200, {'Error': False, 'CaseComponents': {'DesignComponents': components}}
+
+    def attachments_for(self, case_number: int) -> List[Dict]:
+        return [{'XFileRefNum': case_number * 100 + i, 'FileName': f'{case_number}-file{i}.pdf',
+                 'DocTypeID': 'SupDoc'} for i in range(self.attachments_per_case)]
+
+    def get_by_id(self, method: str, params: Dict, body: Dict):
+        case_number = params.get('hdCaseNum') or body.get('hdCaseNum')
+        if not self.is_known_case(case_number):
+            return 400, {'ErrorMessage': 'Record not found'}
+        case_number = int(case_number)
+        attachments = self.attachments_for(case_number)
+        if method == 'GET':
+            return 200, {'returnObj': {'HDCase': [{'HDCaseNum': case_number}], 'HDCaseAttch': attachments}}
+        # get_case_attachment_list reads the dataset from the top level
+        return 200, {'HDCase': [{'HDCaseNum': case_number}], 'HDCaseAttch': attachments}
+
+    def get_case_attachment(self, method: str, params: Dict, body: Dict):
+        return 200, '{"FileExtension": "pdf", "Attachment": "' + self.attachment_base64 + '"}'
+
+    def download_file(self, method: str, params: Dict, body: Dict):
+        return 200, '{"returnObj": "' + self.attachment_base64 + '"}'
+
+    def upload_case_attachment(self, method: str, params: Dict, body: Dict):
+        files = body.get('Attachments', {}).get('Files', [])
+        with self._lock:
+            self.bytes_uploaded += sum(len(file.get('FileBytes', '')) * 3 // 4 for file in files)
+        return 200, {'Error': False, 'Message': f'{len(files)} files uploaded'}
+
+    def complete_task(self, method: str, params: Dict, body: Dict):
+        return 200, {'Error': False, 'Message': 'task update complete', 'HasActiveTask': True}
+
+    def create_quote_for_case(self, method: str, params: Dict, body: Dict):
+        with self._lock:
+            quote_number = self._next_quote_num
+            self._next_quote_num += 1
+        return 200, {'Error': False, 'NewQuoteNum': quote_number}
+
+    def case_task_row(self, index: int, case_number: int) -> Dict:
+        return {
+            'HDCase_HDCaseNum': case_number,
+            'SalesRep_Name': f'Rep {index % 7}',
+            'SalesRep1_Name': f'Developer {index % 5}',
+            'Customer_Name': f'Customer {index % 40}',
+            'Project_ProjectID': f'PRJ{index % 90:04d}',
+            'HDCase_Description': f'Case {case_number} description',
+            'Task_TaskDescription': ['Quote', 'Design', 'Development', 'Testing'][index % 4],
+            'Task_StartDate': '2024-01-01T00:00:00',
+            'Task_DueDate': '2024-02-01T00:00:00',
+            'Task_StatusCode': 'Open',
+            'HDCase_TaskSetID': 'DEV',
+            'HDCase_Quantity': float(index % 20),
+            'ProjPhase_TotEstLbrHrs': float(index % 30),
+            'ProjPhase_TotActLbrHrs': float(index % 25),
+            'Calculated_LaborHours': float(index % 25),
+            'HDCase_EstimatedHrs_c': float(index % 30),
+            'Calculated_RemainingHours': float(index % 10),
+            'Calculated_DaysSinceLastComment': index % 60,
+            'HDCase_RequestDate_c': '2024-01-01T00:00:00',
+            'HDCase_DevStartDate_c': '2024-01-15T00:00:00',
+            'HDCase_DeliveryDate_c': '2024-03-01T00:00:00',
+            'Calculated_SchedHoursRemaining': float(index % 15),
+            'Calculated_DaysTillDueDate': index % 45 - 10,
+            'Task_TaskSeqNum': index + 1,
+            'RowIdent': f'row-{index}',
+        }
+
+    def case_tasks(self, method: str, params: Dict, body: Dict):
+        rows = [self.case_task_row(i, case_number) for i, case_number in enumerate(self.case_numbers)]
+        return 200, {'value': self.query_rows(rows, params)}
+
+    @staticmethod
+    def query_rows(rows: List[Dict], params: Dict) -> List[Dict]:
+        """
+        Apply the request's $filter, $orderby, $skip, $top and $select to a collection's rows.
+        """
+        # Just enough OData for the queries the app sends: 'Field eq value' filters and an ascending or descending
+        # $orderby on one or more columns
+        if '$filter' in params:
+            field, _, value = params['$filter'].split(' ', 2)
+            value = value.strip("'").replace("''", "'")
+            rows = [row for row in rows if str(row.get(field)) == value]
+        if '$orderby' in params:
+            # Sort by the last column first, so the earlier ones win
+            for clause in reversed(params['$orderby'].split(',')):
+                field, _, direction = clause.strip().partition(' ')
+                rows.sort(key=lambda row: (row.get(field) is None, row.get(field) if row.get(field) is not None else ''),
+                          reverse=direction.lower() == 'desc')
+        skip = int(params.get('$skip', 0))
+        top = int(params['$top']) if '$top' in params else None
+        rows = rows[skip:skip + top if top is not None else None]
+        if '$select' in params:
+            columns = params['$select'].split(',')
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return rows
+
+
+class FakeEpicorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like Epicor's IIS
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes. Without this, delayed ACKs add ~40ms to every call.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_api('GET')
+
+    def do_POST(self):
+        self.handle_api('POST')
+
+    def handle_api(self, method: str):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+
+        endpoint = url.path
+        for prefix in _API_PREFIXES:
+            if prefix in endpoint:
+                endpoint = endpoint.split(prefix, 1)[1]
+                break
+
+        fake: FakeEpicor = self.server.fake
+        content_type = 'application/json; charset=utf-8'
+        try:
+            if endpoint == '$batch':
+                status, response, content_type = fake.handle_batch(self.headers.get('Content-Type', ''), raw_body)
+            else:
+                body = json.loads(raw_body) if raw_body else {}
+                status, response = fake.handle(method, endpoint, params, body)
+        except Exception as e:
+            status, response = 500, {'Error': True, 'Message': str(e)}
+
+        delay = fake.delay_for(endpoint)
+        if delay:
+            time.sleep(delay)
+
+        payload = (response if isinstance(response, str) else json.dumps(response)).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeEpicorServer:
+    """
+    Runs a FakeEpicor on a local port in a background thread. Point BASE_URL at base_url to use it.
+    Can be used as a context manager.
+    """
+
+    def __init__(self, fake: Optional[FakeEpicor] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        :param fake: The fake to serve. A default FakeEpicor if omitted.
+        :param host: Interface to listen on
+        :param port: Port to listen on. 0 picks a free one.
+        """
+        self.fake = fake or FakeEpicor()
+        self.httpd = ThreadingHTTPServer((host, port), FakeEpicorHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self.fake
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeEpicorServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-epicor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'FakeEpicorServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Serve a stand-in for the Epicor endpoints Case Tools uses.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cases', type=int, default=200, help='Rows in the CaseTasks BAQ')
+    parser.add_argument('--attachments', type=int, default=3, help='Attachments per case')
+    parser.add_argument('--attachment-kb', type=int, default=256, help='Size of every attachment')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added before every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra seconds on top of --latency')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_DIR, help='Folder of recorded responses')
+    return parser.parse_args(argv)
+
+
+def fake_from_args(args: argparse.Namespace) -> FakeEpicor:
+    return FakeEpicor(case_count=args.cases, attachments_per_case=args.attachments,
+                      attachment_bytes=args.attachment_kb * 1024, latency=args.latency, jitter=args.jitter,
+                      fixtures_dir=args.fixtures)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    server = FakeEpicorServer(fake_from_args(args), args.host, args.port)
+    print(f'Fake Epicor listening on {server.base_url}. Set BASE_URL to this to point the app at it.')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
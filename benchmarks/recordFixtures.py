@@ -0,0 +1,49 @@
+# recordFixtures.py
+#
+# Saves real Epicor responses for a few cases so the fake server can replay them. Uses the BASE_URL and
+# credentials in ~/.myapp.cfg. Run from the repo root:
+#     python -m benchmarks.recordFixtures 12345 12346
+
+import os
+import json
+import argparse
+
+from benchmarks.fakeEpicorServer import DEFAULT_FIXTURES_DIR, fixture_file_name
+from services.epicorService import EpicorService
+
+# Per-case endpoints recorded for every case, with the body each is called with
+CASE_ENDPOINTS = {
+    'CaseDev/GetCaseStatus': lambda case_number: {'CaseNum': case_number},
+    'CaseDev/GetCaseComponents': lambda case_number: {'CaseNum': case_number},
+}
+
+
+def save_fixture(fixtures_dir: str, endpoint: str, response_data, case_number=None) -> str:
+    path = os.path.join(fixtures_dir, fixture_file_name(endpoint, case_number))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(response_data, f, indent=2)
+    return path
+
+
+def record(case_numbers, fixtures_dir: str, case_rows: int):
+    epicor_service = EpicorService()
+    os.makedirs(fixtures_dir, exist_ok=True)
+
+    for case_number in case_numbers:
+        for endpoint, body in CASE_ENDPOINTS.items():
+            response_data = epicor_service.post_request(f"{epicor_service.EFX_PATH}/{endpoint}", body(case_number))
+            print(save_fixture(fixtures_dir, endpoint, response_data, case_number))
+
+    if case_rows:
+        rows = epicor_service.fetch_cases(top=case_rows)
+        print(save_fixture(fixtures_dir, 'BaqSvc/CaseTasks/Data', {'value': rows}))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record Epicor responses as fixtures for the fake server.')
+    parser.add_argument('case_numbers', nargs='+', type=int)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_DIR, help='Folder to save the responses in')
+    parser.add_argument('--case-rows', type=int, default=0,
+                        help='Also record this many CaseTasks rows. Replayed for every CaseTasks call.')
+    args = parser.parse_args()
+    record(args.case_numbers, args.fixtures, args.case_rows)
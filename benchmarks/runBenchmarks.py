@@ -0,0 +1,337 @@
+# runBenchmarks.py
+#
+# Measures EpicorService against the fake Epicor server. Run from the repo root:
+#     python -m benchmarks.runBenchmarks --latency 0.05 --json logs/bench.json
+# and compare two runs with --baseline.
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+
+from typing import Callable, Dict, List, Optional
+from benchmarks.fakeEpicorServer import FakeEpicor, FakeEpicorServer
+from services.metricsService import MetricsService, percentile
+from services.transportService import EpicorTransport, TokenBucket
+from services.caseCacheService import CaseCache
+from services.caseStoreService import CaseStore
+from services.attachmentCacheService import AttachmentCache
+from services.uploadManifestService import UploadManifest
+
+# Columns the Open Cases tab asks for
+CASE_LIST_COLUMNS = ["HDCase_HDCaseNum", "SalesRep_Name", "SalesRep1_Name", "Customer_Name", "HDCase_Description",
+                     "Task_TaskDescription", "Task_DueDate", "HDCase_Quantity", "Calculated_DaysTillDueDate"]
+
+
+class BenchmarkContext:
+    def __init__(self, epicor_service, fake: FakeEpicor, work_dir: str, iterations: int, upload_bytes: int):
+        self.epicor_service = epicor_service
+        self.fake = fake
+        self.work_dir = work_dir
+        self.iterations = iterations
+        self.upload_bytes = upload_bytes
+
+    def case_number(self, i: int) -> int:
+        return self.fake.case_numbers[i % len(self.fake.case_numbers)]
+
+
+def timed(fn: Callable, *args, **kwargs) -> float:
+    started_at = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - started_at
+
+
+def bench_case_list(ctx: BenchmarkContext) -> List[float]:
+    """
+    Open Cases refresh: one CaseTasks BAQ call.
+    """
+    return [timed(ctx.epicor_service.fetch_cases, select=CASE_LIST_COLUMNS) for _ in range(ctx.iterations)]
+
+
+def bench_case_load(ctx: BenchmarkContext) -> List[float]:
+    """
+    Selecting a case: case info, design components and attachment list.
+    """
+    def load(case_number: int):
+        ctx.epicor_service.get_case_info(case_number)
+        ctx.epicor_service.get_design_components(case_number)
+        ctx.epicor_service.get_case_by_id(case_number)
+
+    return [timed(load, ctx.case_number(i)) for i in range(ctx.iterations)]
+
+
+def bench_case_load_batched(ctx: BenchmarkContext) -> List[float]:
+    """
+    Selecting a case with the same three reads sent as one $batch.
+    """
+    return [timed(ctx.epicor_service.load_case, ctx.case_number(i)) for i in range(ctx.iterations)]
+
+
+def bench_case_load_async(ctx: BenchmarkContext) -> List[float]:
+    """
+    Loading many cases at once from a bulk script: the same three reads per case through AsyncEpicorService, with
+    up to 10 cases in flight on one thread.
+    """
+    import asyncio
+    from services.asyncEpicorService import AsyncEpicorService, gather_limited
+
+    async def load(service: AsyncEpicorService, case_number: int) -> float:
+        started_at = time.perf_counter()
+        await service.get_case_info(case_number)
+        await service.get_design_components(case_number)
+        await service.get_case_by_id(case_number)
+        return time.perf_counter() - started_at
+
+    async def load_all() -> List[float]:
+        async with AsyncEpicorService() as service:
+            service.BASE_URL = ctx.epicor_service.BASE_URL
+            service.BASE_ODATA_URL = ctx.epicor_service.BASE_ODATA_URL
+            service.BASE_EFX_URL = ctx.epicor_service.BASE_EFX_URL
+            return await gather_limited(10, (load(service, ctx.case_number(i)) for i in range(ctx.iterations)))
+
+    return asyncio.run(load_all())
+
+
+def bench_bulk_download(ctx: BenchmarkContext) -> List[float]:
+    """
+    Download All Supporting Docs: every attachment of a case through the DownloadManager.
+    """
+    from services.downloadManagerService import DownloadManager, DownloadJob
+
+    latencies = []
+    for i in range(ctx.iterations):
+        case_number = ctx.case_number(i)
+        attachments = ctx.epicor_service.get_case_by_id(case_number) or []
+        jobs = [DownloadJob(case_number, a['FileName'], a['XFileRefNum'], row) for row, a in enumerate(attachments)]
+
+        started_at = {}
+        finished = []
+
+        def on_progress(job: DownloadJob):
+            if job.status == 'Downloading':
+                started_at.setdefault(job.row, time.perf_counter())
+            elif job.status in ('Done', 'Failed', 'Cancelled') and job.row in started_at:
+                latencies.append(time.perf_counter() - started_at.pop(job.row))
+
+        manager = DownloadManager(ctx.epicor_service, on_progress=on_progress, on_finished=finished.append)
+        manager.start(jobs)
+        while not finished:
+            time.sleep(0.001)
+
+        failed = [job for job in jobs if job.status != 'Done']
+        if failed:
+            raise Exception(f'{len(failed)} downloads failed: {failed[0].error}')
+    return latencies
+
+
+def bench_upload(ctx: BenchmarkContext) -> List[float]:
+    """
+    Uploading one file to a case.
+    """
+    path = os.path.join(ctx.work_dir, 'upload.bin')
+    with open(path, 'wb') as f:
+        f.write(os.urandom(ctx.upload_bytes))
+    files = [{'path': path, 'FileName': 'upload.bin', 'DocType': 'SupDoc'}]
+    return [timed(ctx.epicor_service.upload_files, ctx.case_number(i), files) for i in range(ctx.iterations)]
+
+
+def bench_upload_batch(ctx: BenchmarkContext) -> List[float]:
+    """
+    Uploading eight files to a case at once, two to a request, encoding the next request while one is sent.
+    """
+    import threading
+    from services.uploadBatchService import UploadBatch
+
+    paths = []
+    for index in range(8):
+        path = os.path.join(ctx.work_dir, f'upload{index}.bin')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(ctx.upload_bytes))
+        paths.append(path)
+
+    def upload(case_number: int):
+        finished = threading.Event()
+        batch = UploadBatch(ctx.epicor_service, case_number, paths, 'SupDoc', max_batch_bytes=2 * ctx.upload_bytes,
+                            on_finished=lambda results: finished.set())
+        batch.start()
+        finished.wait()
+        failed = [result for result in batch.results if result.status != 'Done']
+        if failed:
+            raise Exception(f'{len(failed)} uploads failed: {failed[0].error}')
+
+    return [timed(upload, ctx.case_number(i)) for i in range(ctx.iterations)]
+
+
+def bench_quote_workflow(ctx: BenchmarkContext) -> List[float]:
+    """
+    Update Case with everything ticked: price, quote, complete, assign and comment.
+    """
+    from services.caseService import CaseService
+
+    case_service = CaseService()
+    case_service.epicor_service = ctx.epicor_service
+
+    def update(case_number: int):
+        ctx.epicor_service.update_case_part_and_price(case_number, 2.0, 150.0)
+        case_service.create_and_attach_quote_to_case(case_number)
+        ctx.epicor_service.complete_current_case_task(case_number)
+        ctx.epicor_service.assign_current_case_task(case_number, 'Jane Doe')
+        ctx.epicor_service.add_case_comment(case_number, 'Benchmark comment')
+
+    return [timed(update, ctx.case_number(i)) for i in range(ctx.iterations)]
+
+
+def bench_case_update_workflow(ctx: BenchmarkContext) -> List[float]:
+    """
+    The same update run as a step graph, with the comment going out alongside the price and quote.
+    """
+    from services.caseService import CaseService
+    from services.workflowService import Workflow, build_case_update_steps
+
+    case_service = CaseService()
+    case_service.epicor_service = ctx.epicor_service
+
+    def update(case_number: int):
+        workflow = Workflow(build_case_update_steps(ctx.epicor_service, case_service, case_number, quantity=2.0,
+                                                    create_quote=True, complete_task=True, assign_to='Jane Doe',
+                                                    comment='Benchmark comment'))
+        workflow.start()
+        workflow.wait()
+        if not workflow.succeeded:
+            raise Exception(f'Workflow failed: {workflow.failed_steps[0].error}')
+
+    return [timed(update, ctx.case_number(i)) for i in range(ctx.iterations)]
+
+
+SCENARIOS: Dict[str, Callable[[BenchmarkContext], List[float]]] = {
+    'case_list': bench_case_list,
+    'case_load': bench_case_load,
+    'case_load_batched': bench_case_load_batched,
+    'case_load_async': bench_case_load_async,
+    'bulk_download': bench_bulk_download,
+    'upload': bench_upload,
+    'upload_batch': bench_upload_batch,
+    'quote_workflow': bench_quote_workflow,
+    'case_update_workflow': bench_case_update_workflow,
+}
+
+
+def run_scenario(name: str, ctx: BenchmarkContext) -> Dict:
+    metrics = MetricsService.get_instance()
+    metrics.reset()
+
+    started_at = time.perf_counter()
+    latencies = sorted(SCENARIOS[name](ctx))
+    seconds = time.perf_counter() - started_at
+
+    http_calls = sum(row['calls'] for row in metrics.snapshot())
+    return {
+        'scenario': name,
+        'operations': len(latencies),
+        'http_calls': http_calls,
+        'seconds': round(seconds, 3),
+        'ops_per_sec': round(len(latencies) / seconds, 1) if seconds else None,
+        'calls_per_sec': round(http_calls / seconds, 1) if seconds else None,
+        'p50_ms': _to_ms(percentile(latencies, 0.50)),
+        'p95_ms': _to_ms(percentile(latencies, 0.95)),
+        'p99_ms': _to_ms(percentile(latencies, 0.99)),
+    }
+
+
+def isolate_local_state(work_dir: str, rate_limit: float):
+    """
+    Keep the run away from the user's caches and case store, and make every read go to the server.
+    """
+    CaseCache._instance = CaseCache(ttl=0)
+    CaseStore._instance = CaseStore(':memory:')
+    AttachmentCache._instance = AttachmentCache(os.path.join(work_dir, 'attachments'), 0)
+    UploadManifest._instance = UploadManifest(os.path.join(work_dir, 'upload_ledger.json'))
+    transport = EpicorTransport.get_instance()
+    transport.rate_limiter = TokenBucket(rate_limit, max(rate_limit, 1))
+
+
+def create_epicor_service(base_url: str, doc_path: str):
+    from services.epicorService import EpicorService
+
+    epicor_service = EpicorService()
+    epicor_service.BASE_URL = base_url
+    epicor_service.BASE_ODATA_URL = base_url + epicor_service.ODATA_PATH
+    epicor_service.BASE_EFX_URL = base_url + epicor_service.EFX_PATH
+    epicor_service.DOC_PATH = doc_path
+    return epicor_service
+
+
+def print_results(results: List[Dict], baseline: Optional[Dict[str, Dict]] = None):
+    header = f"{'scenario':<22}{'ops':>6}{'calls':>7}{'secs':>9}{'ops/s':>9}{'calls/s':>9}" \
+             f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if baseline:
+        header += f"{'p95 vs base':>13}"
+    print(header)
+    for row in results:
+        line = f"{row['scenario']:<22}{row['operations']:>6}{row['http_calls']:>7}{row['seconds']:>9.3f}" \
+               f"{row['ops_per_sec']:>9}{row['calls_per_sec']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}" \
+               f"{row['p99_ms']:>9}"
+        base = (baseline or {}).get(row['scenario'])
+        if base and base.get('p95_ms'):
+            line += f"{(row['p95_ms'] - base['p95_ms']) / base['p95_ms']:>+13.1%}"
+        print(line)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark EpicorService against the fake Epicor server.')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help=f"Scenarios to run, from {', '.join(SCENARIOS)}. All of them if omitted.")
+    parser.add_argument('--iterations', type=int, default=20, help='Operations per scenario')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server latency per request, in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra server latency, in seconds')
+    parser.add_argument('--cases', type=int, default=500, help='Rows in the CaseTasks BAQ')
+    parser.add_argument('--attachments', type=int, default=4, help='Attachments per case')
+    parser.add_argument('--attachment-kb', type=int, default=512, help='Size of every attachment')
+    parser.add_argument('--upload-kb', type=int, default=1024, help='Size of the uploaded file')
+    parser.add_argument('--fixtures', default=None, help='Folder of recorded responses to replay')
+    parser.add_argument('--rate-limit', type=float, default=0, help='Client rate limit. 0 (off) by default.')
+    parser.add_argument('--json', dest='json_path', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file from an earlier run to compare p95 against')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None) -> List[Dict]:
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix='casetools-bench-')
+    fake = FakeEpicor(case_count=args.cases, attachments_per_case=args.attachments,
+                      attachment_bytes=args.attachment_kb * 1024, latency=args.latency, jitter=args.jitter,
+                      fixtures_dir=args.fixtures)
+    try:
+        with FakeEpicorServer(fake) as server:
+            isolate_local_state(work_dir, args.rate_limit)
+            ctx = BenchmarkContext(create_epicor_service(server.base_url, os.path.join(work_dir, 'docs')), fake,
+                                   work_dir, args.iterations, args.upload_kb * 1024)
+            results = [run_scenario(name, ctx) for name in (args.scenarios or SCENARIOS)]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = {row['scenario']: row for row in json.load(f)['results']}
+    print_results(results, baseline)
+
+    if args.json_path:
+        os.makedirs(os.path.dirname(args.json_path) or '.', exist_ok=True)
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': time.time(), 'args': vars(args), 'results': results}, f, indent=2)
+    return results
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+if __name__ == '__main__':
+    main()
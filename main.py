@@ -6,8 +6,11 @@ from ui.settingsTab import SettingsTab
 from ui.teamsTab import TeamsTab
 from ui.caseFilesTab import CaseTab
 from ui.caseListTab import CaseListTab
+from ui.diagnosticsTab import DiagnosticsTab
 
 from services.loggingService import LoggingService
+from services.metricsService import MetricsService, DEFAULT_DUMP_INTERVAL
+from services.transportService import get_float_setting
 
 # start logging service
 LoggingService.setup_logging()
@@ -19,6 +22,10 @@ config.read(os.path.expanduser('~/.myapp.cfg'))
 # Set document path
 DOC_PATH = config.get('DEFAULT', 'DOC_PATH', fallback=None)
 
+# Dump Epicor call metrics to the logs folder every few minutes
+MetricsService.get_instance().start_periodic_dump(
+    interval=get_float_setting(config, 'METRICS_DUMP_INTERVAL', DEFAULT_DUMP_INTERVAL))
+
 
 # Main application window
 def load_config_vars():
@@ -47,6 +54,7 @@ class Mywin(wx.Frame):
         self.settingsTab = None
         self.richTextTab = None
         self.designTab = None
+        self.diagnosticsTab = None
 
         config_vars = load_config_vars()
 
@@ -90,11 +98,13 @@ class Mywin(wx.Frame):
         self.caseListTab = CaseListTab(self.nb)
         self.caseTab = CaseTab(self.nb)
         self.TeamsTab = TeamsTab(self.nb)
+        self.diagnosticsTab = DiagnosticsTab(self.nb)
         self.settingsTab = SettingsTab(self.nb)
 
         self.nb.AddPage(self.caseListTab, "Open Cases")
         self.nb.AddPage(self.caseTab, "Files")
         self.nb.AddPage(self.TeamsTab, "Teams Tools")
+        self.nb.AddPage(self.diagnosticsTab, "Diagnostics")
         self.nb.AddPage(self.settingsTab, "Settings")
 
 
@@ -0,0 +1,444 @@
+# asyncEpicorService.py
+
+import os
+import json
+import time
+import asyncio
+import tempfile
+import aiohttp
+import requests
+
+from typing import List, Dict, Optional, Any, Callable, Iterable, Awaitable
+from configparser import ConfigParser
+from services.epicorService import CaseNotFoundError, build_odata_query
+from services.loggingService import LoggingService
+from services.metricsService import MetricsService
+from services.attachmentCacheService import AttachmentCache
+from services.streamingService import stream_base64_field_to_file_async, STREAM_CHUNK_SIZE
+from services.transportService import (EpicorTransport, classify_endpoint, get_int_setting, DEFAULT_POOL_MAXSIZE,
+                                       IDEMPOTENT_CLASSES, RETRY_STATUS_CODES)
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_ASYNC_POOL_LIMIT = 100
+
+
+async def gather_limited(limit: int, aws: Iterable[Awaitable], return_exceptions: bool = False) -> List[Any]:
+    """
+    Like asyncio.gather, but never runs more than `limit` of the awaitables at the same time.
+    :param limit: Maximum number of awaitables in flight
+    :param aws: Coroutines to run
+    :param return_exceptions: Return exceptions in the result list instead of raising the first one
+    :return: Results in the same order as aws
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw: Awaitable):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+def as_requests_error(error: Exception) -> requests.RequestException:
+    """
+    The requests exception EpicorService would have raised for an aiohttp failure, so callers handle both alike.
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return requests.Timeout(str(error) or 'Request timed out')
+    return requests.ConnectionError(str(error))
+
+
+class AsyncEpicorService:
+    """
+    Coroutine version of EpicorService. All calls share one pooled aiohttp session, so many Epicor calls can run
+    concurrently on a single thread. Use it as an async context manager, or call close() when finished.
+    Requests follow the shared EpicorTransport's policy: the same timeouts, retries, rate limiter and metrics as the
+    sync client, and the same exceptions.
+    """
+
+    def __init__(self):
+        self.config = ConfigParser()
+        self.config.read(os.path.expanduser('~/.myapp.cfg'))
+
+        self.BASE_URL = self.config.get('DEFAULT', 'BASE_URL', fallback=None)
+        self.SIXS_API_KEY = self.config.get('DEFAULT', 'SIXS_API_KEY', fallback=None)
+        self.SIXS_BASIC_AUTH = self.config.get('DEFAULT', 'SIXS_BASIC_AUTH', fallback=None)
+        self.DOC_PATH = self.config.get('DEFAULT', 'DOC_PATH', fallback=None)
+
+        self.ODATA_PATH = "/api/v2/odata/100"
+        self.EFX_PATH = "/api/v2/efx/100"
+
+        self.BASE_ODATA_URL = self.BASE_URL + self.ODATA_PATH if self.BASE_URL else None
+        self.BASE_EFX_URL = self.BASE_URL + self.EFX_PATH if self.BASE_URL else None
+
+        self.headers = {
+            "X-API-Key": self.SIXS_API_KEY,
+            "Authorization": self.SIXS_BASIC_AUTH,
+            "Content-Type": "application/json; charset=utf-8",
+        }
+
+        # Policy and rate limiter come from the sync transport, so both clients share one request budget
+        self.transport = EpicorTransport.get_instance()
+        self.attachment_cache = AttachmentCache.get_instance()
+        self.pool_limit = get_int_setting(self.config, 'ASYNC_POOL_LIMIT', DEFAULT_ASYNC_POOL_LIMIT)
+        self.pool_limit_per_host = get_int_setting(self.config, 'HTTP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> 'AsyncEpicorService':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the pooled session, creating it on first use. Must be called from inside the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_limit, limit_per_host=self.pool_limit_per_host)
+            # aiohttp refuses None header values, which requests silently drops
+            headers = {key: value for key, value in self.headers.items() if value is not None}
+            self._session = aiohttp.ClientSession(connector=connector, headers=headers)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def request(self, method: str, url: str, endpoint_class: Optional[str] = None,
+                      sink: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None,
+                      **kwargs) -> aiohttp.ClientResponse:
+        """
+        Send a request under the transport policy. See EpicorTransport.request.
+        :param method: HTTP method
+        :param url: Full URL
+        :param endpoint_class: Overrides classify_endpoint()
+        :param sink: Reads a 200 response's body instead of it being held in memory, e.g. to stream it to disk
+        :param kwargs: Passed to aiohttp. An explicit timeout wins over the policy's.
+        :return: The response, with its body already read (or handed to sink)
+        """
+        policy = self.transport.policy
+        endpoint_class = endpoint_class or classify_endpoint(method, url)
+        connect_timeout, read_timeout = policy.timeout_for(endpoint_class)
+        kwargs.setdefault('timeout', aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout))
+        max_retries = policy.max_retries if endpoint_class in IDEMPOTENT_CLASSES else 0
+        if isinstance(kwargs.get('data'), str):
+            kwargs['data'] = kwargs['data'].encode('utf-8')
+        request_bytes = len(kwargs.get('data') or b'')
+        metrics = MetricsService.get_instance()
+
+        attempt = 0
+        while True:
+            await self.transport.rate_limiter.acquire_async()
+            started_at = time.perf_counter()
+            try:
+                async with self.get_session().request(method, url, **kwargs) as response:
+                    if sink is not None and response.status == 200:
+                        await sink(response)
+                        # Like the sync transport's streamed requests, go by what the server said it would send
+                        response_bytes = int(response.headers.get('Content-Length') or 0)
+                    else:
+                        response_bytes = len(await response.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.record(url, time.perf_counter() - started_at, 0, 0, type(e).__name__)
+                if attempt >= max_retries:
+                    raise as_requests_error(e) from e
+                delay = policy.backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({e!r}). Retry {attempt + 1} of {max_retries} in {delay:.1f}s")
+            else:
+                metrics.record(url, time.perf_counter() - started_at, request_bytes, response_bytes, response.status)
+                if response.status not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+                delay = policy.backoff_delay(attempt, response)
+                logger.warning(f"{method} {url} returned {response.status}. "
+                               f"Retry {attempt + 1} of {max_retries} in {delay:.1f}s")
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def post_request(self, endpoint: str, data: Dict) -> Dict:
+        response = await self.request('POST', f"{self.BASE_URL}{endpoint}", data=json.dumps(data))
+        response_data = await response.json(content_type=None)
+
+        if response_data.get('Error'):
+            raise Exception(response_data.get('Message'))
+
+        return response_data
+
+    async def get_case_info(self, case_number: int) -> Dict:
+        logger.info(f"Retrieving case info for case {case_number}...")
+        try:
+            response_data = await self.post_request("/api/v2/efx/100/CaseDev/GetCaseStatus", {'CaseNum': case_number})
+            if response_data.get('Message') == 'Record not found':
+                raise CaseNotFoundError(f"Case not found: {case_number}")
+            elif response_data.get('Error'):
+                raise Exception(response_data.get('Message'))
+            return response_data
+
+        except requests.RequestException as e:
+            logger.error(f"Request failed for get_case_info: {e}")
+            raise
+        except CaseNotFoundError:
+            logger.warning(f"Case not found: {case_number}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in get_case_info for case {case_number}: {e}")
+            raise
+
+    async def get_design_components(self, case_number: int) -> list[Any] | None:
+        try:
+            response_data = await self.post_request("/api/v2/efx/100/CaseDev/GetCaseComponents",
+                                                    {'CaseNum': case_number})
+            if response_data.get('Error'):
+                raise Exception(response_data.get('Message'))
+            design_components = response_data.get('CaseComponents', {}).get('DesignComponents', [])
+            return design_components
+        except Exception as error:
+            logger.error(f"Unable to retrieve components for case {case_number}: {str(error)}")
+            return None
+
+    async def get_case_attachment_list(self, hd_case_num: int) -> Optional[List[Dict]]:
+        try:
+            response_data = await self.post_request("/api/v2/odata/100/Erp.BO.HelpDeskSvc/GetByID",
+                                                    {'hdCaseNum': hd_case_num})
+            if response_data.get('HDCaseAttch'):
+                return [{'XFileRefNum': a['XFileRefNum'], 'FileName': a['FileName'], 'DocTypeID': a['DocTypeID']} for a
+                        in response_data['HDCaseAttch']]
+            else:
+                logger.error(f"No attachments found for case {hd_case_num}")
+                return None
+        except Exception as error:
+            raise Exception(f"Unable to retrieve attachments for case {hd_case_num}: {str(error)}")
+
+    async def update_design_components(self, case_number: int, design_components: List[Dict]) -> None:
+        try:
+            await self.post_request("/api/v2/efx/100/CaseDev/AddDesignComponents",
+                                    {'CaseNum': case_number, 'Components': {'ComponentData': design_components}})
+        except Exception as error:
+            raise Exception(f"Unable to update design components: {str(error)}")
+
+    async def update_case_design_info(self, case_design_data: Dict) -> None:
+        try:
+            await self.post_request("/api/v2/efx/100/CaseDev/UpdateCaseDesign", case_design_data)
+        except Exception as error:
+            logger.error(f"Unable to update case: {str(error)}")
+
+    async def download_file_to_path(self, x_file_ref_num: int, dest_path: str) -> Optional[int]:
+        """
+        Stream an attachment from GetCaseAttachment straight to disk. See EpicorService.download_file_to_path.
+        :return: Number of bytes written, or None if the file could not be downloaded
+        """
+        try:
+            cached_size = self.attachment_cache.copy_to(x_file_ref_num, dest_path)
+            if cached_size is not None:
+                return cached_size
+
+            size = await self.stream_base64_response("/api/v2/efx/100/CaseDev/GetCaseAttachment",
+                                                     {'XFileRefNum': x_file_ref_num}, 'Attachment', dest_path)
+            self.attachment_cache.store(x_file_ref_num, dest_path)
+            return size
+        except Exception as error:
+            logger.error(f"Error retrieving file {x_file_ref_num}: {str(error)}")
+            return None
+
+    async def stream_base64_response(self, endpoint: str, data: Dict, field: str, dest_path: str) -> int:
+        """
+        POST to an endpoint that returns a file as a base64 JSON field and decode the field to disk as it arrives.
+        See EpicorService.stream_base64_response.
+        :return: Number of bytes written
+        """
+        written = 0
+
+        async def save(response: aiohttp.ClientResponse):
+            nonlocal written
+            written = await stream_base64_field_to_file_async(response.content.iter_chunked(STREAM_CHUNK_SIZE),
+                                                              field, dest_path)
+
+        response = await self.request('POST', f"{self.BASE_URL}{endpoint}", data=json.dumps(data), sink=save)
+        if response.status != 200:
+            raise Exception(f'Status Code: {response.status}')
+        return written
+
+    async def get_case_by_id(self, case_number: int) -> Any | None:
+        try:
+            response = await self.request('GET', self.BASE_ODATA_URL + "/Erp.BO.HelpDeskSvc/GetByID",
+                                          params={"hdCaseNum": case_number})
+            response_data = await response.json(content_type=None)
+
+            if response_data:
+                if 'returnObj' in response_data:
+                    return response_data['returnObj']['HDCaseAttch']
+                else:
+                    logger.error(f"'returnObj' not found in the response for case number: {case_number}")
+                    return None
+            else:
+                logger.error(f'No case found for case number: {case_number}')
+                return None
+        except Exception as e:
+            logger.error(f"Error retrieving case: {str(e)}")
+            return None
+
+    async def download_file_by_xRefNum(self, xFileRefNum: int, dest_path: Optional[str] = None) -> str:
+        """
+        Download a file from Kinetic based on the xFileRefNum, streamed straight to disk.
+        Attachments already in the local cache are copied from there instead.
+        :param xFileRefNum: Ref num for desired file
+        :param dest_path: Where to save the file. Defaults to a file in the temp folder.
+        :return: Path to the saved file
+        """
+        dest_path = dest_path or os.path.join(tempfile.gettempdir(), f"attachment_{xFileRefNum}")
+        if self.attachment_cache.copy_to(xFileRefNum, dest_path) is None:
+            await self.stream_base64_response(self.ODATA_PATH + "/Ice.BO.AttachmentSvc/DownloadFile",
+                                              {"xFileRefNum": xFileRefNum}, 'returnObj', dest_path)
+            self.attachment_cache.store(xFileRefNum, dest_path)
+        return dest_path
+
+    async def upload_document_logic(self, case_num, file_name, doc_type, encoded_content):
+        """
+        Upload a base64 encoded file to a case.
+        :return: The response with its body already read, or None if the request failed
+        """
+        try:
+            return await self.request('POST', self.BASE_EFX_URL + "/CaseTools/UploadCaseAttachment",
+                                      data=json.dumps({
+                                          "CaseNum": int(case_num),
+                                          "Attachments": {
+                                              "Files": [
+                                                  {
+                                                      "DocType": doc_type,
+                                                      "FileBytes": encoded_content,
+                                                      "FileName": file_name
+                                                  }
+                                              ]
+                                          }
+                                      }))
+        except requests.RequestException as e:
+            logger.error(f'HTTP Request failed: {e}')
+            return None
+
+    async def complete_current_case_task(self, case_num: int) -> bool:
+        """
+        Complete the current task on a case
+        :param case_num: Case Num
+        :return: Is there an active task?
+        """
+        response_data = await self.post_request("/api/v2/efx/100/CaseDev/CompleteTask", {'CaseNum': case_num})
+        if response_data.get('Error'):
+            raise Exception(response_data.get('Message'))
+
+        if response_data.get('Message') != "task update complete" or not response_data.get('HasActiveTask'):
+            raise Exception(f'Failed to complete current task on case {case_num}.')
+
+    async def assign_current_case_task(self, case_num: int, assign_next_to_name: str):
+        """
+        Assign the current task on a case to the specified person.
+        :param case_num: Case Num
+        :param assign_next_to_name: Name of the person to assign to
+        """
+        response_data = await self.post_request("/api/v2/efx/100/CaseDev/AssignCurrentTask",
+                                                {'CaseNum': case_num, 'AssignNextToName': assign_next_to_name})
+        if response_data.get('Error'):
+            raise Exception(response_data.get('Message'))
+
+    async def add_case_comment(self, case_num: int, comment: str):
+        """
+        Add a new comment to a case.
+        :param case_num: Case Num
+        :param comment: Comment text
+        """
+        response_data = await self.post_request("/api/v2/efx/100/CaseDev/AddCaseComment",
+                                                {'CaseNum': case_num, 'Comment': comment})
+        if response_data.get('Error'):
+            raise Exception(response_data.get('Message'))
+
+    async def update_case_part_and_price(self, case_num: int, quantity: float, unit_price: float):
+        """
+        Set and pricing on a case. Set part to 'DevCon'
+        :param case_num: Case Num
+        :param quantity: Quantity
+        :param unit_price: Unit Price
+        """
+        logger.info(f"Update Case Part and Price: Case: {case_num} Quantity: {quantity} Unit Price: {unit_price}")
+        await self.post_request("/api/v2/efx/100/CaseDev/UpdatePartandPrice", {
+            'CaseNum': case_num,
+            'PartNum': 'DevCon',
+            'Quantity': quantity,
+            'UnitPrice': unit_price
+        })
+
+    async def create_quote_for_case(self, case_number: int) -> int:
+        """
+        Creates a quote for the specified case.
+        :param case_number: Case Number
+        :return: Created Quote Number
+        """
+        try:
+            response_data = await self.post_request("/api/v2/efx/100/QuoteUpdater/CreateQuoteForCase",
+                                                    {'HDCase': case_number})
+
+            if response_data.get('Error'):
+                raise Exception(response_data.get('Message'))
+
+            logger.info(f"Created quote for case {case_number}")
+            return response_data.get('NewQuoteNum')
+        except Exception as error:
+            raise Exception(f"Unable to create quote for case {case_number}: {str(error)}")
+
+    async def update_quote_for_case(self, quote_number: int, unit_price: float, qty: float, description: str):
+        """
+        Apply pricing and description to a quote
+        :param quote_number: Quote to update
+        :param unit_price: Unit Price
+        :param qty: Qty
+        :param description: Description
+        """
+        try:
+            response_data = await self.post_request("/api/v2/efx/100/QuoteUpdater/UpdateQuote",
+                                                    {'QuoteNum': quote_number, 'NewPrice': unit_price, 'NewQty': qty,
+                                                     'CaseDescription': description})
+            if response_data.get('Error'):
+                raise Exception(response_data.get('Message'))
+        except Exception as error:
+            logger.error(f"Unable to update quote {quote_number}: {str(error)}")
+
+    async def mark_quote_as_quoted(self, quote_number: int):
+        """
+        Set the 'quoted' flag on a quote.
+        :param quote_number: Quote Number
+        """
+        try:
+            response_data = await self.post_request("/api/v2/efx/100/CaseQuoteAutomation/QuoteQuote",
+                                                    {'QuoteNum': quote_number})
+            if response_data.get('Error'):
+                raise Exception(response_data.get('Message'))
+        except Exception as error:
+            logger.error(f"Unable to mark quote {quote_number} as quoted: {str(error)}")
+
+    async def attach_quote_pdf_to_case(self, case_number: int, quote_number: int, task_note):
+        """
+        Generates a PDF of the specified quote and attaches it to the case.
+        :param case_number: Case Number
+        :param quote_number: Quote Number
+        :param task_note: Note for the task the quote is attached under
+        """
+        response_data = await self.post_request("/api/v2/efx/100/CaseQuoteAutomation/GenerateAndAttachQuote",
+                                                {'CaseNumber': case_number, 'QuoteNum': quote_number,
+                                                 'TaskNote': task_note})
+        if response_data.get('Error'):
+            raise Exception(response_data.get('Message'))
+
+    async def fetch_cases(self, select: Optional[List[str]] = None, filter_expr: Optional[str] = None,
+                          orderby: Optional[str] = None, top: Optional[int] = None, skip: Optional[int] = None):
+        """
+        Retrieve all pending dev cases for quoting. See EpicorService.fetch_cases for the query options.
+        :return: Array of cases
+        """
+        endpoint = "/api/v2/odata/100/BaqSvc/CaseTasks/Data"
+        params = build_odata_query(select, filter_expr, orderby, top, skip)
+        response = await self.request('GET', f'{self.BASE_URL}{endpoint}', params=params)
+        if response.status == 200:
+            return (await response.json(content_type=None))['value']
+        else:
+            raise Exception(f'Status Code: {response.status}')
@@ -0,0 +1,205 @@
+# attachmentCacheService.py
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from typing import Dict, Optional
+from configparser import ConfigParser
+from services.loggingService import LoggingService
+from services.transportService import get_int_setting
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_CACHE_DIR = '~/.casetools/attachments'
+DEFAULT_CACHE_MAX_MB = 1024
+HASH_READ_SIZE = 1024 * 1024
+
+
+class AttachmentCache:
+    """
+    Local, content-addressed store of downloaded Epicor attachments.
+    Blobs are stored once per SHA-256 and indexed by XFileRefNum. Epicor never changes an attachment in place, so a
+    hit never needs to go back to the server. The least recently used blobs are evicted once the cache outgrows
+    its size limit.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """
+        :param cache_dir: Folder holding blobs/ and index.json
+        :param max_bytes: Size limit for all blobs together
+        """
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        # refs: XFileRefNum -> hash. blobs: hash -> {'size', 'last_used'}
+        self.refs: Dict[str, str] = {}
+        self.blobs: Dict[str, Dict] = {}
+        self._load_index()
+
+    @classmethod
+    def get_instance(cls) -> 'AttachmentCache':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    config = ConfigParser()
+                    config.read(os.path.expanduser('~/.myapp.cfg'))
+                    cache_dir = config.get('DEFAULT', 'ATTACHMENT_CACHE_DIR', fallback='') or DEFAULT_CACHE_DIR
+                    max_mb = get_int_setting(config, 'ATTACHMENT_CACHE_MAX_MB', DEFAULT_CACHE_MAX_MB)
+                    cls._instance = cls(os.path.expanduser(cache_dir), max_mb * 1024 * 1024)
+        return cls._instance
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(blob['size'] for blob in self.blobs.values())
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.refs = index.get('refs', {})
+            self.blobs = index.get('blobs', {})
+        except Exception as e:
+            logger.warning(f"Attachment cache index unreadable, starting empty: {e}")
+            self.refs = {}
+            self.blobs = {}
+
+        # Drop entries whose blob has gone missing
+        for content_hash in [h for h in self.blobs if not os.path.exists(self._blob_path(h))]:
+            del self.blobs[content_hash]
+        self.refs = {ref: h for ref, h in self.refs.items() if h in self.blobs}
+
+    def _save_index(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.index', suffix='.part')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'refs': self.refs, 'blobs': self.blobs}, f)
+        os.replace(temp_path, self.index_path)
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.blob_dir, content_hash)
+
+    def get_hash(self, x_file_ref_num: int) -> Optional[str]:
+        """
+        SHA-256 of a cached attachment, without touching its LRU position.
+        """
+        with self._lock:
+            return self.refs.get(str(x_file_ref_num))
+
+    def lookup(self, x_file_ref_num: int) -> Optional[str]:
+        """
+        :return: Path to the cached blob for the attachment, or None on a miss. The blob's LRU position is only
+                 updated in memory. It reaches index.json with the next store().
+        """
+        with self._lock:
+            content_hash = self.refs.get(str(x_file_ref_num))
+            if content_hash is None:
+                return None
+            self.blobs[content_hash]['last_used'] = time.time()
+            return self._blob_path(content_hash)
+
+    def copy_to(self, x_file_ref_num: int, dest_path: str) -> Optional[int]:
+        """
+        Copy a cached attachment to dest_path.
+        :return: Size of the file, or None on a miss. A copy that fails counts as a miss, so the caller downloads
+                 the file instead.
+        """
+        blob_path = None
+        temp_path = None
+        try:
+            blob_path = self.lookup(x_file_ref_num)
+            if blob_path is None:
+                return None
+            os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path) or '.', prefix='.', suffix='.part')
+            os.close(fd)
+            shutil.copyfile(blob_path, temp_path)
+            os.replace(temp_path, dest_path)
+            size = os.path.getsize(dest_path)
+        except OSError as e:
+            logger.warning(f"Unable to copy attachment {x_file_ref_num} from cache: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            if blob_path and not os.path.exists(blob_path):
+                self._forget_blob(os.path.basename(blob_path))
+            return None
+        except BaseException:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        logger.info(f"Attachment {x_file_ref_num} served from cache")
+        return size
+
+    def _forget_blob(self, content_hash: str):
+        """
+        Drop a blob that has gone missing from disk, so the next download caches it again.
+        """
+        with self._lock:
+            self.blobs.pop(content_hash, None)
+            self.refs = {ref: h for ref, h in self.refs.items() if h in self.blobs}
+            try:
+                self._save_index()
+            except OSError as e:
+                logger.warning(f"Unable to save attachment cache index: {e}")
+
+    def store(self, x_file_ref_num: int, file_path: str) -> str:
+        """
+        Add a downloaded file to the cache under its XFileRefNum.
+        :return: SHA-256 of the file
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.blob_dir, prefix='.', suffix='.part')
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as blob, open(file_path, 'rb') as source:
+                while chunk := source.read(HASH_READ_SIZE):
+                    sha256.update(chunk)
+                    blob.write(chunk)
+                    size += len(chunk)
+            content_hash = sha256.hexdigest()
+
+            with self._lock:
+                if content_hash in self.blobs:
+                    os.remove(temp_path)
+                else:
+                    os.replace(temp_path, self._blob_path(content_hash))
+                    self.blobs[content_hash] = {'size': size}
+                self.blobs[content_hash]['last_used'] = time.time()
+                self.refs[str(x_file_ref_num)] = content_hash
+                self._evict()
+                self._save_index()
+            return content_hash
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _evict(self):
+        total = self.total_bytes
+        if total <= self.max_bytes:
+            return
+
+        for content_hash, blob in sorted(self.blobs.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._blob_path(content_hash))
+            except FileNotFoundError:
+                pass
+            total -= blob['size']
+            del self.blobs[content_hash]
+            logger.info(f"Evicted {content_hash} from attachment cache")
+
+        self.refs = {ref: h for ref, h in self.refs.items() if h in self.blobs}
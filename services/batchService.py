@@ -0,0 +1,249 @@
+# batchService.py
+
+import os
+import json
+import uuid
+import threading
+
+from concurrent.futures import Future
+from configparser import ConfigParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+from services.loggingService import LoggingService
+from services.transportService import classify_endpoint, get_int_setting, IDEMPOTENT_CLASSES, RETRY_STATUS_CODES
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_BATCH_MAX_REQUESTS = 50
+
+# Servers that turned down $batch itself: any 4xx other than a rate limit, or 501. Their batches go out one request at
+# a time instead for the rest of the session.
+_unbatched_base_urls = set()
+_unbatched_lock = threading.Lock()
+
+BatchPart = Tuple[int, Dict[str, str], bytes]
+
+
+def batch_refused(status_code: int) -> bool:
+    """
+    Whether a $batch response means the server won't take batches at all, rather than a passing failure.
+    """
+    return status_code == 501 or (400 <= status_code < 500 and status_code not in RETRY_STATUS_CODES)
+
+
+class BatchRequest:
+    def __init__(self, method: str, endpoint: str, data: Optional[Dict] = None, params: Optional[Dict] = None):
+        """
+        :param method: GET or POST
+        :param endpoint: Endpoint path, relative to BASE_URL, e.g. '/api/v2/efx/100/CaseDev/GetCaseStatus'
+        :param data: JSON body
+        :param params: Query string parameters
+        """
+        self.method = method.upper()
+        self.endpoint = endpoint
+        self.data = data
+        self.params = params
+        self.future: Future = Future()
+
+    @property
+    def path(self) -> str:
+        return self.endpoint + ('?' + urlencode(self.params) if self.params else '')
+
+
+def build_batch_body(batch_requests: List[BatchRequest], base_path: str, boundary: str) -> bytes:
+    """
+    Encode requests as an OData multipart/mixed batch body. Parts use absolute paths so efx functions and OData
+    services can share one batch.
+    """
+    lines = []
+    for content_id, request in enumerate(batch_requests, 1):
+        lines += [f'--{boundary}', 'Content-Type: application/http', 'Content-Transfer-Encoding: binary',
+                  f'Content-ID: {content_id}', '',
+                  f'{request.method} {base_path}{request.path} HTTP/1.1', 'Accept: application/json']
+        if request.data is not None:
+            lines += ['Content-Type: application/json; charset=utf-8', '', json.dumps(request.data)]
+        else:
+            lines += ['', '']
+    lines += [f'--{boundary}--', '']
+    return '\r\n'.join(lines).encode()
+
+
+def _split_headers(block: bytes) -> Tuple[bytes, bytes]:
+    for separator in (b'\r\n\r\n', b'\n\n'):
+        head, found, rest = block.partition(separator)
+        if found:
+            return head, rest
+    return block, b''
+
+
+def _parse_headers(head: bytes) -> Dict[str, str]:
+    headers = {}
+    for line in head.decode('utf-8', errors='replace').splitlines():
+        name, found, value = line.partition(':')
+        if found:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _boundary_of(content_type: str) -> Optional[str]:
+    for parameter in content_type.split(';')[1:]:
+        name, _, value = parameter.strip().partition('=')
+        if name.lower() == 'boundary':
+            return value.strip('"')
+    return None
+
+
+def parse_batch_response(content_type: str, body: bytes) -> List[BatchPart]:
+    """
+    Decode a multipart/mixed batch response, including any nested changesets.
+    :return: (status, headers, body) of every response, in order
+    """
+    boundary = _boundary_of(content_type)
+    if not boundary:
+        raise ValueError(f'Batch response has no boundary: {content_type}')
+
+    parts = []
+    delimiter = b'--' + boundary.encode()
+    for block in body.split(delimiter)[1:]:
+        if block.startswith(b'--'):
+            break
+        mime_head, payload = _split_headers(block.lstrip(b'\r\n'))
+        mime_headers = _parse_headers(mime_head)
+        part_type = mime_headers.get('content-type', '')
+
+        if part_type.lower().startswith('multipart/mixed'):
+            parts += parse_batch_response(part_type, payload)
+            continue
+
+        http_head, http_body = _split_headers(payload)
+        status_line, _, header_lines = http_head.partition(b'\n')
+        status = int(status_line.split()[1])
+        parts.append((status, _parse_headers(header_lines), http_body.rstrip(b'\r\n')))
+    return parts
+
+
+class ODataBatch:
+    """
+    Collects Epicor calls and sends them as one OData $batch request, so several reads cost one round trip.
+    Each add() returns a Future that resolves to the call's JSON response once execute() runs, or raises its
+    error. Use as a context manager to execute on exit.
+    """
+
+    def __init__(self, epicor_service, max_requests: Optional[int] = None):
+        """
+        :param epicor_service: Service whose transport, headers and BASE_URL are used
+        :param max_requests: Calls per $batch. Bigger batches are split. Defaults to BATCH_MAX_REQUESTS.
+        """
+        if max_requests is None:
+            config = ConfigParser()
+            config.read(os.path.expanduser('~/.myapp.cfg'))
+            max_requests = get_int_setting(config, 'BATCH_MAX_REQUESTS', DEFAULT_BATCH_MAX_REQUESTS)
+
+        self.epicor_service = epicor_service
+        self.max_requests = max(max_requests, 1)
+        self.requests: List[BatchRequest] = []
+
+    def add(self, method: str, endpoint: str, data: Optional[Dict] = None, params: Optional[Dict] = None) -> Future:
+        request = BatchRequest(method, endpoint, data, params)
+        self.requests.append(request)
+        return request.future
+
+    def get(self, endpoint: str, params: Optional[Dict] = None) -> Future:
+        return self.add('GET', endpoint, params=params)
+
+    def post(self, endpoint: str, data: Dict) -> Future:
+        return self.add('POST', endpoint, data=data)
+
+    def execute(self):
+        """
+        Send everything queued so far. Futures are resolved before this returns.
+        """
+        pending, self.requests = self.requests, []
+        for start in range(0, len(pending), self.max_requests):
+            chunk = pending[start:start + self.max_requests]
+            try:
+                self._send(chunk)
+            except Exception as e:
+                for request in chunk:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _send(self, batch_requests: List[BatchRequest]):
+        service = self.epicor_service
+        with _unbatched_lock:
+            unbatched = service.BASE_URL in _unbatched_base_urls
+        if unbatched or len(batch_requests) == 1:
+            self._send_individually(batch_requests)
+            return
+
+        boundary = f'batch_{uuid.uuid4()}'
+        classes = {classify_endpoint(request.method, request.endpoint) for request in batch_requests}
+        endpoint_class = 'read' if classes <= IDEMPOTENT_CLASSES else 'write'
+        headers = dict(service.headers)
+        headers['Content-Type'] = f'multipart/mixed; boundary={boundary}'
+        headers['Accept'] = 'multipart/mixed'
+
+        response = service.transport.post(
+            f'{service.BASE_ODATA_URL}/$batch',
+            headers=headers,
+            data=build_batch_body(batch_requests, urlparse(service.BASE_URL).path, boundary),
+            endpoint_class=endpoint_class
+        )
+
+        if batch_refused(response.status_code):
+            with _unbatched_lock:
+                first_refusal = service.BASE_URL not in _unbatched_base_urls
+                _unbatched_base_urls.add(service.BASE_URL)
+            if first_refusal:
+                logger.warning(f"$batch refused by {service.BASE_URL} (status {response.status_code}). "
+                               f"Sending requests one at a time")
+            self._send_individually(batch_requests)
+            return
+        if response.status_code != 200:
+            raise Exception(f'Batch failed with status code: {response.status_code}')
+
+        parts = parse_batch_response(response.headers.get('Content-Type', ''), response.content)
+        if len(parts) != len(batch_requests):
+            raise Exception(f'Batch returned {len(parts)} responses for {len(batch_requests)} requests')
+
+        for request, (status, _, body) in zip(batch_requests, parts):
+            self._resolve(request, status, body)
+
+    def _send_individually(self, batch_requests: List[BatchRequest]):
+        service = self.epicor_service
+        for request in batch_requests:
+            try:
+                response = service.transport.request(
+                    request.method,
+                    f'{service.BASE_URL}{request.endpoint}',
+                    headers=service.headers,
+                    params=request.params,
+                    data=json.dumps(request.data) if request.data is not None else None
+                )
+                self._resolve(request, response.status_code, response.content)
+            except Exception as e:
+                request.future.set_exception(e)
+
+    @staticmethod
+    def _resolve(request: BatchRequest, status: int, body: bytes):
+        try:
+            response_data = json.loads(body) if body else {}
+        except ValueError:
+            request.future.set_exception(Exception(f'Status Code: {status}'))
+            return
+
+        if status >= 400:
+            message = response_data.get('ErrorMessage') or response_data.get('Message') \
+                if isinstance(response_data, dict) else None
+            request.future.set_exception(Exception(message or f'Status Code: {status}'))
+        elif isinstance(response_data, dict) and response_data.get('Error'):
+            request.future.set_exception(Exception(response_data.get('Message')))
+        else:
+            request.future.set_result(response_data)
+
+    def __enter__(self) -> 'ODataBatch':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.execute()
@@ -0,0 +1,151 @@
+# bulkUpdateService.py
+
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from typing import Callable, Dict, List, Optional
+from services.loggingService import LoggingService
+from services.transportService import get_int_setting
+from services.workflowService import Workflow, build_case_update_steps
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_BULK_UPDATE_WORKERS = 4
+
+
+class BulkCaseResult:
+    def __init__(self, case_number: int, row: Optional[int] = None):
+        """
+        :param case_number: Case being updated
+        :param row: Caller's row/index for the case, handy for updating a list
+        """
+        self.case_number = case_number
+        self.row = row
+        self.status = 'Queued'  # Queued, Running, Done, Failed, Cancelled
+        self.workflow: Optional[Workflow] = None
+        self.error: Optional[str] = None
+
+    @property
+    def details(self) -> str:
+        if self.error:
+            return self.error
+        if self.workflow is None:
+            return ''
+        problems = [f"{step.label}: {step.error}" for step in self.workflow.steps.values() if step.error]
+        if problems:
+            return '; '.join(problems)
+        return ', '.join(step.label for step in self.workflow.steps.values() if step.status == 'Done')
+
+
+class BulkCaseUpdate:
+    """
+    Runs the Update Case workflow over many cases on a bounded pool of worker threads. Each case's steps run in
+    order on its worker, so at most `max_workers` calls are in flight at once.
+    Callbacks run on the worker threads. UI callers should hop back to the UI thread themselves (wx.CallAfter).
+    """
+
+    def __init__(self, epicor_service, case_service, case_numbers: List[int], update_options: Dict,
+                 max_workers: Optional[int] = None,
+                 on_case_changed: Optional[Callable[[BulkCaseResult], None]] = None,
+                 on_finished: Optional[Callable[[List[BulkCaseResult]], None]] = None):
+        """
+        :param epicor_service: EpicorService to run the updates with
+        :param case_service: CaseService, for quotes
+        :param case_numbers: Cases to update
+        :param update_options: Keyword arguments for build_case_update_steps: quantity, complete_task, assign_to,
+                               comment, ...
+        :param max_workers: Cases updated at once. Defaults to BULK_UPDATE_WORKERS from the config file.
+        :param on_case_changed: Called with a case's result whenever its status changes
+        :param on_finished: Called once with every result when the batch is done or cancelled
+        """
+        if max_workers is None:
+            config = ConfigParser()
+            config.read(os.path.expanduser('~/.myapp.cfg'))
+            max_workers = get_int_setting(config, 'BULK_UPDATE_WORKERS', DEFAULT_BULK_UPDATE_WORKERS)
+
+        self.epicor_service = epicor_service
+        self.case_service = case_service
+        self.update_options = update_options
+        self.max_workers = max_workers
+        self.on_case_changed = on_case_changed
+        self.on_finished = on_finished
+        self.results = [BulkCaseResult(case_number, row) for row, case_number in enumerate(case_numbers)]
+        self.cancel_event = threading.Event()
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._remaining > 0
+
+    def start(self):
+        """
+        Update every case that isn't Done yet and return immediately. Calling it again after a run retries only the
+        failed steps of the failed cases.
+        """
+        if self.is_running:
+            raise Exception('A bulk update is already running')
+
+        pending = [result for result in self.results if result.status != 'Done']
+        self.cancel_event.clear()
+        self._remaining = len(pending)
+        if not pending:
+            self._notify_finished()
+            return
+
+        for result in pending:
+            result.status = 'Queued'
+            self._notify_case(result)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bulk-update')
+        for result in pending:
+            executor.submit(self._run_case, result)
+        executor.shutdown(wait=False)
+
+    def cancel(self):
+        """
+        Stop starting new cases. Cases already running finish their current workflow.
+        """
+        self.cancel_event.set()
+
+    def _run_case(self, result: BulkCaseResult):
+        try:
+            if self.cancel_event.is_set():
+                result.status = 'Cancelled'
+                return
+
+            result.status = 'Running'
+            result.error = None
+            self._notify_case(result)
+
+            if result.workflow is None:
+                steps = build_case_update_steps(self.epicor_service, self.case_service, result.case_number,
+                                                **self.update_options)
+                result.workflow = Workflow(steps, max_workers=1)
+                result.workflow.start()
+            else:
+                result.workflow.retry_failed()
+            result.workflow.wait()
+
+            result.status = 'Done' if result.workflow.succeeded else 'Failed'
+        except Exception as e:
+            result.status = 'Failed'
+            result.error = str(e)
+            logger.error(f"Bulk update of case {result.case_number} failed: {e}")
+        finally:
+            self._notify_case(result)
+            with self._lock:
+                self._remaining -= 1
+                finished = self._remaining == 0
+            if finished:
+                self._notify_finished()
+
+    def _notify_case(self, result: BulkCaseResult):
+        if self.on_case_changed:
+            self.on_case_changed(result)
+
+    def _notify_finished(self):
+        if self.on_finished:
+            self.on_finished(self.results)
@@ -0,0 +1,224 @@
+# caseCacheService.py
+
+import os
+import copy
+import time
+import functools
+import threading
+
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+from configparser import ConfigParser
+from services.caseStoreService import CaseStore
+from services.loggingService import LoggingService
+from services.transportService import get_int_setting
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_CASE_CACHE_TTL = 60
+
+
+class CaseCache:
+    """
+    In-memory TTL cache for per-case Epicor reads, shared by every EpicorService instance.
+    Entries are grouped by case number so any write to a case can evict everything cached for it.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, ttl: float = DEFAULT_CASE_CACHE_TTL):
+        """
+        :param ttl: Seconds an entry stays fresh. 0 turns caching off.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._keys_by_case: Dict[int, Set[Hashable]] = {}
+        self._case_by_quote: Dict[int, int] = {}
+        # Bumped on every invalidation, so a read that started before a write can't cache what it got
+        self._generations: Dict[int, int] = {}
+        self._all_generation = 0
+
+    @classmethod
+    def get_instance(cls) -> 'CaseCache':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    config = ConfigParser()
+                    config.read(os.path.expanduser('~/.myapp.cfg'))
+                    cls._instance = cls(get_int_setting(config, 'CASE_CACHE_TTL', DEFAULT_CASE_CACHE_TTL))
+        return cls._instance
+
+    def get(self, case_number: int, key: Hashable) -> Tuple[bool, Any]:
+        """
+        :return: (found, value). Values are copies, so callers may change them freely.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(case_number, key)
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, copy.deepcopy(entry[1])
+
+    def contains(self, key: Hashable) -> bool:
+        """
+        Is a fresh entry cached? Doesn't count as a hit or miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def generation(self, case_number: int) -> Tuple[int, int]:
+        """
+        Where the case's invalidations are up to. Take it before reading from Epicor and hand it to put().
+        """
+        with self._lock:
+            return self._current_generation(case_number)
+
+    def _current_generation(self, case_number: int) -> Tuple[int, int]:
+        return self._all_generation, self._generations.get(case_number, 0)
+
+    def put(self, case_number: int, key: Hashable, value: Any, generation: Optional[Tuple[int, int]] = None):
+        """
+        :param generation: generation(case_number) from before the value was read. If the case has been
+                           invalidated since, the value may predate a write and isn't stored.
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._current_generation(case_number):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            self._keys_by_case.setdefault(case_number, set()).add(key)
+
+    def _remove(self, case_number: int, key: Hashable):
+        self._entries.pop(key, None)
+        keys = self._keys_by_case.get(case_number)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_case[case_number]
+
+    def invalidate_case(self, case_number: int):
+        with self._lock:
+            self._generations[case_number] = self._generations.get(case_number, 0) + 1
+            keys = self._keys_by_case.pop(case_number, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.evictions += len(keys)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._all_generation += 1
+            self.evictions += len(self._entries)
+            self._entries.clear()
+            self._keys_by_case.clear()
+
+    def remember_quote(self, quote_number: int, case_number: int):
+        """
+        Record which case a quote belongs to, so writes to the quote can evict the case.
+        """
+        with self._lock:
+            self._case_by_quote[quote_number] = case_number
+
+    def case_for_quote(self, quote_number: int) -> Optional[int]:
+        with self._lock:
+            return self._case_by_quote.get(quote_number)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+            }
+
+
+def _case_number(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def case_read_key(name: str, base_url: Optional[str], case_number, args: tuple = (),
+                  kwargs: Optional[Dict] = None) -> Hashable:
+    """
+    Cache key of a cached_case_read call, so results fetched another way (e.g. in a batch) can be cached for it.
+    """
+    return name, base_url, _case_number(case_number), repr(args), repr(sorted((kwargs or {}).items()))
+
+
+def cached_case_read(method: Callable) -> Callable:
+    """
+    Decorator for EpicorService reads whose first argument is a case number. Results are served from the CaseCache
+    until they expire or a write to the case evicts them. None results (failed reads) are not cached, and neither are
+    results of a read that overlapped a write to the case.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, case_number, *args, **kwargs):
+        cache = CaseCache.get_instance()
+        case_key = _case_number(case_number)
+        key = case_read_key(method.__name__, self.BASE_URL, case_key, args, kwargs)
+        found, value = cache.get(case_key, key)
+        if found:
+            return value
+
+        generation = cache.generation(case_key)
+        value = method(self, case_number, *args, **kwargs)
+        if value is not None:
+            cache.put(case_key, key, value, generation)
+        return value
+
+    return wrapper
+
+
+def invalidates_case(method: Callable) -> Callable:
+    """
+    Decorator for EpicorService writes whose first argument is a case number. Evicts the case's cached reads, and its
+    saved copy in the CaseStore, once the write returns or fails, since a failed write may still have changed
+    something.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, case_number, *args, **kwargs):
+        try:
+            return method(self, case_number, *args, **kwargs)
+        finally:
+            CaseCache.get_instance().invalidate_case(_case_number(case_number))
+            CaseStore.get_instance().delete_case_values(_case_number(case_number))
+
+    return wrapper
+
+
+def invalidates_quote_case(method: Callable) -> Callable:
+    """
+    Decorator for EpicorService writes whose first argument is a quote number. Evicts the quote's case if known,
+    otherwise everything.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, quote_number, *args, **kwargs):
+        try:
+            return method(self, quote_number, *args, **kwargs)
+        finally:
+            cache = CaseCache.get_instance()
+            case_number = cache.case_for_quote(quote_number)
+            if case_number is None:
+                cache.invalidate_all()
+                CaseStore.get_instance().delete_all_case_values()
+            else:
+                cache.invalidate_case(case_number)
+                CaseStore.get_instance().delete_case_values(case_number)
+
+    return wrapper
@@ -1,6 +1,6 @@
 # caseService.py
 
-from typing import Optional, Iterable
+from typing import Optional, Iterable, Tuple
 from services.epicorService import EpicorService, CaseNotFoundError
 from services.loggingService import LoggingService
 from datetime import datetime
@@ -108,32 +108,56 @@ class CaseService:
         :return: Quote Number
         """
         try:
-            # Retrieve details for case
-            case_info = self.epicor_service.get_case_info(case_number)
-            if not case_info:
-                raise Exception(f"Case {case_number} not found")
-
-            qty: float = case_info.get('Qty')
-            unit_price: float = case_info.get('UnitPrice')
-            case_description: str = case_info.get('CaseDescription').split('\n')[0]
-
-            # Did we find everything we need?
-            if not all([qty, unit_price, case_description]):
-                raise Exception(f'Invalid data for case {case_number}: Qty={qty}, UnitPrice={unit_price}, '
-                                f'CaseDescription={case_description}')
-
-            # Create the quote
-            quote_num = self.epicor_service.create_quote_for_case(case_number)
-
-            # Set pricing and description on quote. Mark it 'quoted'
-            self.epicor_service.update_quote_for_case(quote_num, unit_price, qty, case_description)
-            self.epicor_service.mark_quote_as_quoted(quote_num)
-
-            # Attach quote PDF to the case
-            task_note = f'{case_number}-{quote_num}-{datetime.now()}'
-            logger.info(f'task_note: {task_note}')
-            self.epicor_service.attach_quote_pdf_to_case(case_number, quote_num, task_note)
-            logger.info(f'Attached quote {quote_num} to case {case_number}')
+            quote_num = self.create_quote(case_number)
+            self.finish_quote(case_number, quote_num)
+            self.attach_quote(case_number, quote_num)
             return quote_num
         except Exception as e:
             raise Exception(f'Failed to create and attach quote to case {case_number}: {e}')
+
+    def get_quote_details(self, case_number: int) -> Tuple[float, float, str]:
+        """
+        :return: (qty, unit_price, description) to put on the case's quote
+        """
+        case_info = self.epicor_service.get_case_info(case_number)
+        if not case_info:
+            raise Exception(f"Case {case_number} not found")
+
+        qty: float = case_info.get('Qty')
+        unit_price: float = case_info.get('UnitPrice')
+        case_description: str = (case_info.get('CaseDescription') or '').split('\n')[0]
+
+        # Did we find everything we need?
+        if not all([qty, unit_price, case_description]):
+            raise Exception(f'Invalid data for case {case_number}: Qty={qty}, UnitPrice={unit_price}, '
+                            f'CaseDescription={case_description}')
+        return qty, unit_price, case_description
+
+    def create_quote(self, case_number: int) -> int:
+        """
+        Create an empty quote for a case, after checking the case has what the quote needs.
+        :return: Quote Number
+        """
+        self.get_quote_details(case_number)
+        quote_num = self.epicor_service.create_quote_for_case(case_number)
+        if not quote_num:
+            raise Exception(f"No quote created for case {case_number}")
+        logger.info(f'Created quote {quote_num} for case {case_number}')
+        return quote_num
+
+    def finish_quote(self, case_number: int, quote_num: int):
+        """
+        Set pricing and description on a case's quote and mark it 'quoted'.
+        """
+        qty, unit_price, case_description = self.get_quote_details(case_number)
+        self.epicor_service.update_quote_for_case(quote_num, unit_price, qty, case_description)
+        self.epicor_service.mark_quote_as_quoted(quote_num)
+
+    def attach_quote(self, case_number: int, quote_num: int):
+        """
+        Print a quote to PDF and attach it to the case.
+        """
+        task_note = f'{case_number}-{quote_num}-{datetime.now()}'
+        logger.info(f'task_note: {task_note}')
+        self.epicor_service.attach_quote_pdf_to_case(case_number, quote_num, task_note)
+        logger.info(f'Attached quote {quote_num} to case {case_number}')
@@ -0,0 +1,83 @@
+# caseSnapshotService.py
+
+from typing import Dict, List, Tuple, Any
+
+CaseRowKey = Tuple[Any, ...]
+
+
+class CaseDelta:
+    def __init__(self, inserted: List[CaseRowKey], updated: List[CaseRowKey], removed: List[CaseRowKey],
+                 is_initial: bool = False):
+        """
+        :param inserted: Keys of rows that are new since the last snapshot
+        :param updated: Keys of rows whose values changed
+        :param removed: Keys of rows that are gone
+        :param is_initial: There was no previous snapshot to compare against
+        """
+        self.inserted = inserted
+        self.updated = updated
+        self.removed = removed
+        self.is_initial = is_initial
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.inserted or self.updated or self.removed)
+
+    def summary(self) -> str:
+        if self.is_initial:
+            return f"{len(self.inserted)} cases loaded"
+        if not self.has_changes:
+            return "No changes"
+        parts = []
+        if self.inserted:
+            parts.append(f"{len(self.inserted)} new")
+        if self.updated:
+            parts.append(f"{len(self.updated)} updated")
+        if self.removed:
+            parts.append(f"{len(self.removed)} removed")
+        return ', '.join(parts)
+
+
+class CaseSnapshot:
+    """
+    The last CaseTasks result, keyed by case number and task, so a refresh can be turned into inserts, updates and
+    removals instead of a full reload.
+    """
+
+    def __init__(self):
+        self.rows: Dict[CaseRowKey, Dict] = {}
+        self._keys_by_row_id: Dict[int, CaseRowKey] = {}
+
+    @staticmethod
+    def build_keys(rows: List[Dict]) -> List[CaseRowKey]:
+        """
+        Key every row by (case number, task). A case listing the same task twice gets an ordinal so neither row is
+        lost.
+        """
+        seen: Dict[CaseRowKey, int] = {}
+        keys = []
+        for row in rows:
+            base_key = (row.get('HDCase_HDCaseNum'), row.get('Task_TaskDescription'))
+            ordinal = seen.get(base_key, 0)
+            seen[base_key] = ordinal + 1
+            keys.append(base_key + (ordinal,))
+        return keys
+
+    def key_for(self, row: Dict) -> CaseRowKey:
+        return self._keys_by_row_id[id(row)]
+
+    def apply(self, new_rows: List[Dict]) -> CaseDelta:
+        """
+        Replace the snapshot with new_rows and report what changed.
+        """
+        is_initial = not self.rows
+        new_keys = self.build_keys(new_rows)
+        new_snapshot = dict(zip(new_keys, new_rows))
+
+        inserted = [key for key in new_keys if key not in self.rows]
+        updated = [key for key in new_keys if key in self.rows and self.rows[key] != new_snapshot[key]]
+        removed = [key for key in self.rows if key not in new_snapshot]
+
+        self.rows = new_snapshot
+        self._keys_by_row_id = {id(row): key for key, row in new_snapshot.items()}
+        return CaseDelta(inserted, updated, removed, is_initial)
@@ -0,0 +1,180 @@
+# caseStoreService.py
+
+import os
+import json
+import time
+import sqlite3
+import functools
+import threading
+import requests
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from configparser import ConfigParser
+from services.loggingService import LoggingService
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_CASE_STORE_PATH = '~/.casetools/cases.db'
+
+# Tables holding one JSON document per case
+CASE_TABLES = ('case_info', 'case_attachments', 'design_components')
+
+
+def _case_key(case_num) -> Optional[int]:
+    try:
+        return int(case_num)
+    except (TypeError, ValueError):
+        return None
+
+
+class CaseStore:
+    """
+    SQLite copy of what we last got from Epicor: the open cases list plus case info, attachment lists and design
+    components per case. Lets the app draw straight away at startup and keep browsing while Epicor is unreachable.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        """
+        :param path: SQLite database file. Created if missing.
+        """
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        # Bumped whenever a case's values are deleted, so a read that overlapped a write isn't saved
+        self._generations: Dict[int, int] = {}
+        self._all_generation = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._create_tables()
+
+    @classmethod
+    def get_instance(cls) -> 'CaseStore':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    config = ConfigParser()
+                    config.read(os.path.expanduser('~/.myapp.cfg'))
+                    path = config.get('DEFAULT', 'CASE_STORE_PATH', fallback='') or DEFAULT_CASE_STORE_PATH
+                    cls._instance = cls(os.path.expanduser(path))
+        return cls._instance
+
+    def _create_tables(self):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS case_tasks (position INTEGER PRIMARY KEY, data TEXT NOT NULL)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            for table in CASE_TABLES:
+                self._connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS {table} '
+                    f'(case_num INTEGER PRIMARY KEY, data TEXT NOT NULL, saved_at REAL NOT NULL)')
+
+    def save_case_tasks(self, rows: List[Dict]):
+        """
+        Replace the stored open cases list.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM case_tasks')
+            self._connection.executemany('INSERT INTO case_tasks (position, data) VALUES (?, ?)',
+                                         ((i, json.dumps(row)) for i, row in enumerate(rows)))
+            self._connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                     ('case_tasks_saved_at', str(time.time())))
+
+    def load_case_tasks(self) -> Tuple[List[Dict], Optional[float]]:
+        """
+        :return: (rows, time they were saved). ([], None) if nothing has been saved yet.
+        """
+        with self._lock:
+            rows = [json.loads(data) for (data,) in
+                    self._connection.execute('SELECT data FROM case_tasks ORDER BY position')]
+            saved_at = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'case_tasks_saved_at'").fetchone()
+        return rows, float(saved_at[0]) if saved_at else None
+
+    def generation(self, case_num: int) -> Tuple[int, int]:
+        """
+        Where deletions of the case's values are up to. Take it before reading from Epicor and hand it to
+        save_case_value().
+        """
+        with self._lock:
+            return self._current_generation(case_num)
+
+    def _current_generation(self, case_num: int) -> Tuple[int, int]:
+        return self._all_generation, self._generations.get(_case_key(case_num), 0)
+
+    def save_case_value(self, table: str, case_num: int, value: Any, generation: Optional[Tuple[int, int]] = None):
+        """
+        :param generation: generation(case_num) from before the value was read. Not saved if the case's values have
+                           been deleted since.
+        """
+        if table not in CASE_TABLES:
+            raise ValueError(f'Unknown case table: {table}')
+        with self._lock, self._connection:
+            if generation is not None and generation != self._current_generation(case_num):
+                return
+            self._connection.execute(f'INSERT OR REPLACE INTO {table} (case_num, data, saved_at) VALUES (?, ?, ?)',
+                                     (int(case_num), json.dumps(value), time.time()))
+
+    def delete_case_values(self, case_num: int):
+        """
+        Forget everything saved for a case, e.g. after changing it, so an outdated copy is never served.
+        """
+        with self._lock, self._connection:
+            self._generations[_case_key(case_num)] = self._generations.get(_case_key(case_num), 0) + 1
+            for table in CASE_TABLES:
+                self._connection.execute(f'DELETE FROM {table} WHERE case_num = ?', (int(case_num),))
+
+    def delete_all_case_values(self):
+        with self._lock, self._connection:
+            self._all_generation += 1
+            for table in CASE_TABLES:
+                self._connection.execute(f'DELETE FROM {table}')
+
+    def load_case_value(self, table: str, case_num: int) -> Tuple[bool, Any]:
+        """
+        :return: (found, value)
+        """
+        if table not in CASE_TABLES:
+            raise ValueError(f'Unknown case table: {table}')
+        with self._lock:
+            row = self._connection.execute(f'SELECT data FROM {table} WHERE case_num = ?',
+                                           (int(case_num),)).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+
+def stored_case_read(table: str, none_when_unreachable: bool = False) -> Callable:
+    """
+    Decorator for EpicorService reads whose first argument is a case number. Successful results are saved to the
+    CaseStore. Only if Epicor can't be reached (connection error or timeout) is the saved copy returned instead. Any
+    other failure is the method's own business, so stale data is never passed off as live.
+    :param table: CaseStore table for the results
+    :param none_when_unreachable: Return None rather than raise when Epicor can't be reached and nothing is saved,
+                                  for methods that report every failure as None
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, case_number, *args, **kwargs):
+            store = CaseStore.get_instance()
+            generation = store.generation(case_number)
+            try:
+                value = method(self, case_number, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                found, stored = store.load_case_value(table, case_number)
+                if not found:
+                    if none_when_unreachable:
+                        logger.error(f"Epicor unreachable ({e}) and no saved {table} for case {case_number}")
+                        return None
+                    raise
+                logger.warning(f"Epicor unreachable ({e}). Using saved {table} for case {case_number}")
+                return stored
+
+            if value is not None:
+                store.save_case_value(table, case_number, value, generation)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,208 @@
+# caseTableService.py
+
+import sys
+import math
+
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# How each CaseTasks column is stored and sorted. Anything not listed is text.
+INT_COLUMNS = {'HDCase_HDCaseNum', 'Calculated_DaysSinceLastComment', 'Calculated_DaysTillDueDate'}
+FLOAT_COLUMNS = {'HDCase_Quantity', 'ProjPhase_TotEstLbrHrs', 'ProjPhase_TotActLbrHrs', 'Calculated_LaborHours',
+                 'HDCase_EstimatedHrs_c', 'Calculated_RemainingHours', 'Calculated_SchedHoursRemaining'}
+DATE_COLUMNS = {'Task_StartDate', 'Task_DueDate', 'HDCase_RequestDate_c', 'HDCase_DevStartDate_c',
+                'HDCase_DeliveryDate_c'}
+
+# Text the search box looks through, and the length of the pieces it's indexed by
+SEARCH_COLUMNS = ['HDCase_Description', 'Customer_Name', 'Project_ProjectID']
+NGRAM_SIZE = 3
+
+MISSING = math.nan
+
+
+def parse_number(value: Any) -> float:
+    if value is None or value == '':
+        return MISSING
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def parse_date(value: Any) -> float:
+    """
+    :return: Epicor's ISO date as a timestamp, or NaN if there isn't one
+    """
+    if not value or not isinstance(value, str):
+        return MISSING
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return MISSING
+
+
+def column_kind(key: str) -> str:
+    if key in INT_COLUMNS or key in FLOAT_COLUMNS:
+        return 'number'
+    if key in DATE_COLUMNS:
+        return 'date'
+    return 'text'
+
+
+class CaseTable:
+    """
+    CaseTasks rows stored by column: numbers and dates as arrays of doubles (NaN when missing), text as interned
+    strings. Columns are converted the first time they're needed, and each column's sort order is worked out once
+    and kept, so sorting by it again costs nothing. Rows with no value sort last.
+    """
+
+    def __init__(self, rows: List[Dict]):
+        """
+        :param rows: Rows from fetch_cases. Kept as they are for display.
+        """
+        self.rows = rows
+        self._columns: Dict[str, Any] = {}
+        self._sort_orders: Dict[str, List[int]] = {}
+        self._sort_ranks: Dict[str, List[int]] = {}
+        self._indexes: Dict[str, Dict[Optional[str], Set[int]]] = {}
+        self._search_texts: Optional[List[str]] = None
+        self._ngrams: Optional[Dict[str, Set[int]]] = None
+        self._last_search = ('', None)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def column(self, key: str):
+        """
+        Every row's value for a column, converted to its type.
+        """
+        values = self._columns.get(key)
+        if values is None:
+            kind = column_kind(key)
+            if kind == 'number':
+                values = array('d', (parse_number(row.get(key)) for row in self.rows))
+            elif kind == 'date':
+                values = array('d', (parse_date(row.get(key)) for row in self.rows))
+            else:
+                values = [sys.intern(value) if isinstance(value, str) and value else None
+                          for value in (row.get(key) for row in self.rows)]
+            self._columns[key] = values
+        return values
+
+    def sort_order(self, key: Optional[str]) -> List[int]:
+        """
+        Row indexes in ascending order of a column. Ties keep the order Epicor sent them in.
+        :param key: Column to sort by. None gives Epicor's order.
+        """
+        if key is None:
+            return list(range(len(self.rows)))
+        order = self._sort_orders.get(key)
+        if order is None:
+            values = self.column(key)
+            if column_kind(key) == 'text':
+                # Case-insensitive, so "acme" doesn't land after "Zenith"
+                order = sorted(range(len(values)),
+                               key=lambda i: (values[i] is None, values[i].casefold() if values[i] else ''))
+            else:
+                order = sorted(range(len(values)), key=lambda i: (math.isnan(values[i]), values[i]))
+            self._sort_orders[key] = order
+        return order
+
+    def sort_rank(self, key: Optional[str]) -> List[int]:
+        """
+        Each row's position in sort_order(key). Handy for ordering a handful of rows without walking them all.
+        """
+        if key is None:
+            return list(range(len(self.rows)))
+        rank = self._sort_ranks.get(key)
+        if rank is None:
+            rank = [0] * len(self.rows)
+            for position, index in enumerate(self.sort_order(key)):
+                rank[index] = position
+            self._sort_ranks[key] = rank
+        return rank
+
+    def index(self, key: str) -> Dict[Optional[str], Set[int]]:
+        """
+        Inverted index of a text column: value -> indexes of the rows holding it. Blanks are under None.
+        """
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for row_index, value in enumerate(self.column(key)):
+                index.setdefault(value, set()).add(row_index)
+            self._indexes[key] = index
+        return index
+
+    def _build_search_index(self):
+        self._search_texts = [' '.join(str(row.get(key) or '') for key in SEARCH_COLUMNS).casefold()
+                              for row in self.rows]
+        self._ngrams = {}
+        for row_index, text in enumerate(self._search_texts):
+            for ngram in set(text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)):
+                self._ngrams.setdefault(ngram, set()).add(row_index)
+
+    def _search_term(self, term: str, candidates: Optional[Set[int]]) -> Set[int]:
+        texts = self._search_texts
+        if len(term) >= NGRAM_SIZE:
+            postings = [self._ngrams.get(term[i:i + NGRAM_SIZE], set()) for i in range(len(term) - NGRAM_SIZE + 1)]
+            postings.sort(key=len)
+            if candidates is not None:
+                postings.insert(0, candidates)
+            candidates = set.intersection(*postings)
+        elif candidates is None:
+            candidates = range(len(texts))
+        # N-grams can match out of order. Check the real thing.
+        return set(row_index for row_index in candidates if term in texts[row_index])
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """
+        Rows whose description, customer or project contain every word of the query, in any case.
+        :return: Matching row indexes, or None for an empty query (everything matches)
+        """
+        terms = query.casefold().split()
+        if not terms:
+            return None
+        if self._ngrams is None:
+            self._build_search_index()
+
+        # Typing more onto the last query can only narrow its result down
+        query = query.casefold()
+        last_query, last_matches = self._last_search
+        candidates = last_matches if last_query and query.startswith(last_query) else None
+        for term in terms:
+            candidates = self._search_term(term, candidates)
+            if not candidates:
+                break
+        self._last_search = (query, candidates)
+        return candidates
+
+    def filter(self, filters: Dict[str, Optional[str]], query: str = '') -> Optional[Set[int]]:
+        """
+        Rows matching every filter and the search query.
+        :param filters: Column -> value the row must hold (None for blank). Columns left out aren't filtered.
+        :param query: Search box text
+        :return: Matching row indexes, or None if nothing is filtered out
+        """
+        matches = None
+        for key, value in sorted(filters.items(), key=lambda item: len(self.index(item[0]).get(item[1], ()))):
+            rows = self.index(key).get(value, set())
+            matches = set(rows) if matches is None else matches & rows
+            if not matches:
+                return set()
+        found = self.search(query)
+        if found is not None:
+            matches = found if matches is None else matches & found
+        return matches
+
+    def ordered(self, matches: Optional[Iterable[int]], key: Optional[str]) -> List[int]:
+        """
+        Matching row indexes in sort order.
+        :param matches: From filter(). None for every row.
+        """
+        if matches is None:
+            return self.sort_order(key)
+        if len(matches) * 8 < len(self.rows):
+            return sorted(matches, key=self.sort_rank(key).__getitem__)
+        return [index for index in self.sort_order(key) if index in matches]
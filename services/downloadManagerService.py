@@ -0,0 +1,161 @@
+# downloadManagerService.py
+
+import os
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from typing import List, Optional, Callable
+from services.epicorService import EpicorService
+from services.loggingService import LoggingService
+from services.streamingService import DownloadCancelled
+from services.transportService import get_int_setting
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+# Least time between progress callbacks for a job. Status changes are always reported.
+PROGRESS_INTERVAL = 0.1
+
+
+class DownloadJob:
+    def __init__(self, case_number: int, filename: str, x_file_ref_num: int, row: Optional[int] = None):
+        """
+        :param case_number: Case the file belongs to
+        :param filename: Name to save the file as
+        :param x_file_ref_num: Ref num for the file
+        :param row: Caller's row/index for the file, handy for updating a list
+        """
+        self.case_number = case_number
+        self.filename = filename
+        self.x_file_ref_num = x_file_ref_num
+        self.row = row
+        self.status = 'Queued'  # Queued, Downloading, Done, Failed, Cancelled
+        self.bytes_received = 0
+        self.total_bytes: Optional[int] = None
+        self.path: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @property
+    def fraction(self) -> float:
+        if self.status == 'Done':
+            return 1.0
+        if not self.total_bytes:
+            return 0.0
+        return min(self.bytes_received / self.total_bytes, 1.0)
+
+
+class DownloadManager:
+    """
+    Downloads a batch of attachments on a bounded pool of worker threads.
+    Callbacks run on the worker threads. UI callers should hop back to the UI thread themselves (wx.CallAfter).
+    """
+
+    def __init__(self, epicor_service: EpicorService, max_workers: Optional[int] = None,
+                 on_progress: Optional[Callable[[DownloadJob], None]] = None,
+                 on_finished: Optional[Callable[[List[DownloadJob]], None]] = None):
+        """
+        :param epicor_service: Service used for the downloads
+        :param max_workers: Downloads in flight at once. Defaults to DOWNLOAD_WORKERS from the config file.
+        :param on_progress: Called with a job whenever its status changes, and as it progresses, at most every
+                            PROGRESS_INTERVAL seconds
+        :param on_finished: Called once with every job when the batch is done, failed or cancelled
+        """
+        if max_workers is None:
+            config = ConfigParser()
+            config.read(os.path.expanduser('~/.myapp.cfg'))
+            max_workers = get_int_setting(config, 'DOWNLOAD_WORKERS', DEFAULT_DOWNLOAD_WORKERS)
+
+        self.epicor_service = epicor_service
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.jobs: List[DownloadJob] = []
+        self.cancel_event = threading.Event()
+        self._remaining = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._remaining > 0
+
+    @property
+    def overall_fraction(self) -> float:
+        if not self.jobs:
+            return 1.0
+        return sum(job.fraction for job in self.jobs) / len(self.jobs)
+
+    def start(self, jobs: List[DownloadJob]):
+        """
+        Queue the jobs and return immediately.
+        """
+        if self.is_running:
+            raise Exception('A download batch is already running')
+
+        self.jobs = jobs
+        self.cancel_event.clear()
+        self._remaining = len(jobs)
+
+        if not jobs:
+            self._notify_finished()
+            return
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='download')
+        for job in jobs:
+            self._executor.submit(self._run_job, job)
+        self._executor.shutdown(wait=False)
+
+    def cancel(self):
+        """
+        Stop the batch. Queued jobs are skipped and in-flight ones abort at their next chunk.
+        """
+        self.cancel_event.set()
+
+    def _run_job(self, job: DownloadJob):
+        try:
+            if self.cancel_event.is_set():
+                raise DownloadCancelled()
+
+            job.status = 'Downloading'
+            self._notify_progress(job)
+
+            last_notified = time.monotonic()
+
+            def progress(received: int, total: Optional[int]):
+                nonlocal last_notified
+                if self.cancel_event.is_set():
+                    raise DownloadCancelled()
+                job.bytes_received = received
+                job.total_bytes = total
+                now = time.monotonic()
+                if now - last_notified >= PROGRESS_INTERVAL:
+                    last_notified = now
+                    self._notify_progress(job)
+
+            job.path = self.epicor_service.download_attachment(job.case_number, job.filename, job.x_file_ref_num,
+                                                               progress=progress, raise_errors=True)
+            job.status = 'Done'
+        except DownloadCancelled:
+            job.status = 'Cancelled'
+        except Exception as e:
+            job.status = 'Failed'
+            job.error = str(e)
+            logger.error(f"Download of {job.filename} failed: {e}")
+        finally:
+            self._notify_progress(job)
+            with self._lock:
+                self._remaining -= 1
+                finished = self._remaining == 0
+            if finished:
+                self._notify_finished()
+
+    def _notify_progress(self, job: DownloadJob):
+        if self.on_progress:
+            self.on_progress(job)
+
+    def _notify_finished(self):
+        if self.on_finished:
+            self.on_finished(self.jobs)
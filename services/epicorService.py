@@ -3,19 +3,57 @@
 import os
 import requests
 import json
-import base64
+import tempfile
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Iterator
 from configparser import ConfigParser
 from services.loggingService import LoggingService
+from services.transportService import EpicorTransport
+from services.attachmentCacheService import AttachmentCache
+from services.singleFlightService import single_flight
+from services.caseStoreService import CaseStore, stored_case_read
+from services.caseCacheService import (CaseCache, cached_case_read, invalidates_case, invalidates_quote_case,
+                                       case_read_key)
+from services.batchService import ODataBatch
+from services.streamingService import (stream_base64_field_to_file, report_progress, UploadBody, DownloadCancelled,
+                                       STREAM_CHUNK_SIZE)
 
 logger = LoggingService.get_logger(__name__)
 
+# Case number and task sequence identify a CaseTasks row, so paging in this order never skips or repeats a row
+CASE_TASKS_KEY_ORDER = 'HDCase_HDCaseNum,Task_TaskSeqNum'
+
 
 class CaseNotFoundError(Exception):
     pass
 
 
+def odata_eq(field: str, value: Any) -> str:
+    """
+    Build an OData equality filter, quoting strings.
+    """
+    if isinstance(value, str):
+        value = "'" + value.replace("'", "''") + "'"
+    return f"{field} eq {value}"
+
+
+def build_odata_query(select: Optional[List[str]] = None, filter_expr: Optional[str] = None,
+                      orderby: Optional[str] = None, top: Optional[int] = None,
+                      skip: Optional[int] = None) -> Dict[str, str]:
+    params = {}
+    if select:
+        params['$select'] = ','.join(select)
+    if filter_expr:
+        params['$filter'] = filter_expr
+    if orderby:
+        params['$orderby'] = orderby
+    if top is not None:
+        params['$top'] = str(top)
+    if skip:
+        params['$skip'] = str(skip)
+    return params
+
+
 class EpicorService:
     def __init__(self):
         self.config = ConfigParser()
@@ -38,8 +76,13 @@ class EpicorService:
             "Content-Type": "application/json; charset=utf-8",
         }
 
+        # Every instance shares the same pooled, keep-alive connections
+        self.transport = EpicorTransport.get_instance()
+        self.attachment_cache = AttachmentCache.get_instance()
+        self.case_cache = CaseCache.get_instance()
+
     def post_request(self, endpoint: str, data: Dict) -> Dict:
-        response = requests.post(
+        response = self.transport.post(
             f"{self.BASE_URL}{endpoint}",
             headers=self.headers,
             data=json.dumps(data)
@@ -51,6 +94,9 @@ class EpicorService:
 
         return response_data
 
+    @cached_case_read
+    @stored_case_read('case_info')
+    @single_flight
     def get_case_info(self, case_number: int) -> Dict:
         logger.info(f"Retrieving case info for case {case_number}...")
         try:
@@ -71,6 +117,9 @@ class EpicorService:
             logger.error(f"Unexpected error in get_case_info for case {case_number}: {e}")
             raise
 
+    @cached_case_read
+    @stored_case_read('design_components', none_when_unreachable=True)
+    @single_flight
     def get_design_components(self, case_number: int) -> list[Any] | None:
         try:
             response_data = self.post_request("/api/v2/efx/100/CaseDev/GetCaseComponents", {'CaseNum': case_number})
@@ -78,10 +127,15 @@ class EpicorService:
                 raise Exception(response_data.get('Message'))
             design_components = response_data.get('CaseComponents', {}).get('DesignComponents', [])
             return design_components
+        except (requests.ConnectionError, requests.Timeout):
+            # Let stored_case_read fall back on the saved copy
+            raise
         except Exception as error:
             logger.error(f"Unable to retrieve components for case {case_number}: {str(error)}")
             return None
 
+    @cached_case_read
+    @single_flight
     def get_case_attachment_list(self, hd_case_num: int) -> Optional[List[Dict]]:
         try:
             response_data = self.post_request("/api/v2/odata/100/Erp.BO.HelpDeskSvc/GetByID",
@@ -95,6 +149,7 @@ class EpicorService:
         except Exception as error:
             raise Exception(f"Unable to retrieve attachments for case {hd_case_num}: {str(error)}")
 
+    @invalidates_case
     def update_design_components(self, case_number: int, design_components: List[Dict]) -> None:
         try:
             self.post_request("/api/v2/efx/100/CaseDev/AddDesignComponents",
@@ -107,35 +162,66 @@ class EpicorService:
             self.post_request("/api/v2/efx/100/CaseDev/UpdateCaseDesign", case_design_data)
         except Exception as error:
             logger.error(f"Unable to update case: {str(error)}")
+        finally:
+            CaseCache.get_instance().invalidate_all()
+            CaseStore.get_instance().delete_all_case_values()
 
-    def download_file(self, x_file_ref_num: int) -> Optional[bytes]:
+    def download_file_to_path(self, x_file_ref_num: int, dest_path: str) -> Optional[int]:
+        """
+        Stream an attachment from GetCaseAttachment straight to disk without holding it in memory.
+        Attachments already in the local cache are copied from there instead.
+        :param x_file_ref_num: Ref num for desired file
+        :param dest_path: Where to save the file
+        :return: Number of bytes written, or None if the file could not be downloaded
+        """
         try:
-            response_data = self.post_request("/api/v2/efx/100/CaseDev/GetCaseAttachment",
-                                              {'XFileRefNum': x_file_ref_num})
-            if response_data.get('Attachment'):
-                response_data.get('FileExtension')
-                base64_response = response_data.get('Attachment')
-                byte_array = base64.b64decode(base64_response)
-                return byte_array
-            else:
-                logger.error(f"No file found for xFileRefNum: {x_file_ref_num}")
-                return None
+            cached_size = self.attachment_cache.copy_to(x_file_ref_num, dest_path)
+            if cached_size is not None:
+                return cached_size
+
+            size = self.stream_base64_response("/api/v2/efx/100/CaseDev/GetCaseAttachment",
+                                               {'XFileRefNum': x_file_ref_num}, 'Attachment', dest_path)
+            self.attachment_cache.store(x_file_ref_num, dest_path)
+            return size
         except Exception as error:
-            logger.error(f"Error retrieving file: {str(error)}")
+            logger.error(f"Error retrieving file {x_file_ref_num}: {str(error)}")
             return None
 
+    def stream_base64_response(self, endpoint: str, data: Dict, field: str, dest_path: str,
+                               progress: Optional[Callable[[int, Optional[int]], None]] = None) -> int:
+        """
+        POST to an endpoint that returns a file as a base64 JSON field and decode the field to disk as it arrives.
+        :param endpoint: Endpoint path, relative to BASE_URL
+        :param data: JSON body
+        :param field: Name of the field holding the base64 file
+        :param dest_path: Where to save the file
+        :param progress: Called with (bytes received, total bytes or None) after each chunk. Raising from it
+                         aborts the download and removes the partial file.
+        :return: Number of bytes written
+        """
+        with self.transport.post(f"{self.BASE_URL}{endpoint}", headers=self.headers, json=data,
+                                 stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f'Status Code: {response.status_code}')
+            chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            if progress:
+                total = response.headers.get('Content-Length')
+                chunks = report_progress(chunks, progress, int(total) if total else None)
+            return stream_base64_field_to_file(chunks, field, dest_path)
+
+    @cached_case_read
+    @stored_case_read('case_attachments', none_when_unreachable=True)
+    @single_flight
     def get_case_by_id(self, case_number: int) -> Any | None:
 
         try:
-            response = requests.get(
+            response = self.transport.get(
                 url=self.BASE_ODATA_URL + "/Erp.BO.HelpDeskSvc/GetByID",
                 headers=self.headers,
                 params={"hdCaseNum": case_number}
             )
 
-            print(f"Status code: {response.status_code}")
-            print(f"Status message: {response.text}")
-            print(f"URL: {self.BASE_ODATA_URL}")
+            logger.debug(f"GetByID for case {case_number} returned {response.status_code}")
 
             if response.json():
                 if 'returnObj' in response.json():
@@ -146,45 +232,152 @@ class EpicorService:
             else:
                 logger.error(f'No case found for case number: {case_number}')
                 return None
+        except (requests.ConnectionError, requests.Timeout):
+            # Let stored_case_read fall back on the saved copy
+            raise
         except Exception as e:
             logger.error(f"Error retrieving case: {str(e)}")
             return None
 
-    def download_file_by_xRefNum(self, xFileRefNum: int) -> [bytes]:
+    def batch(self, max_requests: Optional[int] = None) -> ODataBatch:
         """
-        Download a file from Kinetic based on the xFileRefNum
-        :param xFileRefNum: Ref num for desired file
-        :return: File's bytes
+        Start an OData $batch. Queue calls with batch.get()/batch.post(), each returning a future, and send them in
+        one round trip with execute(), or by leaving a `with` block.
+        :param max_requests: Calls per $batch. Defaults to BATCH_MAX_REQUESTS from the config file.
         """
-        response = requests.post(
-            url=self.BASE_ODATA_URL + "/Ice.BO.AttachmentSvc/DownloadFile",
-            headers=self.headers,
-            json={"xFileRefNum": xFileRefNum}
-        )
+        return ODataBatch(self, max_requests)
 
-        if 'returnObj' not in response.json():
-            raise Exception(f'No file found for xFileRefNum: {xFileRefNum}')
+    def load_cases(self, case_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Fetch case info, design components and attachments for several cases in one $batch round trip. Results are
+        cached and saved like get_case_info, get_design_components and get_case_by_id would, so those calls don't
+        go back to Epicor afterwards.
+        :param case_numbers: Cases to load
+        :return: {case number: {'case_info', 'design_components', 'attachments'}}. Values that failed to load are
+                 None, and are left for the individual calls to retry or fall back on the saved copy.
+        Note: GetCaseStatus and GetCaseComponents are Epicor Functions (efx) calls. Putting them in an OData $batch
+        works against the fake server but hasn't been checked against a real Kinetic instance. If Kinetic refuses
+        them, those values come back None and the individual calls fetch them as before.
+        """
+        # result name -> (cached_case_read method it stands in for, CaseStore table)
+        reads = {
+            'case_info': ('get_case_info', 'case_info'),
+            'design_components': ('get_design_components', 'design_components'),
+            'attachments': ('get_case_by_id', 'case_attachments'),
+        }
 
-        return response.json()['returnObj']
+        cache = CaseCache.get_instance()
+        store = CaseStore.get_instance()
+        # Taken before the batch goes out, so nothing read before a write to the case is kept
+        generations = {case_number: (cache.generation(int(case_number)), store.generation(case_number))
+                       for case_number in case_numbers}
+        futures = {}
+        with self.batch() as batch:
+            for case_number in case_numbers:
+                futures[case_number] = {
+                    'case_info': batch.post(f"{self.EFX_PATH}/CaseDev/GetCaseStatus", {'CaseNum': case_number}),
+                    'design_components': batch.post(f"{self.EFX_PATH}/CaseDev/GetCaseComponents",
+                                                    {'CaseNum': case_number}),
+                    'attachments': batch.get(f"{self.ODATA_PATH}/Erp.BO.HelpDeskSvc/GetByID",
+                                             {'hdCaseNum': case_number}),
+                }
 
-    def save_attachment(self, case_number: int, filename: str, content: str):
-        try:
-            dir_path = os.path.join(self.DOC_PATH, str(case_number))
-            os.makedirs(dir_path, exist_ok=True)
-            full_path = os.path.join(dir_path, filename)
+        results = {}
+        for case_number, case_futures in futures.items():
+            values = {}
+            for name, future in case_futures.items():
+                try:
+                    response_data = future.result()
+                except Exception as e:
+                    logger.warning(f"Unable to load {name} for case {case_number} in batch: {e}")
+                    values[name] = None
+                    continue
+
+                if name == 'design_components':
+                    values[name] = response_data.get('CaseComponents', {}).get('DesignComponents', [])
+                elif name == 'attachments':
+                    values[name] = response_data.get('returnObj', {}).get('HDCaseAttch')
+                else:
+                    values[name] = response_data
+
+                if values[name] is not None:
+                    method_name, table = reads[name]
+                    cache_generation, store_generation = generations[case_number]
+                    cache.put(int(case_number), case_read_key(method_name, self.BASE_URL, case_number), values[name],
+                              cache_generation)
+                    store.save_case_value(table, case_number, values[name], store_generation)
+            results[case_number] = values
+        return results
+
+    def is_case_cached(self, case_number: int) -> bool:
+        """
+        Are case info, design components and attachments for the case all fresh in the case cache?
+        """
+        cache = CaseCache.get_instance()
+        return all(cache.contains(case_read_key(name, self.BASE_URL, case_number))
+                   for name in ('get_case_info', 'get_design_components', 'get_case_by_id'))
 
-            with open(full_path, 'wb') as f:
-                f.write(base64.b64decode(content))
+    def load_case(self, case_number: int) -> Dict[str, Any]:
+        """
+        Fetch everything the Files tab shows for a case in one round trip. See load_cases.
+        """
+        return self.load_cases([case_number])[case_number]
 
+    def download_file_by_xRefNum(self, xFileRefNum: int, dest_path: Optional[str] = None) -> str:
+        """
+        Download a file from Kinetic based on the xFileRefNum, streamed straight to disk.
+        Attachments already in the local cache are copied from there instead.
+        :param xFileRefNum: Ref num for desired file
+        :param dest_path: Where to save the file. Defaults to a file in the temp folder.
+        :return: Path to the saved file
+        """
+        dest_path = dest_path or os.path.join(tempfile.gettempdir(), f"attachment_{xFileRefNum}")
+        if self.attachment_cache.copy_to(xFileRefNum, dest_path) is None:
+            self.stream_base64_response(self.ODATA_PATH + "/Ice.BO.AttachmentSvc/DownloadFile",
+                                        {"xFileRefNum": xFileRefNum}, 'returnObj', dest_path)
+            self.attachment_cache.store(xFileRefNum, dest_path)
+        return dest_path
+
+    def download_attachment(self, case_number: int, filename: str, xFileRefNum: int,
+                            progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                            raise_errors: bool = False) -> Optional[str]:
+        """
+        Stream a file from Kinetic into the case folder. Memory use stays flat no matter how big the file is.
+        Attachments already in the local cache are copied from there instead.
+        :param case_number: Case the file belongs to
+        :param filename: Name to save the file as
+        :param xFileRefNum: Ref num for desired file
+        :param progress: See stream_base64_response
+        :param raise_errors: Raise instead of logging and returning None
+        :return: Path to the saved file, or None if it could not be downloaded
+        """
+        full_path = os.path.join(self.DOC_PATH, str(case_number), filename)
+        try:
+            cached_size = self.attachment_cache.copy_to(xFileRefNum, full_path)
+            if cached_size is not None:
+                if progress:
+                    progress(cached_size, cached_size)
+            else:
+                self.stream_base64_response(self.ODATA_PATH + "/Ice.BO.AttachmentSvc/DownloadFile",
+                                            {"xFileRefNum": xFileRefNum}, 'returnObj', full_path, progress)
+                self.attachment_cache.store(xFileRefNum, full_path)
             logger.info(f"Attachment saved at: {full_path}")
             return full_path
+        except DownloadCancelled:
+            logger.info(f"Download of attachment {xFileRefNum} cancelled")
+            if raise_errors:
+                raise
+            return None
         except Exception as e:
-            logger.error(f"Error saving attachment: {str(e)}")
+            logger.error(f"Error downloading attachment {xFileRefNum}: {str(e)}")
+            if raise_errors:
+                raise
             return None
 
+    @invalidates_case
     def upload_document_logic(self, case_num, file_name, doc_type, encoded_content):
         try:
-            response = requests.post(
+            response = self.transport.post(
                 url=self.BASE_EFX_URL + "/CaseTools/UploadCaseAttachment",
                 headers=self.headers,
                 json={
@@ -205,6 +398,27 @@ class EpicorService:
             logger.error('HTTP Request failed:', e)
             return None
 
+    @invalidates_case
+    def upload_files(self, case_num: int, files: List[Dict], encoded: Optional[List[bytes]] = None):
+        """
+        Upload files from disk to a case in one request. The body is encoded from each file handle as it is sent,
+        so memory use stays flat no matter how big the files are.
+        :param case_num: Case Num
+        :param files: Dicts with 'path', 'FileName' and 'DocType'
+        :param encoded: Each file's content already base64-encoded, e.g. by UploadBatch's encoding pool
+        :return: The response, or None if the request failed
+        """
+        try:
+            return self.transport.post(
+                url=self.BASE_EFX_URL + "/CaseTools/UploadCaseAttachment",
+                headers=self.headers,
+                data=UploadBody(case_num, files, encoded)
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f'HTTP Request failed: {e}')
+            return None
+
+    @invalidates_case
     def complete_current_case_task(self, case_num: int) -> bool:
         """
         Complete the current task on a case
@@ -219,6 +433,9 @@ class EpicorService:
         if response_data.get('Message') != "task update complete" or not response_data.get('HasActiveTask'):
             raise Exception(f'Failed to complete current task on case {case_num}.')
 
+        return response_data.get('HasActiveTask')
+
+    @invalidates_case
     def assign_current_case_task(self, case_num: int, assign_next_to_name: str):
         """
         Assign the current task on a case to the specified person.
@@ -230,6 +447,7 @@ class EpicorService:
         if response_data.get('Error'):
             raise Exception(response_data.get('Message'))
 
+    @invalidates_case
     def add_case_comment(self, case_num: int, comment: str):
         """
         Add a new comment to a case.
@@ -241,6 +459,7 @@ class EpicorService:
         if response_data.get('Error'):
             raise Exception(response_data.get('Message'))
 
+    @invalidates_case
     def update_case_part_and_price(self, case_num: int, quantity: float, unit_price: float):
         """
         Set and pricing on a case. Set part to 'DevCon'
@@ -256,6 +475,7 @@ class EpicorService:
             'UnitPrice': unit_price
         })
 
+    @invalidates_case
     def create_quote_for_case(self, case_number: int) -> int:
         """
         Creates a quote for the specified case.
@@ -270,17 +490,22 @@ class EpicorService:
                 raise Exception(response_data.get('Message'))
 
             logger.info(f"Created quote for case {case_number}")
-            return response_data.get('NewQuoteNum')
+            quote_number = response_data.get('NewQuoteNum')
+            CaseCache.get_instance().remember_quote(quote_number, case_number)
+            return quote_number
         except Exception as error:
-            raise Exception(f"Unable to create quote for case {case_number}: {str(error)}")
+            raise Exception(f"Unable to create quote for case {case_number}: {str(error)}") from error
 
-    def update_quote_for_case(self, quote_number: int, unit_price: float, qty: float, description: str):
+    @invalidates_quote_case
+    def update_quote_for_case(self, quote_number: int, unit_price: float, qty: float, description: str,
+                              raise_on_error: bool = False):
         """
         Apply pricing and description to a quote
         :param quote_number: Quote to update
         :param unit_price: Unit Price
         :param qty: Qty
         :param description: Description
+        :param raise_on_error: Raise instead of logging the error
         """
         try:
             response_data = self.post_request("/api/v2/efx/100/QuoteUpdater/UpdateQuote",
@@ -290,11 +515,15 @@ class EpicorService:
                 raise Exception(response_data.get('Message'))
         except Exception as error:
             logger.error(f"Unable to update quote {quote_number}: {str(error)}")
+            if raise_on_error:
+                raise
 
-    def mark_quote_as_quoted(self, quote_number: int):
+    @invalidates_quote_case
+    def mark_quote_as_quoted(self, quote_number: int, raise_on_error: bool = False):
         """
         Set the 'quoted' flag on a quote.
         :param quote_number: Quote Number
+        :param raise_on_error: Raise instead of logging the error
         """
         try:
             response_data = self.post_request("/api/v2/efx/100/CaseQuoteAutomation/QuoteQuote",
@@ -303,7 +532,10 @@ class EpicorService:
                 raise Exception(response_data.get('Message'))
         except Exception as error:
             logger.error(f"Unable to mark quote {quote_number} as quoted: {str(error)}")
+            if raise_on_error:
+                raise
 
+    @invalidates_case
     def attach_quote_pdf_to_case(self, case_number: int, quote_number: int, task_note):
         """
         Generates a PDF of the specified quote and attaches it to the case.
@@ -317,15 +549,46 @@ class EpicorService:
         if response_data.get('Error'):
             raise Exception(response_data.get('Message'))
 
-    def fetch_cases(self):
+    @single_flight
+    def fetch_cases(self, select: Optional[List[str]] = None, filter_expr: Optional[str] = None,
+                    orderby: Optional[str] = None, top: Optional[int] = None, skip: Optional[int] = None):
         """
-        Retrieve all pending dev cases for quoting
+        Retrieve all pending dev cases for quoting. The optional arguments are passed to the BAQ as OData query
+        options so the server does the projection, filtering and paging.
+        :param select: Columns to return ($select). All columns if omitted.
+        :param filter_expr: OData filter ($filter), e.g. odata_eq('SalesRep1_Name', 'Jane Doe')
+        :param orderby: Sort order ($orderby), e.g. 'HDCase_HDCaseNum desc'
+        :param top: Maximum rows to return ($top)
+        :param skip: Rows to skip ($skip)
         :return: Array of cases
         """
         endpoint = "/api/v2/odata/100/BaqSvc/CaseTasks/Data"
-        response = requests.get(f'{self.BASE_URL}{endpoint}', headers=self.headers)
+        params = build_odata_query(select, filter_expr, orderby, top, skip)
+        response = self.transport.get(f'{self.BASE_URL}{endpoint}', headers=self.headers, params=params)
 
         if response.status_code == 200:
             return response.json()['value']
         else:
             raise Exception(f'Status Code: {response.status_code}')
+
+    def iter_case_pages(self, page_size: int = 500, select: Optional[List[str]] = None,
+                        filter_expr: Optional[str] = None, orderby: Optional[str] = None) -> Iterator[List[Dict]]:
+        """
+        Retrieve pending dev cases one page at a time, yielding each page as soon as it arrives.
+        :param page_size: Rows per request
+        :param select: See fetch_cases
+        :param filter_expr: See fetch_cases
+        :param orderby: See fetch_cases. Defaults to CASE_TASKS_KEY_ORDER. Should end in columns unique per row,
+                        or rows that tie can swap between requests and be skipped or repeated.
+        :return: Iterator of case arrays
+        """
+        orderby = orderby or CASE_TASKS_KEY_ORDER
+        skip = 0
+        while True:
+            page = self.fetch_cases(select, filter_expr, orderby, top=page_size, skip=skip)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            skip += page_size
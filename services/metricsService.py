@@ -0,0 +1,167 @@
+# metricsService.py
+
+import os
+import csv
+import json
+import math
+import time
+import threading
+
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from services.loggingService import LoggingService
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_WINDOW_SIZE = 500
+DEFAULT_DUMP_INTERVAL = 300
+METRICS_FIELDS = ['endpoint', 'calls', 'errors', 'last_status', 'p50_ms', 'p95_ms', 'p99_ms',
+                  'avg_request_bytes', 'avg_response_bytes', 'total_request_bytes', 'total_response_bytes']
+
+_API_PREFIXES = ('/api/v2/efx/100/', '/api/v2/odata/100/')
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Short name for an Epicor URL, e.g. 'CaseDev/GetCaseStatus' or 'BaqSvc/CaseTasks/Data'.
+    """
+    path = urlparse(url).path
+    for prefix in _API_PREFIXES:
+        index = path.find(prefix)
+        if index != -1:
+            return path[index + len(prefix):]
+    return path
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class EndpointStats:
+    def __init__(self, window_size: int):
+        self.latencies = deque(maxlen=window_size)
+        self.calls = 0
+        self.errors = 0
+        self.last_status = None
+        self.total_request_bytes = 0
+        self.total_response_bytes = 0
+
+
+class MetricsService:
+    """
+    Rolling latency, payload size and status numbers for every Epicor endpoint the app calls.
+    Percentiles cover the last `window_size` calls per endpoint.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._stats: Dict[str, EndpointStats] = {}
+        self._dump_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def get_instance(cls) -> 'MetricsService':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def record(self, url: str, latency: float, request_bytes: int, response_bytes: int, status):
+        """
+        :param url: Request URL
+        :param latency: Seconds until the response headers arrived
+        :param request_bytes: Size of the request body
+        :param response_bytes: Size of the response body, if known
+        :param status: HTTP status code, or an exception name if the request failed
+        """
+        endpoint = endpoint_name(url)
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats(self.window_size)
+            stats.calls += 1
+            stats.latencies.append(latency)
+            stats.last_status = status
+            stats.total_request_bytes += request_bytes
+            stats.total_response_bytes += response_bytes
+            if not isinstance(status, int) or status >= 400:
+                stats.errors += 1
+
+    def snapshot(self) -> List[Dict]:
+        """
+        :return: One row per endpoint, slowest p95 first
+        """
+        with self._lock:
+            rows = []
+            for endpoint, stats in self._stats.items():
+                latencies = sorted(stats.latencies)
+                rows.append({
+                    'endpoint': endpoint,
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'last_status': stats.last_status,
+                    'p50_ms': _to_ms(percentile(latencies, 0.50)),
+                    'p95_ms': _to_ms(percentile(latencies, 0.95)),
+                    'p99_ms': _to_ms(percentile(latencies, 0.99)),
+                    'avg_request_bytes': stats.total_request_bytes // stats.calls,
+                    'avg_response_bytes': stats.total_response_bytes // stats.calls,
+                    'total_request_bytes': stats.total_request_bytes,
+                    'total_response_bytes': stats.total_response_bytes,
+                })
+        return sorted(rows, key=lambda row: row['p95_ms'] or 0, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def dump(self, directory: str) -> List[str]:
+        """
+        Write the current numbers to metrics.json and metrics.csv in directory.
+        :return: Paths written
+        """
+        os.makedirs(directory, exist_ok=True)
+        rows = self.snapshot()
+        json_path = os.path.join(directory, 'metrics.json')
+        csv_path = os.path.join(directory, 'metrics.csv')
+
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': time.time(), 'endpoints': rows}, f, indent=2)
+
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=METRICS_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return [json_path, csv_path]
+
+    def start_periodic_dump(self, directory: str = 'logs', interval: float = DEFAULT_DUMP_INTERVAL):
+        """
+        Dump the numbers to directory every `interval` seconds on a daemon thread.
+        """
+        if self._dump_thread is not None or interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump(directory)
+                except Exception as e:
+                    logger.error(f"Unable to write metrics: {e}")
+
+        self._dump_thread = threading.Thread(target=run, name='metrics-dump', daemon=True)
+        self._dump_thread.start()
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
@@ -0,0 +1,113 @@
+# prefetchService.py
+
+import os
+import threading
+import time
+
+from configparser import ConfigParser
+from typing import Optional
+from services.caseCacheService import CaseCache
+from services.loggingService import LoggingService
+from services.transportService import get_int_setting
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_PREFETCH_HOVER_MS = 250
+
+
+def get_prefetch_hover_delay() -> float:
+    """
+    Seconds the pointer has to rest on a case before it's prefetched. PREFETCH_HOVER_MS in the config file.
+    """
+    config = ConfigParser()
+    config.read(os.path.expanduser('~/.myapp.cfg'))
+    return get_int_setting(config, 'PREFETCH_HOVER_MS', DEFAULT_PREFETCH_HOVER_MS) / 1000
+
+
+class CasePrefetcher:
+    """
+    Loads the case the user is probably about to open into the case cache, so the Files tab doesn't have to wait
+    for Epicor. Only the latest request counts: asking for another case drops the one still waiting. A load already
+    on the wire is let finish, since its results are still worth caching.
+    Work happens one case at a time on a single background thread, so prefetching never competes with itself for
+    connections or rate limit tokens.
+    """
+
+    def __init__(self, epicor_service):
+        """
+        :param epicor_service: EpicorService to load cases with
+        """
+        self.epicor_service = epicor_service
+        self.prefetched = 0
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._case_number: Optional[int] = None
+        self._due_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def request(self, case_number: int, delay: float = 0):
+        """
+        Prefetch a case, replacing any request that hasn't started yet.
+        :param case_number: Case to load
+        :param delay: Seconds to wait first. A newer request or cancel() within the delay means it never happens.
+        """
+        if CaseCache.get_instance().ttl <= 0:
+            # Nowhere to keep the results
+            return
+        with self._condition:
+            if case_number == self._case_number:
+                # Already waiting. A sooner request (a selection after a hover) brings it forward, a later one
+                # doesn't push it back.
+                self._due_at = min(self._due_at, time.monotonic() + delay)
+                self._condition.notify()
+                return
+            self._generation += 1
+            self._case_number = case_number
+            self._due_at = time.monotonic() + delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='case-prefetch', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self):
+        """
+        Drop the waiting request, if any.
+        """
+        with self._condition:
+            self._generation += 1
+            self._case_number = None
+            self._condition.notify()
+
+    def _take_due_request(self):
+        """
+        Wait until the latest request is due, then hand it over.
+        :return: (case number, generation)
+        """
+        with self._condition:
+            while True:
+                if self._case_number is None:
+                    self._condition.wait()
+                    continue
+                remaining = self._due_at - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                case_number, self._case_number = self._case_number, None
+                return case_number, self._generation
+
+    def _is_current(self, generation: int) -> bool:
+        with self._condition:
+            return generation == self._generation
+
+    def _run(self):
+        while True:
+            case_number, generation = self._take_due_request()
+            try:
+                if not self._is_current(generation) or self.epicor_service.is_case_cached(case_number):
+                    continue
+                self.epicor_service.load_case(case_number)
+                self.prefetched += 1
+                logger.info(f"Prefetched case {case_number}")
+            except Exception as e:
+                # Opening the case will try again, and show the error if there is one
+                logger.warning(f"Prefetching case {case_number} failed: {e}")
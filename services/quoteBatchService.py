@@ -0,0 +1,356 @@
+# quoteBatchService.py
+
+import os
+import json
+import time
+import uuid
+import threading
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from services.loggingService import LoggingService
+from services.transportService import get_int_setting
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_QUOTE_JOURNAL_DIR = '~/.casetools/quote_batches'
+DEFAULT_QUOTE_WORKERS = 4
+
+# Steps of quoting a case, in order. Each is written to the journal once Epicor has confirmed it.
+QUOTE_STEPS = ['created', 'priced', 'quoted', 'attached']
+
+# Steps that can't safely be sent twice. An intent is journaled before sending them, so a crash mid-call is noticed.
+# If Epicor answers with an error instead, '<intent> failed' is journaled and the step can be tried again.
+UNREPEATABLE_STEPS = {'created': 'creating', 'attached': 'attaching'}
+
+
+class QuoteNeedsCheck(Exception):
+    pass
+
+
+class QuoteBatchCancelled(Exception):
+    pass
+
+
+def get_quote_journal_dir() -> str:
+    config = ConfigParser()
+    config.read(os.path.expanduser('~/.myapp.cfg'))
+    return os.path.expanduser(config.get('DEFAULT', 'QUOTE_JOURNAL_DIR', fallback='') or DEFAULT_QUOTE_JOURNAL_DIR)
+
+
+class CaseQuoteState:
+    def __init__(self, case_number: int):
+        self.case_number = case_number
+        self.quote_number: Optional[int] = None
+        self.steps: List[str] = []
+        self.intents: List[str] = []
+
+    @property
+    def is_complete(self) -> bool:
+        return 'attached' in self.steps
+
+    @property
+    def interrupted_step(self) -> Optional[str]:
+        """
+        A step that was sent to Epicor but never confirmed. We can't tell whether it happened.
+        """
+        for step, intent in UNREPEATABLE_STEPS.items():
+            unresolved = self.intents.count(intent) - self.intents.count(f'{intent} failed')
+            if unresolved > 0 and step not in self.steps:
+                return step
+        return None
+
+
+class QuoteJournal:
+    """
+    Append-only JSON Lines record of a quoting batch. The first line lists the batch's cases. Every step Epicor
+    confirms is appended and flushed to disk straight away, so a batch picks up where it stopped after a crash.
+    """
+
+    def __init__(self, path: str, case_numbers: List[int], created_at: float):
+        self.path = path
+        self.case_numbers = case_numbers
+        self.created_at = created_at
+        self.states: Dict[int, CaseQuoteState] = {case: CaseQuoteState(case) for case in case_numbers}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, case_numbers: List[int], journal_dir: Optional[str] = None) -> 'QuoteJournal':
+        """
+        Start a journal for a new batch.
+        """
+        journal_dir = journal_dir or get_quote_journal_dir()
+        os.makedirs(journal_dir, exist_ok=True)
+        created_at = time.time()
+        name = f"{datetime.fromtimestamp(created_at).strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.jsonl"
+        journal = cls(os.path.join(journal_dir, name), list(case_numbers), created_at)
+        journal._append({'batch': name, 'cases': journal.case_numbers, 'at': created_at})
+        return journal
+
+    @classmethod
+    def load(cls, path: str) -> 'QuoteJournal':
+        """
+        Read a journal back. A torn last line from a crash mid-write is ignored.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+        header = json.loads(lines[0])
+        journal = cls(path, header['cases'], header['at'])
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning(f"Ignoring damaged line in quote journal {path}")
+                continue
+            state = journal.states.get(entry['case'])
+            if state is None:
+                continue
+            if entry.get('quote') is not None:
+                state.quote_number = entry['quote']
+            if entry['step'] in QUOTE_STEPS:
+                state.steps.append(entry['step'])
+            else:
+                state.intents.append(entry['step'])
+        return journal
+
+    @classmethod
+    def find_unfinished(cls, journal_dir: Optional[str] = None) -> List['QuoteJournal']:
+        """
+        Journals of batches that have cases left to quote, oldest first.
+        """
+        journal_dir = journal_dir or get_quote_journal_dir()
+        if not os.path.isdir(journal_dir):
+            return []
+
+        journals = []
+        for name in sorted(os.listdir(journal_dir)):
+            if not name.endswith('.jsonl'):
+                continue
+            try:
+                journal = cls.load(os.path.join(journal_dir, name))
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                logger.warning(f"Unreadable quote journal {name}: {e}")
+                continue
+            if not journal.is_complete:
+                journals.append(journal)
+        return journals
+
+    @property
+    def is_complete(self) -> bool:
+        return all(state.is_complete for state in self.states.values())
+
+    def record(self, case_number: int, step: str, quote_number: Optional[int] = None):
+        """
+        Durably note that a step has been sent (an intent) or confirmed.
+        """
+        with self._lock:
+            state = self.states[case_number]
+            if quote_number is not None:
+                state.quote_number = quote_number
+            (state.steps if step in QUOTE_STEPS else state.intents).append(step)
+            self._append({'case': case_number, 'step': step, 'quote': quote_number, 'at': time.time()})
+
+    def _append(self, entry: Dict):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def archive(self):
+        """
+        Mark a finished journal as done so it's no longer offered for resuming.
+        """
+        os.replace(self.path, self.path + '.done')
+
+
+class QuoteBatchResult:
+    def __init__(self, state: CaseQuoteState, row: int):
+        self.state = state
+        self.row = row
+        self.status = 'Done' if state.is_complete else 'Queued'  # Queued, Running, Done, Failed, Check, Cancelled
+        self.error: Optional[str] = None
+
+    @property
+    def case_number(self) -> int:
+        return self.state.case_number
+
+    @property
+    def details(self) -> str:
+        if self.error:
+            return self.error
+        return ', '.join(self.state.steps)
+
+
+class QuoteBatch:
+    """
+    Creates, prices, marks quoted and attaches quotes for many cases on a bounded pool of worker threads, journaling
+    every step. Resuming from the journal skips confirmed steps and never creates a second quote for a case.
+    If a quote creation or PDF attach was sent but never confirmed, the case is flagged 'Check' for a person to look
+    at instead of risking a duplicate.
+    Callbacks run on the worker threads. UI callers should hop back to the UI thread themselves (wx.CallAfter).
+    """
+
+    def __init__(self, epicor_service, journal: QuoteJournal, max_workers: Optional[int] = None,
+                 on_case_changed: Optional[Callable[[QuoteBatchResult], None]] = None,
+                 on_finished: Optional[Callable[[List[QuoteBatchResult]], None]] = None):
+        """
+        :param epicor_service: EpicorService to quote with
+        :param journal: Journal of the batch, new or loaded
+        :param max_workers: Cases quoted at once. Defaults to QUOTE_WORKERS from the config file.
+        :param on_case_changed: Called with a case's result whenever its status changes
+        :param on_finished: Called once with every result when the batch is done or cancelled
+        """
+        if max_workers is None:
+            config = ConfigParser()
+            config.read(os.path.expanduser('~/.myapp.cfg'))
+            max_workers = get_int_setting(config, 'QUOTE_WORKERS', DEFAULT_QUOTE_WORKERS)
+
+        self.epicor_service = epicor_service
+        self.journal = journal
+        self.max_workers = max_workers
+        self.on_case_changed = on_case_changed
+        self.on_finished = on_finished
+        self.results = [QuoteBatchResult(journal.states[case_number], row)
+                        for row, case_number in enumerate(journal.case_numbers)]
+        self.cancel_event = threading.Event()
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._remaining > 0
+
+    def start(self):
+        """
+        Quote every case that isn't done yet and return immediately.
+        """
+        if self.is_running:
+            raise Exception('A quoting batch is already running')
+
+        pending = [result for result in self.results if result.status not in ('Done', 'Check')]
+        self.cancel_event.clear()
+        self._remaining = len(pending)
+        if not pending:
+            self._finish()
+            return
+
+        for result in pending:
+            result.status = 'Queued'
+            result.error = None
+            self._notify_case(result)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='quote-batch')
+        for result in pending:
+            executor.submit(self._run_case, result)
+        executor.shutdown(wait=False)
+
+    def cancel(self):
+        """
+        Stop starting new cases. Cases already running finish their current step and stop.
+        """
+        self.cancel_event.set()
+
+    def _run_case(self, result: QuoteBatchResult):
+        try:
+            result.status = 'Running'
+            self._notify_case(result)
+            self.quote_case(result.state)
+            result.status = 'Done'
+        except QuoteNeedsCheck as e:
+            result.status = 'Check'
+            result.error = str(e)
+        except QuoteBatchCancelled:
+            result.status = 'Cancelled'
+        except Exception as e:
+            result.status = 'Failed'
+            result.error = str(e)
+            logger.error(f"Quoting case {result.case_number} failed: {e}")
+        finally:
+            self._notify_case(result)
+            with self._lock:
+                self._remaining -= 1
+                finished = self._remaining == 0
+            if finished:
+                self._finish()
+
+    def quote_case(self, state: CaseQuoteState):
+        """
+        Run whichever steps of quoting the case aren't in the journal yet.
+        """
+        interrupted = state.interrupted_step
+        if interrupted == 'created':
+            raise QuoteNeedsCheck(f"A quote may have been created for case {state.case_number} before the batch "
+                                  f"stopped. Check the case's quotes, then quote it by hand.")
+        if interrupted == 'attached':
+            raise QuoteNeedsCheck(f"Quote {state.quote_number} may already be attached to case "
+                                  f"{state.case_number}. Check the case's attachments.")
+
+        case_number = state.case_number
+        service = self.epicor_service
+        case_info = None
+        if 'priced' not in state.steps:
+            case_info = service.get_case_info(case_number)
+            if not case_info:
+                raise Exception(f"Case {case_number} not found")
+
+        if 'created' not in state.steps:
+            self._check_cancelled()
+            quote_number = self._send_unrepeatable(state, 'created', service.create_quote_for_case, case_number)
+            if not quote_number:
+                raise QuoteNeedsCheck(f"Epicor didn't return a quote number for case {case_number}")
+            self.journal.record(case_number, 'created', quote_number)
+
+        quote_number = state.quote_number
+        if 'priced' not in state.steps:
+            self._check_cancelled()
+            qty = case_info.get('Qty')
+            unit_price = case_info.get('UnitPrice')
+            case_description = (case_info.get('CaseDescription') or '').split('\n')[0]
+            if not all([qty, unit_price, case_description]):
+                raise Exception(f'Invalid data for case {case_number}: Qty={qty}, UnitPrice={unit_price}, '
+                                f'CaseDescription={case_description}')
+            service.update_quote_for_case(quote_number, unit_price, qty, case_description, raise_on_error=True)
+            self.journal.record(case_number, 'priced', quote_number)
+
+        if 'quoted' not in state.steps:
+            self._check_cancelled()
+            service.mark_quote_as_quoted(quote_number, raise_on_error=True)
+            self.journal.record(case_number, 'quoted', quote_number)
+
+        if 'attached' not in state.steps:
+            self._check_cancelled()
+            self._send_unrepeatable(state, 'attached', service.attach_quote_pdf_to_case, case_number, quote_number,
+                                    f'{case_number}-{quote_number}-{datetime.now()}')
+            self.journal.record(case_number, 'attached', quote_number)
+
+    def _send_unrepeatable(self, state: CaseQuoteState, step: str, call: Callable, *args):
+        """
+        Journal the intent to run a step, then run it. If Epicor answers with an error the intent is withdrawn.
+        If the call is lost on the network, the intent stays and the case will need checking.
+        """
+        intent = UNREPEATABLE_STEPS[step]
+        self.journal.record(state.case_number, intent, state.quote_number)
+        try:
+            return call(*args)
+        except Exception as e:
+            if not isinstance(e, requests.RequestException) and not isinstance(e.__cause__, requests.RequestException):
+                self.journal.record(state.case_number, f'{intent} failed', state.quote_number)
+            raise
+
+    def _check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise QuoteBatchCancelled()
+
+    def _finish(self):
+        if self.journal.is_complete:
+            self.journal.archive()
+        if self.on_finished:
+            self.on_finished(self.results)
+
+    def _notify_case(self, result: QuoteBatchResult):
+        if self.on_case_changed:
+            self.on_case_changed(result)
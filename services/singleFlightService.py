@@ -0,0 +1,65 @@
+# singleFlightService.py
+
+import functools
+import threading
+
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent calls into one. While a call for a key is in flight, other callers with the same
+    key wait for it and get the same result (or exception) instead of making their own call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_shared_flight = SingleFlight()
+
+
+def single_flight(method: Callable) -> Callable:
+    """
+    Decorator for EpicorService read methods. Identical calls in flight at the same time, from any instance, share
+    one HTTP request. Callers share the returned object too, so treat it as read-only.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, self.BASE_URL, repr(args), repr(sorted(kwargs.items())))
+        return _shared_flight.do(key, method, self, *args, **kwargs)
+
+    return wrapper
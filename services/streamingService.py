@@ -0,0 +1,245 @@
+# streamingService.py
+
+import os
+import re
+import json
+import base64
+import tempfile
+
+from typing import AsyncIterable, Iterable, Iterator, List, Dict, Optional, Callable
+
+# Bytes read from the network per iteration. Memory use is a small multiple of this no matter how big the file is.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bytes read from disk per iteration when uploading. A multiple of 3 so every chunk base64-encodes without padding.
+UPLOAD_READ_SIZE = 48 * 1024
+
+# How much of a response we keep around to report an error when the field we want isn't in it
+ERROR_BODY_LIMIT = 64 * 1024
+
+_JSON_ESCAPES = {b'/': b'/', b'\\': b'', b'n': b'', b'r': b'', b't': b''}
+_ESCAPE_PATTERN = re.compile(rb'\\(.)', re.DOTALL)
+
+
+def _unescape(match: re.Match) -> bytes:
+    escaped = match.group(1)
+    if escaped not in _JSON_ESCAPES:
+        raise ValueError(f"Unexpected escape sequence in base64 content: \\{escaped.decode(errors='replace')}")
+    return _JSON_ESCAPES[escaped]
+
+
+class AtomicFileWriter:
+    """
+    Writes to a temp file next to the destination and renames it into place on commit(), so a failed or
+    cancelled download never leaves a half-written file under the real name.
+    """
+
+    def __init__(self, dest_path: str):
+        self.dest_path = dest_path
+        dir_path = os.path.dirname(dest_path) or '.'
+        os.makedirs(dir_path, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=dir_path, prefix='.', suffix='.part')
+        self.file = os.fdopen(fd, 'wb')
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        self.file.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self) -> str:
+        self.file.close()
+        os.replace(self.temp_path, self.dest_path)
+        return self.dest_path
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class Base64FieldDecoder:
+    """
+    Incrementally pulls one base64 string field out of a JSON document and decodes it to a writer.
+    Only the field value is decoded; everything before it is scanned in a small rolling buffer.
+    """
+
+    def __init__(self, field: str, writer: AtomicFileWriter):
+        self.writer = writer
+        self.key_pattern = re.compile(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"')
+        self.field = field
+        self.state = 'search'  # search -> value -> done
+        self.scan_buffer = b''
+        self.head = b''
+        self.pending_escape = b''
+        self.base64_buffer = b''
+
+    def feed(self, chunk: bytes):
+        if self.state == 'done' or not chunk:
+            return
+
+        if self.state == 'search':
+            if len(self.head) < ERROR_BODY_LIMIT:
+                self.head += chunk[:ERROR_BODY_LIMIT - len(self.head)]
+
+            self.scan_buffer += chunk
+            match = self.key_pattern.search(self.scan_buffer)
+            if not match:
+                # Keep enough of the tail to match a key split across two chunks
+                self.scan_buffer = self.scan_buffer[-256:]
+                return
+
+            chunk = self.scan_buffer[match.end():]
+            self.scan_buffer = b''
+            self.state = 'value'
+
+        end = chunk.find(b'"')
+        if end != -1:
+            chunk = chunk[:end]
+        self._decode(chunk)
+
+        if end != -1:
+            self._flush()
+            self.state = 'done'
+
+    def _decode(self, chunk: bytes):
+        chunk = self.pending_escape + chunk
+        self.pending_escape = b''
+        trailing_backslashes = len(chunk) - len(chunk.rstrip(b'\\'))
+        if trailing_backslashes % 2:
+            # Escape sequence split across chunks. Finish it with the next one.
+            self.pending_escape = b'\\'
+            chunk = chunk[:-1]
+
+        self.base64_buffer += _ESCAPE_PATTERN.sub(_unescape, chunk)
+
+        # Decode whole 4 character groups only. The remainder waits for the next chunk.
+        usable = len(self.base64_buffer) - len(self.base64_buffer) % 4
+        if usable:
+            self.writer.write(base64.b64decode(self.base64_buffer[:usable], validate=True))
+            self.base64_buffer = self.base64_buffer[usable:]
+
+    def _flush(self):
+        if self.base64_buffer:
+            self.writer.write(base64.b64decode(self.base64_buffer, validate=True))
+            self.base64_buffer = b''
+
+    def close(self):
+        if self.state == 'done':
+            return
+
+        if self.state == 'value':
+            raise ValueError(f"Response ended before the end of the '{self.field}' field")
+
+        # We never saw the field. Epicor usually told us why.
+        try:
+            message = json.loads(self.head).get('Message')
+        except (ValueError, AttributeError):
+            message = None
+        raise KeyError(message or f"'{self.field}' not found in response")
+
+
+class DownloadCancelled(Exception):
+    """
+    Raised from a progress callback to stop a download part way.
+    """
+    pass
+
+
+def report_progress(chunks: Iterable[bytes], progress: Callable[[int, Optional[int]], None],
+                    total: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Pass chunks through unchanged, calling progress(bytes so far, total) after each one.
+    """
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        yield chunk
+        progress(received, total)
+
+
+def stream_base64_field_to_file(chunks: Iterable[bytes], field: str, dest_path: str) -> int:
+    """
+    Decode a base64 field of a streamed JSON response straight to disk.
+    :param chunks: Response body chunks, e.g. response.iter_content()
+    :param field: Name of the JSON field holding the base64 content
+    :param dest_path: Where to save the decoded file
+    :return: Number of bytes written
+    """
+    writer = AtomicFileWriter(dest_path)
+    try:
+        decoder = Base64FieldDecoder(field, writer)
+        for chunk in chunks:
+            decoder.feed(chunk)
+        decoder.close()
+        writer.commit()
+        return writer.bytes_written
+    except BaseException:
+        writer.abort()
+        raise
+
+
+async def stream_base64_field_to_file_async(chunks: AsyncIterable[bytes], field: str, dest_path: str) -> int:
+    """
+    stream_base64_field_to_file for a response read by a coroutine, e.g. aiohttp's response.content.iter_chunked().
+    """
+    writer = AtomicFileWriter(dest_path)
+    try:
+        decoder = Base64FieldDecoder(field, writer)
+        async for chunk in chunks:
+            decoder.feed(chunk)
+        decoder.close()
+        writer.commit()
+        return writer.bytes_written
+    except BaseException:
+        writer.abort()
+        raise
+
+
+class UploadBody:
+    """
+    Lazily produces the JSON body for CaseTools/UploadCaseAttachment, base64-encoding each file from disk as it is
+    sent. The exact length is known up front, so requests sends a normal Content-Length instead of chunking.
+    """
+
+    def __init__(self, case_num: int, files: List[Dict], encoded: Optional[List[bytes]] = None):
+        """
+        :param case_num: Case to attach the files to
+        :param files: Dicts with 'path', 'FileName' and 'DocType'
+        :param encoded: Each file's content, already base64-encoded. The files aren't read again if given.
+        """
+        self.case_num = int(case_num)
+        self.files = files
+        self.encoded = encoded
+        if encoded is not None:
+            self.sizes = [len(content) * 3 // 4 for content in encoded]
+        else:
+            self.sizes = [os.path.getsize(file['path']) for file in files]
+
+    def _file_prefix(self, index: int) -> bytes:
+        file = self.files[index]
+        separator = ', ' if index else ''
+        return (f'{separator}{{"DocType": {json.dumps(file["DocType"])}, '
+                f'"FileName": {json.dumps(file["FileName"])}, "FileBytes": "').encode()
+
+    def _body_prefix(self) -> bytes:
+        return f'{{"CaseNum": {self.case_num}, "Attachments": {{"Files": ['.encode()
+
+    def __len__(self) -> int:
+        length = len(self._body_prefix()) + len(b']}}')
+        for index, size in enumerate(self.sizes):
+            encoded_size = len(self.encoded[index]) if self.encoded is not None else 4 * ((size + 2) // 3)
+            length += len(self._file_prefix(index)) + encoded_size + len(b'"}')
+        return length
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._body_prefix()
+        for index, file in enumerate(self.files):
+            yield self._file_prefix(index)
+            if self.encoded is not None:
+                yield self.encoded[index]
+            else:
+                with open(file['path'], 'rb') as f:
+                    while chunk := f.read(UPLOAD_READ_SIZE):
+                        yield base64.b64encode(chunk)
+            yield b'"}'
+        yield b']}}'
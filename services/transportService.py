@@ -0,0 +1,282 @@
+# transportService.py
+
+import os
+import time
+import random
+import asyncio
+import threading
+import requests
+
+from typing import Dict, Optional, Tuple
+from configparser import ConfigParser
+from requests.adapters import HTTPAdapter
+from services.loggingService import LoggingService
+from services.metricsService import MetricsService
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 10
+
+DEFAULT_CONNECT_TIMEOUT = 5
+# Read timeout in seconds for each endpoint class
+DEFAULT_READ_TIMEOUTS = {
+    'read': 30,
+    'list': 60,
+    'write': 60,
+    'download': 300,
+    'upload': 600,
+}
+# Only these classes are safe to send twice
+IDEMPOTENT_CLASSES = {'read', 'list', 'download'}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+DEFAULT_RATE_LIMIT = 20
+
+
+def get_int_setting(config: ConfigParser, key: str, default: int) -> int:
+    value = config.get('DEFAULT', key, fallback='')
+    try:
+        return int(value) if value else default
+    except ValueError:
+        logger.warning(f"Invalid value for {key}: {value}. Using {default}")
+        return default
+
+
+def get_float_setting(config: ConfigParser, key: str, default: float) -> float:
+    value = config.get('DEFAULT', key, fallback='')
+    try:
+        return float(value) if value else default
+    except ValueError:
+        logger.warning(f"Invalid value for {key}: {value}. Using {default}")
+        return default
+
+
+def classify_endpoint(method: str, url: str) -> str:
+    """
+    Work out the endpoint class of a request, which decides its timeouts and whether it may be retried.
+    :return: One of 'read', 'list', 'write', 'download' or 'upload'
+    """
+    if 'GetCaseAttachment' in url or 'DownloadFile' in url:
+        return 'download'
+    if 'UploadCaseAttachment' in url:
+        return 'upload'
+    if 'BaqSvc' in url:
+        return 'list'
+    if method.upper() == 'GET' or any(name in url for name in ('GetCaseStatus', 'GetCaseComponents', 'GetByID')):
+        return 'read'
+    return 'write'
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is free, holding callers to `rate` requests per second
+    on average with bursts of up to `capacity`. Coroutines use acquire_async(), which waits without blocking the
+    event loop and draws on the same tokens.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """
+        Take a token if one is free.
+        :return: 0 if a token was taken, otherwise seconds until the next one is due
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while wait := self._take():
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        if self.rate <= 0:
+            return
+        while wait := self._take():
+            await asyncio.sleep(wait)
+
+
+class TransportPolicy:
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeouts: Optional[Dict[str, float]] = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE, backoff_max: float = DEFAULT_BACKOFF_MAX):
+        """
+        :param connect_timeout: Seconds to wait for a connection
+        :param read_timeouts: Seconds to wait for data, per endpoint class
+        :param max_retries: Retries for idempotent requests that fail with a connection error or transient status
+        :param backoff_base: The first retry waits up to this many seconds, doubling with each attempt
+        :param backoff_max: Longest wait between retries
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeouts = dict(DEFAULT_READ_TIMEOUTS, **(read_timeouts or {}))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> 'TransportPolicy':
+        read_timeouts = {
+            endpoint_class: get_float_setting(config, f'HTTP_READ_TIMEOUT_{endpoint_class.upper()}', default)
+            for endpoint_class, default in DEFAULT_READ_TIMEOUTS.items()
+        }
+        return cls(
+            connect_timeout=get_float_setting(config, 'HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+            read_timeouts=read_timeouts,
+            max_retries=get_int_setting(config, 'HTTP_MAX_RETRIES', DEFAULT_MAX_RETRIES),
+        )
+
+    def timeout_for(self, endpoint_class: str) -> Tuple[float, float]:
+        return self.connect_timeout, self.read_timeouts.get(endpoint_class, self.read_timeouts['write'])
+
+    def backoff_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """
+        Exponential backoff with full jitter. A Retry-After header from the server wins when present.
+        :param attempt: 0 for the first retry
+        :param response: The failed response, if there was one. Anything with response headers will do.
+        """
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class EpicorTransport:
+    """
+    Process-wide HTTP transport shared by every EpicorService instance.
+    Connections to Epicor are pooled and kept alive, so consecutive calls reuse the same TCP/TLS connection.
+    Every request gets the timeouts of its endpoint class and waits its turn on the shared rate limiter.
+    Idempotent requests are retried with backoff when Epicor hiccups.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = False, policy: Optional[TransportPolicy] = None,
+                 rate_limit: float = DEFAULT_RATE_LIMIT, rate_burst: Optional[float] = None):
+        """
+        :param pool_connections: Number of hosts to keep connection pools for
+        :param pool_maxsize: Maximum connections kept open per host
+        :param pool_block: Wait for a free connection instead of opening an extra one past pool_maxsize
+        :param policy: Timeouts and retries. Defaults to TransportPolicy()
+        :param rate_limit: Requests per second across the whole process. 0 for no limit.
+        :param rate_burst: Requests allowed back to back before the limit kicks in. Defaults to rate_limit.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.policy = policy or TransportPolicy()
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst or max(rate_limit, 1))
+
+        self.session = requests.Session()
+        self.session.headers.update({"Connection": "keep-alive"})
+
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_config(cls) -> 'EpicorTransport':
+        config = ConfigParser()
+        config.read(os.path.expanduser('~/.myapp.cfg'))
+        return cls(
+            pool_connections=get_int_setting(config, 'HTTP_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS),
+            pool_maxsize=get_int_setting(config, 'HTTP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE),
+            pool_block=config.getboolean('DEFAULT', 'HTTP_POOL_BLOCK', fallback=False),
+            policy=TransportPolicy.from_config(config),
+            rate_limit=get_float_setting(config, 'HTTP_RATE_LIMIT', DEFAULT_RATE_LIMIT),
+            rate_burst=get_float_setting(config, 'HTTP_RATE_BURST', 0) or None,
+        )
+
+    @classmethod
+    def get_instance(cls) -> 'EpicorTransport':
+        """
+        Return the shared transport, creating it from the config file on first use.
+        """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls.from_config()
+                    logger.info(f"Created HTTP transport: pool_connections={cls._instance.pool_connections} "
+                                f"pool_maxsize={cls._instance.pool_maxsize}")
+        return cls._instance
+
+    def request(self, method: str, url: str, endpoint_class: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        Send a request under the transport policy.
+        :param method: HTTP method
+        :param url: Full URL
+        :param endpoint_class: Overrides classify_endpoint()
+        :param kwargs: Passed to requests. An explicit timeout wins over the policy's.
+        """
+        endpoint_class = endpoint_class or classify_endpoint(method, url)
+        kwargs.setdefault('timeout', self.policy.timeout_for(endpoint_class))
+        max_retries = self.policy.max_retries if endpoint_class in IDEMPOTENT_CLASSES else 0
+
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.timed_request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries:
+                    raise
+                delay = self.policy.backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({e}). Retry {attempt + 1} of {max_retries} in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+                delay = self.policy.backoff_delay(attempt, response)
+                logger.warning(f"{method} {url} returned {response.status_code}. "
+                               f"Retry {attempt + 1} of {max_retries} in {delay:.1f}s")
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def timed_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send one request and record its latency, payload sizes and status with the MetricsService.
+        """
+        started_at = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception as e:
+            MetricsService.get_instance().record(url, time.perf_counter() - started_at, 0, 0, type(e).__name__)
+            raise
+
+        latency = time.perf_counter() - started_at
+        body = response.request.body
+        request_bytes = len(body) if body is not None and hasattr(body, '__len__') else 0
+        if kwargs.get('stream'):
+            # The body hasn't been read yet. Go by what the server says it will send.
+            response_bytes = int(response.headers.get('Content-Length') or 0)
+        else:
+            response_bytes = len(response.content)
+        MetricsService.get_instance().record(url, latency, request_bytes, response_bytes, response.status_code)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
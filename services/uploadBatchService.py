@@ -0,0 +1,295 @@
+# uploadBatchService.py
+
+import os
+import base64
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from typing import Callable, List, Optional
+from services.loggingService import LoggingService
+from services.transportService import get_int_setting
+from services.uploadManifestService import UploadManifest
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_UPLOAD_BATCH_KB = 8 * 1024
+DEFAULT_UPLOAD_ENCODE_WORKERS = 4
+
+
+class UploadFileResult:
+    def __init__(self, path: str, row: Optional[int] = None):
+        """
+        :param path: File to upload
+        :param row: Caller's row/index for the file, handy for updating a list
+        """
+        self.path = path
+        self.file_name = os.path.basename(path)
+        self.row = row
+        self.size = os.path.getsize(path)
+        self.status = 'Queued'  # Queued, Checking, Encoding, Uploading, Done, Skipped, Failed, Cancelled
+        self.batch: Optional[int] = None
+        self.error: Optional[str] = None
+        self.content_hash: Optional[str] = None
+        self.duplicate_of: Optional[str] = None
+        self.duplicate_in_upload = False
+
+    @property
+    def details(self) -> str:
+        if self.error:
+            return self.error
+        if self.duplicate_of:
+            if self.duplicate_in_upload:
+                return f"Same as {self.duplicate_of} in this upload"
+            return f"Already on the case as {self.duplicate_of}"
+        if self.batch is None:
+            return ''
+        return f"Request {self.batch + 1}"
+
+
+def plan_upload_batches(results: List[UploadFileResult], max_batch_bytes: int) -> List[List[UploadFileResult]]:
+    """
+    Group files, in order, into requests of at most max_batch_bytes each. A file bigger than that on its own gets a
+    request to itself.
+    """
+    batches = []
+    batch, batch_bytes = [], 0
+    for result in results:
+        if batch and batch_bytes + result.size > max_batch_bytes:
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(result)
+        batch_bytes += result.size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def encode_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return base64.b64encode(f.read())
+
+
+class UploadBatch:
+    """
+    Uploads many files to a case with CaseTools/UploadCaseAttachment, several files per request. Requests are sent
+    one after another, while a pool of worker threads reads and base64-encodes the next request's files. At most two
+    requests' worth of encoded files are held in memory. A file too big to share a request is streamed from disk
+    instead. Given an UploadManifest, files whose content is already on the case are skipped.
+    Callbacks run on the worker threads. UI callers should hop back to the UI thread themselves (wx.CallAfter).
+    """
+
+    def __init__(self, epicor_service, case_number: int, paths: List[str], doc_type: str,
+                 max_batch_bytes: Optional[int] = None, max_workers: Optional[int] = None,
+                 manifest: Optional[UploadManifest] = None,
+                 on_file_changed: Optional[Callable[[UploadFileResult], None]] = None,
+                 on_finished: Optional[Callable[[List[UploadFileResult]], None]] = None):
+        """
+        :param epicor_service: EpicorService to upload with
+        :param case_number: Case to attach the files to
+        :param paths: Files to upload
+        :param doc_type: Doc type for every file, e.g. OGDocs or Supp
+        :param max_batch_bytes: Most file bytes sent in one request. Defaults to UPLOAD_BATCH_KB from the config file.
+        :param max_workers: Files encoded at once. Defaults to UPLOAD_ENCODE_WORKERS from the config file.
+        :param manifest: Skip files already on the case, and record the ones uploaded. Everything is sent if None.
+        :param on_file_changed: Called with a file's result whenever its status changes
+        :param on_finished: Called once with every result when the upload is done or cancelled
+        """
+        if max_batch_bytes is None or max_workers is None:
+            config = ConfigParser()
+            config.read(os.path.expanduser('~/.myapp.cfg'))
+            if max_batch_bytes is None:
+                max_batch_bytes = get_int_setting(config, 'UPLOAD_BATCH_KB', DEFAULT_UPLOAD_BATCH_KB) * 1024
+            if max_workers is None:
+                max_workers = get_int_setting(config, 'UPLOAD_ENCODE_WORKERS', DEFAULT_UPLOAD_ENCODE_WORKERS)
+
+        self.epicor_service = epicor_service
+        self.case_number = case_number
+        self.doc_type = doc_type
+        self.max_batch_bytes = max_batch_bytes
+        self.max_workers = max_workers
+        self.manifest = manifest
+        self.on_file_changed = on_file_changed
+        self.on_finished = on_finished
+        self.results = [UploadFileResult(path, row) for row, path in enumerate(paths)]
+        self.cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """
+        Upload every file that isn't Done yet and return immediately. Calling it again after a run retries the rest.
+        """
+        if self.is_running:
+            raise Exception('An upload is already running')
+
+        pending = [result for result in self.results if result.status not in ('Done', 'Skipped')]
+        self.cancel_event.clear()
+        for result in pending:
+            result.status = 'Queued'
+            result.error = None
+            self._notify_file(result)
+
+        self._thread = threading.Thread(target=self._run, args=(pending,), name='upload-batch', daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """
+        Stop before the next request. The request being sent finishes.
+        """
+        self.cancel_event.set()
+
+    def _run(self, pending: List[UploadFileResult]):
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='upload-encode')
+        try:
+            if self.manifest is not None:
+                pending = self._skip_duplicates(executor, pending)
+            batches = plan_upload_batches(pending, self.max_batch_bytes)
+            encodings = self._encode(executor, batches[0]) if batches else None
+            for index, batch in enumerate(batches):
+                if self.cancel_event.is_set():
+                    for result in batch:
+                        result.status = 'Cancelled'
+                        self._notify_file(result)
+                    continue
+
+                # Get the next request's files encoding while this one waits for the server
+                stream, futures = encodings
+                encoded = None if stream else [future.result() for future in futures]
+                if index + 1 < len(batches):
+                    encodings = self._encode(executor, batches[index + 1])
+                self._send(index, batch, encoded)
+        except Exception as e:
+            logger.error(f"Upload to case {self.case_number} failed: {e}")
+            for result in pending:
+                if result.status not in ('Done', 'Skipped', 'Failed', 'Cancelled'):
+                    result.status = 'Failed'
+                    result.error = str(e)
+                    self._notify_file(result)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._thread = None
+            if self.on_finished:
+                self.on_finished(self.results)
+
+    def _skip_duplicates(self, executor: ThreadPoolExecutor,
+                         pending: List[UploadFileResult]) -> List[UploadFileResult]:
+        """
+        Mark files whose content is already on the case, or earlier in this upload, as Skipped.
+        :return: The files still to send
+        """
+        for result in pending:
+            result.status = 'Checking'
+            self._notify_file(result)
+
+        remote_hashes = self.manifest.get_remote_hashes(self.case_number,
+                                                        self.epicor_service.get_case_by_id(self.case_number))
+        checks = [executor.submit(self.manifest.find_duplicate, result.path, remote_hashes) for result in pending]
+
+        to_send = []
+        selected = {}
+        for result, check in zip(pending, checks):
+            try:
+                result.content_hash, result.duplicate_of = check.result()
+            except OSError as e:
+                result.status = 'Failed'
+                result.error = f"Unable to read file: {e}"
+                self._notify_file(result)
+                continue
+            if result.duplicate_of is None and result.content_hash in selected:
+                result.duplicate_of = selected[result.content_hash]
+                result.duplicate_in_upload = True
+            if result.duplicate_of is not None:
+                result.status = 'Skipped'
+                logger.info(f"Skipped {result.file_name} uploading to case {self.case_number}: {result.details}")
+                self._notify_file(result)
+                continue
+            selected[result.content_hash] = result.file_name
+            result.status = 'Queued'
+            self._notify_file(result)
+            to_send.append(result)
+
+        self.manifest.save()
+        return to_send
+
+    def _encode(self, executor: ThreadPoolExecutor, batch: List[UploadFileResult]):
+        """
+        :return: (stream, futures). stream is True for a lone file too big to encode up front, which is streamed from
+                 disk instead. Otherwise there is a future per file.
+        """
+        if len(batch) == 1 and batch[0].size > self.max_batch_bytes:
+            return True, []
+        for result in batch:
+            result.status = 'Encoding'
+            self._notify_file(result)
+        return False, [executor.submit(self._encode_file, result) for result in batch]
+
+    def _encode_file(self, result: UploadFileResult) -> Optional[bytes]:
+        try:
+            return encode_file(result.path)
+        except OSError as e:
+            result.status = 'Failed'
+            result.error = f"Unable to read file: {e}"
+            logger.error(f"Unable to read {result.path}: {e}")
+            self._notify_file(result)
+            return None
+
+    def _send(self, index: int, batch: List[UploadFileResult], encoded: Optional[List[Optional[bytes]]]):
+        """
+        :param encoded: Each file's encoded content, None where it couldn't be read. None to stream from disk.
+        """
+        if encoded is None:
+            sending = [result for result in batch if result.status != 'Failed']
+        else:
+            # Files that couldn't be read are already marked Failed. Send the rest.
+            kept = [(result, content) for result, content in zip(batch, encoded)
+                    if content is not None and result.status != 'Failed']
+            sending = [result for result, _ in kept]
+            encoded = [content for _, content in kept]
+        if not sending:
+            return
+
+        for result in sending:
+            result.status = 'Uploading'
+            result.batch = index
+            self._notify_file(result)
+
+        files = [{'path': result.path, 'FileName': result.file_name, 'DocType': self.doc_type} for result in sending]
+        try:
+            error = self._upload_error(self.epicor_service.upload_files(self.case_number, files, encoded))
+        except OSError as e:
+            # Reading a streamed file failed part way. Only this request is lost.
+            logger.error(f"Unable to read files for upload to case {self.case_number}: {e}")
+            error = f"Unable to read file: {e}"
+        for result in sending:
+            result.status = 'Failed' if error else 'Done'
+            result.error = error
+            if not error and self.manifest is not None and result.content_hash:
+                self.manifest.record_upload(self.case_number, result.file_name, result.content_hash)
+            self._notify_file(result)
+        if not error and self.manifest is not None:
+            self.manifest.save()
+
+    @staticmethod
+    def _upload_error(response) -> Optional[str]:
+        """
+        :return: Why the upload failed, or None if it worked
+        """
+        if response is None:
+            return 'HTTP request failed'
+        if response.status_code != 200:
+            return f"Server responded with: {response.status_code}"
+        try:
+            response_data = response.json()
+        except ValueError:
+            return None
+        if isinstance(response_data, dict) and response_data.get('Error'):
+            return response_data.get('Message') or 'Upload failed'
+        return None
+
+    def _notify_file(self, result: UploadFileResult):
+        if self.on_file_changed:
+            self.on_file_changed(result)
@@ -0,0 +1,163 @@
+# uploadManifestService.py
+
+import os
+import json
+import ntpath
+import hashlib
+import tempfile
+import threading
+
+from typing import Dict, List, Optional, Tuple
+from configparser import ConfigParser
+from services.attachmentCacheService import AttachmentCache, HASH_READ_SIZE
+from services.loggingService import LoggingService
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_UPLOAD_LEDGER_PATH = '~/.casetools/upload_ledger.json'
+
+
+def hash_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_READ_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def attachment_file_name(attachment: Dict) -> str:
+    # Epicor keeps the path the file was stored under, with either kind of slash
+    return ntpath.basename(attachment.get('FileName') or '')
+
+
+class UploadManifest:
+    """
+    Knows which local files are already on a case, so uploading them again can be skipped.
+    A file counts as already on the case when its SHA-256 matches an attachment of the case that has been downloaded
+    (AttachmentCache), or a file uploaded to the case from here whose name is still among the case's attachments
+    (the ledger). Hashes of local files are remembered by size and modification time, so unchanged files aren't read
+    again.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, ledger_path: str, attachment_cache: Optional[AttachmentCache] = None):
+        """
+        :param ledger_path: JSON file recording uploads and local file hashes
+        :param attachment_cache: Where downloaded attachments' hashes come from. Defaults to the shared cache.
+        """
+        self.ledger_path = ledger_path
+        self.attachment_cache = attachment_cache
+        self._lock = threading.Lock()
+
+        # uploads: case number -> {hash: file name}. hashes: path -> [size, mtime_ns, hash]
+        self.uploads: Dict[str, Dict[str, str]] = {}
+        self.hashes: Dict[str, List] = {}
+        self._dirty = False  # Changed since the ledger was last written
+        self._load()
+
+    @classmethod
+    def get_instance(cls) -> 'UploadManifest':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    config = ConfigParser()
+                    config.read(os.path.expanduser('~/.myapp.cfg'))
+                    ledger_path = config.get('DEFAULT', 'UPLOAD_LEDGER_PATH', fallback='') or \
+                        DEFAULT_UPLOAD_LEDGER_PATH
+                    cls._instance = cls(os.path.expanduser(ledger_path))
+        return cls._instance
+
+    def _load(self):
+        if not os.path.exists(self.ledger_path):
+            return
+        try:
+            with open(self.ledger_path, 'r', encoding='utf-8') as f:
+                ledger = json.load(f)
+            self.uploads = ledger.get('uploads', {})
+            self.hashes = ledger.get('hashes', {})
+        except Exception as e:
+            logger.warning(f"Upload ledger unreadable, starting empty: {e}")
+            self.uploads = {}
+            self.hashes = {}
+
+    def save(self):
+        """
+        Write the ledger if anything changed. Best effort: if it can't be written, duplicates just aren't recognised
+        next time.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            ledger_dir = os.path.dirname(self.ledger_path) or '.'
+            temp_path = None
+            try:
+                os.makedirs(ledger_dir, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=ledger_dir, prefix='.ledger', suffix='.part')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'uploads': self.uploads, 'hashes': self.hashes}, f)
+                os.replace(temp_path, self.ledger_path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning(f"Unable to save upload ledger {self.ledger_path}: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
+
+    def get_local_hash(self, path: str) -> str:
+        """
+        SHA-256 of a local file, only read from disk if it changed since last time. Call save() afterwards to
+        remember new hashes.
+        """
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            known = self.hashes.get(key)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        content_hash = hash_file(path)
+        with self._lock:
+            self.hashes[key] = [stat.st_size, stat.st_mtime_ns, content_hash]
+            self._dirty = True
+        return content_hash
+
+    def get_remote_hashes(self, case_number: int, attachments: Optional[List[Dict]]) -> Dict[str, str]:
+        """
+        Hashes of the case's attachments that we know of.
+        :param attachments: The case's attachments, from get_case_by_id
+        :return: {hash: attachment file name}
+        """
+        attachments = attachments or []
+        attachment_cache = self.attachment_cache or AttachmentCache.get_instance()
+        remote = {}
+        for attachment in attachments:
+            content_hash = attachment_cache.get_hash(attachment.get('XFileRefNum'))
+            if content_hash:
+                remote[content_hash] = attachment_file_name(attachment)
+
+        # Our own uploads count while a file of that name is still attached. Deleted ones get uploaded again.
+        attached_names = {attachment_file_name(attachment).lower() for attachment in attachments}
+        with self._lock:
+            uploaded = dict(self.uploads.get(str(case_number), {}))
+        for content_hash, file_name in uploaded.items():
+            if file_name.lower() in attached_names:
+                remote.setdefault(content_hash, file_name)
+        return remote
+
+    def find_duplicate(self, path: str, remote_hashes: Dict[str, str]) -> Tuple[str, Optional[str]]:
+        """
+        :return: (the file's hash, name of the attachment with the same content or None)
+        """
+        content_hash = self.get_local_hash(path)
+        return content_hash, remote_hashes.get(content_hash)
+
+    def record_upload(self, case_number: int, file_name: str, content_hash: str):
+        """
+        Remember a file was uploaded to the case. Call save() afterwards to keep it.
+        """
+        with self._lock:
+            self.uploads.setdefault(str(case_number), {})[content_hash] = file_name
+            self._dirty = True
@@ -0,0 +1,282 @@
+# workflowService.py
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from services.loggingService import LoggingService
+
+logger = LoggingService.get_logger(__name__)
+
+DEFAULT_WORKFLOW_WORKERS = 4
+CASE_UPDATE_UNIT_PRICE = 215
+
+
+class WorkflowStepSkipped(Exception):
+    """
+    Raised by a step's action when there turns out to be nothing for it to do.
+    """
+    pass
+
+
+class WorkflowStep:
+    def __init__(self, name: str, label: str, action: Callable[[Dict[str, Any]], Any],
+                 depends_on: Optional[List[str]] = None):
+        """
+        :param name: Key for the step, used by depends_on and in the results
+        :param label: What the user sees
+        :param action: Does the work. Called with the results of the steps run so far.
+        :param depends_on: Steps that must be Done before this one starts
+        """
+        self.name = name
+        self.label = label
+        self.action = action
+        self.depends_on = depends_on or []
+        self.status = 'Pending'  # Pending, Running, Done, Failed, Skipped
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+
+
+class Workflow:
+    """
+    Runs a small graph of steps on a thread pool. A step starts as soon as everything it depends on is Done, so
+    independent steps run at the same time. If a step fails, the steps depending on it are Skipped, and
+    retry_failed() runs them all again without redoing the steps that worked.
+    Callbacks run on the worker threads. UI callers should hop back to the UI thread themselves (wx.CallAfter).
+    """
+
+    def __init__(self, steps: List[WorkflowStep], max_workers: int = DEFAULT_WORKFLOW_WORKERS,
+                 on_step_changed: Optional[Callable[[WorkflowStep], None]] = None,
+                 on_finished: Optional[Callable[['Workflow'], None]] = None):
+        """
+        :param steps: Steps in display order
+        :param max_workers: Steps running at once
+        :param on_step_changed: Called with a step whenever its status changes
+        :param on_finished: Called once nothing is left to run
+        """
+        self.steps = {step.name: step for step in steps}
+        for step in steps:
+            missing = [name for name in step.depends_on if name not in self.steps]
+            if missing:
+                raise ValueError(f"Step {step.name} depends on unknown steps: {', '.join(missing)}")
+        cycle = self._find_cycle()
+        if cycle:
+            raise ValueError(f"Steps depend on each other in a cycle: {' -> '.join(cycle)}")
+
+        self.max_workers = max_workers
+        self.on_step_changed = on_step_changed
+        self.on_finished = on_finished
+        self.results: Dict[str, Any] = {}
+        self.finished_event = threading.Event()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def failed_steps(self) -> List[WorkflowStep]:
+        return [step for step in self.steps.values() if step.status == 'Failed']
+
+    @property
+    def succeeded(self) -> bool:
+        # Steps skipped because of a failure carry an error. Steps that skipped themselves don't.
+        return all(step.status == 'Done' or (step.status == 'Skipped' and not step.error)
+                   for step in self.steps.values())
+
+    def start(self):
+        """
+        Start the steps and return immediately.
+        """
+        if self.is_running:
+            raise Exception('Workflow is already running')
+
+        self.finished_event.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='workflow')
+        with self._lock:
+            ready = self._take_ready_steps()
+        self._submit(ready)
+        self._finish_if_idle()
+
+    def retry_failed(self):
+        """
+        Run failed steps again, along with the steps that were skipped because of them.
+        """
+        with self._lock:
+            for step in self.steps.values():
+                if step.status == 'Failed' or (step.status == 'Skipped' and step.error):
+                    step.status = 'Pending'
+                    step.error = None
+        self.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.finished_event.wait(timeout)
+
+    def _find_cycle(self) -> Optional[List[str]]:
+        """
+        :return: Names of steps that (directly or not) depend on themselves, first step repeated at the end, or None.
+                 Such steps would stay Pending forever.
+        """
+        visiting, done = [], set()
+
+        def visit(name: str) -> Optional[List[str]]:
+            if name in visiting:
+                return visiting[visiting.index(name):] + [name]
+            if name in done:
+                return None
+            visiting.append(name)
+            for dependency in self.steps[name].depends_on:
+                cycle = visit(dependency)
+                if cycle:
+                    return cycle
+            visiting.pop()
+            done.add(name)
+            return None
+
+        for name in self.steps:
+            cycle = visit(name)
+            if cycle:
+                return cycle
+        return None
+
+    def _take_ready_steps(self) -> List[WorkflowStep]:
+        ready = []
+        for step in self.steps.values():
+            if step.status == 'Pending' and all(self.steps[name].status == 'Done' for name in step.depends_on):
+                step.status = 'Running'
+                self._running += 1
+                ready.append(step)
+        return ready
+
+    def _submit(self, steps: List[WorkflowStep]):
+        for step in steps:
+            self._notify_step(step)
+            self._executor.submit(self._run_step, step)
+
+    def _run_step(self, step: WorkflowStep):
+        step.attempts += 1
+        try:
+            step.result = step.action(self.results)
+            status = 'Done'
+        except WorkflowStepSkipped as e:
+            step.result = None
+            step.error = None
+            status = 'Skipped'
+            logger.info(f"Step {step.name} skipped: {e}")
+        except Exception as e:
+            step.error = str(e)
+            status = 'Failed'
+            logger.error(f"Step {step.name} failed: {e}")
+
+        with self._lock:
+            step.status = status
+            self._running -= 1
+            if status == 'Done':
+                self.results[step.name] = step.result
+            skipped = []
+            if status != 'Done':
+                skipped = self._skip_dependents(step, f"{step.label} did not complete" if step.error else None)
+            ready = self._take_ready_steps()
+
+        self._notify_step(step)
+        for dependent in skipped:
+            self._notify_step(dependent)
+        self._submit(ready)
+        self._finish_if_idle()
+
+    def _skip_dependents(self, step: WorkflowStep, error: Optional[str]) -> List[WorkflowStep]:
+        """
+        Mark every pending step that (directly or not) needs `step` as Skipped.
+        :param error: Why, if it's because something failed
+        """
+        skipped = []
+        blocked = {step.name}
+        changed = True
+        while changed:
+            changed = False
+            for other in self.steps.values():
+                if other.status == 'Pending' and blocked.intersection(other.depends_on):
+                    other.status = 'Skipped'
+                    other.error = error
+                    blocked.add(other.name)
+                    skipped.append(other)
+                    changed = True
+        return skipped
+
+    def _finish_if_idle(self):
+        with self._lock:
+            if self._running or self._executor is None:
+                return
+            executor, self._executor = self._executor, None
+        executor.shutdown(wait=False)
+        try:
+            if self.on_finished:
+                self.on_finished(self)
+        finally:
+            self.finished_event.set()
+
+    def _notify_step(self, step: WorkflowStep):
+        if self.on_step_changed:
+            self.on_step_changed(step)
+
+
+def build_case_update_steps(epicor_service, case_service, case_number: int, quantity: Optional[float] = None,
+                            create_quote: bool = False, complete_task: bool = False,
+                            assign_to: Optional[str] = None, comment: Optional[str] = None,
+                            unit_price: float = CASE_UPDATE_UNIT_PRICE) -> List[WorkflowStep]:
+    """
+    Steps for the Update Case button. Only what was asked for is included. The quote waits for the price, completing
+    the task waits for the quote to be attached, and assigning waits for the completion. The comment doesn't wait for
+    anything.
+    :param epicor_service: EpicorService to run the steps with
+    :param case_service: CaseService used to create, price and attach the quote
+    :param case_number: Case to update
+    :param quantity: Hours to set on the case. Not changed if None.
+    :param create_quote: Create the quote and attach its PDF
+    :param complete_task: Complete the current task
+    :param assign_to: Who to assign the next task to. Only used when completing the task.
+    :param comment: Comment to add
+    :param unit_price: Unit price to set with the hours
+    """
+    steps = []
+
+    if quantity is not None:
+        steps.append(WorkflowStep('price', 'Update hours',
+                                  lambda results: epicor_service.update_case_part_and_price(case_number, quantity,
+                                                                                            unit_price)))
+
+    if create_quote:
+        # Creating the quote is its own step, so retrying a failed price or attach reuses the quote already made
+        # instead of creating another
+        steps.append(WorkflowStep('quote', 'Create quote',
+                                  lambda results: case_service.create_quote(case_number),
+                                  depends_on=['price'] if quantity is not None else []))
+        steps.append(WorkflowStep('quote_price', 'Price quote and mark quoted',
+                                  lambda results: case_service.finish_quote(case_number, results['quote']),
+                                  depends_on=['quote']))
+        steps.append(WorkflowStep('quote_attach', 'Attach quote PDF',
+                                  lambda results: case_service.attach_quote(case_number, results['quote']),
+                                  depends_on=['quote_price']))
+
+    if complete_task:
+        steps.append(WorkflowStep('complete', 'Complete current task',
+                                  lambda results: epicor_service.complete_current_case_task(case_number),
+                                  depends_on=['quote_attach'] if create_quote else []))
+
+        if assign_to:
+            def assign_next_task(results):
+                if not results.get('complete'):
+                    raise WorkflowStepSkipped(f"No active task on case {case_number} to assign")
+                epicor_service.assign_current_case_task(case_number, assign_to)
+
+            steps.append(WorkflowStep('assign', f'Assign next task to {assign_to}', assign_next_task,
+                                      depends_on=['complete']))
+
+    if comment:
+        steps.append(WorkflowStep('comment', 'Add case comment',
+                                  lambda results: epicor_service.add_case_comment(case_number, comment)))
+
+    return steps
@@ -0,0 +1,130 @@
+import wx
+from services.bulkUpdateService import BulkCaseUpdate, BulkCaseResult
+from services.caseService import CaseService
+
+
+class BulkUpdateDialog(wx.Dialog):
+    def __init__(self, parent, epicor_service, case_numbers):
+        super(BulkUpdateDialog, self).__init__(parent, title=f"Update {len(case_numbers)} Cases", size=(700, 600),
+                                               style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.epicor_service = epicor_service
+        self.case_service = CaseService()
+        self.case_numbers = case_numbers
+        self.bulk_update = None
+        self.any_case_updated = False
+
+        vbox = wx.BoxSizer(wx.VERTICAL)
+
+        # What to do to every case
+        vbox.Add(wx.StaticText(self, label="Hours:"), flag=wx.LEFT | wx.TOP, border=5)
+        self.quantity_text = wx.TextCtrl(self)
+        vbox.Add(self.quantity_text, flag=wx.EXPAND | wx.ALL, border=5)
+
+        self.complete_task_checkbox = wx.CheckBox(self, label="Complete Current Task")
+        vbox.Add(self.complete_task_checkbox, flag=wx.EXPAND | wx.ALL, border=5)
+
+        vbox.Add(wx.StaticText(self, label="Assign Next Task To"), flag=wx.ALL, border=5)
+        self.assignee_input = wx.TextCtrl(self)
+        vbox.Add(self.assignee_input, flag=wx.EXPAND | wx.ALL, border=5)
+
+        vbox.Add(wx.StaticText(self, label="Case Comment:"), flag=wx.LEFT | wx.TOP, border=5)
+        self.case_comment_text = wx.TextCtrl(self, style=wx.TE_MULTILINE, size=(-1, 60))
+        vbox.Add(self.case_comment_text, flag=wx.EXPAND | wx.ALL, border=5)
+
+        # Result per case
+        self.results_list = wx.ListCtrl(self, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
+        self.results_list.InsertColumn(0, "Case", width=80)
+        self.results_list.InsertColumn(1, "Status", width=80)
+        self.results_list.InsertColumn(2, "Details", width=480)
+        for row, case_number in enumerate(case_numbers):
+            self.results_list.InsertItem(row, str(case_number))
+            self.results_list.SetItem(row, 1, 'Not started')
+        vbox.Add(self.results_list, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
+
+        self.status_text = wx.StaticText(self, label="")
+        vbox.Add(self.status_text, flag=wx.EXPAND | wx.ALL, border=5)
+
+        hbox = wx.BoxSizer(wx.HORIZONTAL)
+        self.run_button = wx.Button(self, label="Update Cases")
+        self.run_button.Bind(wx.EVT_BUTTON, self.on_run_button_clicked)
+        hbox.Add(self.run_button)
+        self.cancel_button = wx.Button(self, label="Cancel")
+        self.cancel_button.Bind(wx.EVT_BUTTON, self.on_cancel_button_clicked)
+        self.cancel_button.Disable()
+        hbox.Add(self.cancel_button, flag=wx.LEFT, border=5)
+        self.close_button = wx.Button(self, wx.ID_CLOSE, label="Close")
+        self.close_button.Bind(wx.EVT_BUTTON, self.on_close)
+        hbox.Add(self.close_button, flag=wx.LEFT, border=5)
+        vbox.Add(hbox, flag=wx.ALIGN_CENTER | wx.TOP | wx.BOTTOM, border=10)
+
+        self.SetSizer(vbox)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+    def get_update_options(self):
+        quantity_str = self.quantity_text.GetValue().strip()
+        return {
+            'quantity': float(quantity_str) if quantity_str else None,
+            'complete_task': self.complete_task_checkbox.IsChecked(),
+            'assign_to': self.assignee_input.GetValue().strip(),
+            'comment': self.case_comment_text.GetValue(),
+        }
+
+    def on_run_button_clicked(self, event):
+        if self.bulk_update is None:
+            try:
+                update_options = self.get_update_options()
+            except ValueError:
+                wx.MessageBox('Hours must be a number', 'Error', wx.OK | wx.ICON_ERROR)
+                return
+            if update_options['quantity'] is None and not update_options['complete_task'] \
+                    and not update_options['comment']:
+                wx.MessageBox('Nothing to update', 'Error', wx.OK | wx.ICON_ERROR)
+                return
+
+            self.bulk_update = BulkCaseUpdate(
+                self.epicor_service, self.case_service, self.case_numbers, update_options,
+                on_case_changed=lambda result: wx.CallAfter(self.on_case_changed, result),
+                on_finished=lambda results: wx.CallAfter(self.on_bulk_update_finished, results)
+            )
+            self.set_options_enabled(False)
+
+        self.run_button.Disable()
+        self.cancel_button.Enable()
+        self.status_text.SetLabel("Updating...")
+        self.bulk_update.start()
+
+    def on_cancel_button_clicked(self, event):
+        if self.bulk_update is not None:
+            self.bulk_update.cancel()
+            self.status_text.SetLabel("Cancelling. Cases already running will finish...")
+
+    def set_options_enabled(self, enabled):
+        for control in (self.quantity_text, self.complete_task_checkbox, self.assignee_input,
+                        self.case_comment_text):
+            control.Enable(enabled)
+
+    def on_case_changed(self, result: BulkCaseResult):
+        self.results_list.SetItem(result.row, 1, result.status)
+        self.results_list.SetItem(result.row, 2, result.details)
+        if result.status == 'Done':
+            self.any_case_updated = True
+
+    def on_bulk_update_finished(self, results):
+        self.cancel_button.Disable()
+        counts = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        self.status_text.SetLabel(', '.join(f"{count} {status.lower()}" for status, count in counts.items()))
+
+        # Only the cases that didn't make it are run again
+        unfinished = len(results) - counts.get('Done', 0)
+        if unfinished:
+            self.run_button.SetLabel(f"Retry {unfinished} Cases")
+            self.run_button.Enable()
+
+    def on_close(self, event):
+        if self.bulk_update is not None and self.bulk_update.is_running:
+            wx.MessageBox('Wait for the running cases to finish, or cancel first', 'Bulk Update',
+                          wx.OK | wx.ICON_INFORMATION)
+            return
+        self.EndModal(wx.ID_CLOSE)
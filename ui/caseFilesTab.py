@@ -1,4 +1,5 @@
 import wx
+import threading
 from ui.downloadTab import DownloadTab
 from ui.uploadTab import UploadTab
 from ui.caseUpdateTab import CaseUpdateTab
@@ -8,8 +9,15 @@ from ui.designSolutionTab import SolutionTab
 from ui.designSummaryTab import DesignSummaryTab
 from ui.designComponentsTab import DesignComponentsTab
 from services.epicorService import EpicorService
+from services.caseCacheService import CaseCache
+from services.loggingService import LoggingService
 from services.googleAIService import load_examples, load_role
 
+logger = LoggingService.get_logger(__name__)
+
+# Enter, losing focus and the Load button often fire together. Wait this long for things to settle before loading.
+CASE_LOAD_DEBOUNCE_MS = 300
+
 
 def escape_js_string(s):
     return s.replace("\\", "\\\\").replace("`", "\\`").replace("$", "\\$").replace("\"", "\\\"")
@@ -19,6 +27,9 @@ class CaseTab(wx.Panel):
     def __init__(self, parent):
         super(CaseTab, self).__init__(parent)
         self.epicor_service = EpicorService()
+        self.loaded_case_number = None
+        self.case_load_timer = None
+        self.preload_generation = 0  # Bumped by every case load, so a slow preload for an older case is ignored
 
         # Load examples and role
         self.solution_examples = load_examples('samples/solution_examples.json')
@@ -40,7 +51,7 @@ class CaseTab(wx.Panel):
         # Load button
         load_button = wx.Button(self, label="Load")
         hbox.Add(load_button, flag=wx.LEFT | wx.TOP, border=5)
-        load_button.Bind(wx.EVT_BUTTON, self.on_case_number_updated)
+        load_button.Bind(wx.EVT_BUTTON, self.on_load_button_clicked)
 
         vbox.Add(hbox, flag=wx.EXPAND | wx.ALL, border=5)  # Add the horizontal box sizer to the vertical box sizer
 
@@ -82,18 +93,64 @@ class CaseTab(wx.Panel):
         return self.case_number_text.GetValue()
 
     def on_case_number_updated(self, event):
-        self.page1.refresh_data()
-        self.page2.refresh_data()
-        self.page3.refresh_data()
+        # Collapse a burst of events into one load once they stop coming
+        if self.case_load_timer is not None and self.case_load_timer.IsRunning():
+            self.case_load_timer.Stop()
+        self.case_load_timer = wx.CallLater(CASE_LOAD_DEBOUNCE_MS, self.refresh_case_pages)
         event.Skip()
 
+    def on_load_button_clicked(self, event):
+        if self.case_load_timer is not None and self.case_load_timer.IsRunning():
+            self.case_load_timer.Stop()
+        self.refresh_case_pages(force=True)
+
     def on_tab_changed(self, event):
         if event.GetSelection() in [0, 1]:  # DownloadTab or UploadTab
-            self.page1.refresh_data()
-            self.page2.refresh_data()
-            self.page3.refresh_data()
+            self.refresh_case_pages()
         event.Skip()
 
+    def refresh_case_pages(self, force=False):
+        """
+        Load the case into the sub-tabs. Pages that call Epicor are skipped when the case hasn't changed.
+        :param force: Reload even if the case is already loaded
+        """
+        case_number = self.get_case_number()
+        if force or case_number != self.loaded_case_number:
+            self.loaded_case_number = case_number
+            self.preload_case(case_number)
+
+        # The upload list only reads the local case folder, so keep it current
+        self.page2.refresh_data()
+
+    def preload_case(self, case_number):
+        """
+        Fetch what the sub-tabs need in one $batch round trip on a background thread, then refresh the sub-tabs so
+        their own calls are served from the case cache.
+        """
+        self.preload_generation += 1
+        if not case_number.strip().isdigit() or CaseCache.get_instance().ttl <= 0 or \
+                self.epicor_service.is_case_cached(int(case_number)):
+            # Nothing to fetch, or already prefetched from the Open Cases list
+            self.on_case_preloaded(self.preload_generation)
+            return
+        threading.Thread(target=self.preload_case_in_background, args=(int(case_number), self.preload_generation),
+                         daemon=True).start()
+
+    def preload_case_in_background(self, case_number, generation):
+        try:
+            self.epicor_service.load_case(case_number)
+        except Exception as e:
+            # The sub-tabs will fetch (or fall back) on their own
+            logger.warning(f"Unable to preload case {case_number}: {e}")
+        wx.CallAfter(self.on_case_preloaded, generation)
+
+    def on_case_preloaded(self, generation):
+        if generation != self.preload_generation:
+            # Another case was loaded in the meantime
+            return
+        self.page1.refresh_data()
+        self.page3.refresh_data()
+
     def log_js_message(self, web_view, message):
         escaped_message = escape_js_string(message)
         web_view.RunScript(f'logMessage(`{escaped_message}`);')
@@ -1,13 +1,98 @@
 import wx
+import os
+import time
+import threading
+from configparser import ConfigParser
+from datetime import datetime
 from services.epicorService import EpicorService  # Ensure you have this import
+from services.caseSnapshotService import CaseSnapshot
+from services.caseStoreService import CaseStore
+from services.caseTableService import CaseTable
+from services.loggingService import LoggingService
+from services.prefetchService import CasePrefetcher, get_prefetch_hover_delay
+from services.quoteBatchService import QuoteJournal
+from services.transportService import get_int_setting
+from ui.bulkUpdateDialog import BulkUpdateDialog
+from ui.quoteBatchDialog import QuoteBatchDialog
+
+logger = LoggingService.get_logger(__name__)
+
+# BAQ columns behind each list column, in display order. Only these are requested from Epicor.
+CASE_COLUMN_KEYS = ["HDCase_HDCaseNum", "SalesRep_Name", "SalesRep1_Name", "Customer_Name", "Project_ProjectID",
+                    "HDCase_Description", "Task_TaskDescription", "Task_StartDate", "Task_DueDate",
+                    "Task_StatusCode", "HDCase_TaskSetID", "HDCase_Quantity", "ProjPhase_TotEstLbrHrs",
+                    "ProjPhase_TotActLbrHrs", "Calculated_LaborHours", "HDCase_EstimatedHrs_c",
+                    "Calculated_RemainingHours", "Calculated_DaysSinceLastComment", "HDCase_RequestDate_c",
+                    "HDCase_DevStartDate_c", "HDCase_DeliveryDate_c", "Calculated_SchedHoursRemaining",
+                    "Calculated_DaysTillDueDate"]
+
+# Rows per request when loading the list, and the order pages are fetched in. It ends in the row's key (case number
+# and task sequence, see CASE_TASKS_KEY_ORDER), so pages don't shift between requests.
+DEFAULT_CASE_PAGE_SIZE = 500
+CASE_PAGE_ORDER = 'HDCase_HDCaseNum,Task_TaskDescription,Task_TaskSeqNum'
+# Showing a page rebuilds the whole table, so pages are only shown once the rows have doubled or this many seconds
+# have passed since the last one
+CASE_PAGE_REDRAW_SECONDS = 1.0
+
+
+# Dropdown filters: (BAQ column, label, what a blank value is listed as)
+FILTER_COLUMNS = [("SalesRep1_Name", "Case Assignee:", "No Case Assignee"),
+                  ("SalesRep_Name", "Case Owner:", "No Case Owner"),
+                  ("Task_TaskDescription", "Task:", "No Description"),
+                  ("Customer_Name", "Customer:", "No Customer"),
+                  ("Project_ProjectID", "Project:", "No Project"),
+                  ("HDCase_TaskSetID", "Task Set:", "No Task Set")]
+
+
+def format_saved_at(saved_at):
+    return datetime.fromtimestamp(saved_at).strftime('%Y-%m-%d %H:%M') if saved_at else 'never'
+
+
+class VirtualCaseList(wx.ListCtrl):
+    """
+    Report list that asks for cell text only for the rows on screen. The tab owns the rows. This just draws them.
+    """
+
+    def __init__(self, parent, get_cell_text):
+        """
+        :param get_cell_text: Called with (row index, column index) for the text to show
+        """
+        super(VirtualCaseList, self).__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.BORDER_SUNKEN)
+        self.get_cell_text = get_cell_text
+
+    def OnGetItemText(self, item, column):
+        return self.get_cell_text(item, column)
 
 
 class CaseListTab(wx.Panel):
     def __init__(self, parent):
         super(CaseListTab, self).__init__(parent)
         self.epicor_service = EpicorService()  # Instance of your Epicor service
+        self.cases = []
+        self.case_table = CaseTable([])  # self.cases by column, with cached sort orders
+        self.case_keys = []  # Snapshot key of each case, in fetch order
+        self.sort_key = None  # Column the list is sorted by, None for Epicor's order
+        self.snapshot = CaseSnapshot()  # Last loaded cases, for working out what a refresh changed
+        self.displayed_keys = []  # Snapshot key of each row in the list, in display order
+        self.row_values = {}  # Snapshot key -> formatted row values, filled in as rows are drawn
+        self.case_store = CaseStore.get_instance()
+        self.is_loading = False
+        self.load_generation = 0  # Bumped by every load, so a superseded fetch knows to stop
+        self.loading_baseline = CaseSnapshot()  # What was shown before the current load, for its summary
+        self.cases_before_load = []  # Rows shown before the current load, kept past the last page fetched so far
+        config = ConfigParser()
+        config.read(os.path.expanduser('~/.myapp.cfg'))
+        self.case_page_size = max(1, get_int_setting(config, 'CASE_PAGE_SIZE', DEFAULT_CASE_PAGE_SIZE))
+        self.prefetcher = CasePrefetcher(self.epicor_service)  # Warms the cache for the case about to be opened
+        self.prefetch_hover_delay = get_prefetch_hover_delay()
+        self.hovered_index = -1  # Row under the pointer, so moving within a row doesn't ask again
+        self.restoring_selection = False  # Selecting rows again after a redraw isn't the user choosing a case
         self.init_ui()
-        self.load_cases()
+
+        # Draw the cases saved last time straight away, then catch up with Epicor in the background once the window
+        # is up
+        self.load_stored_cases()
+        wx.CallAfter(self.load_cases)
 
     def init_ui(self):
         layout = wx.BoxSizer(wx.VERTICAL)
@@ -25,16 +110,6 @@ class CaseListTab(wx.Panel):
         top_bar_layout.Add(wx.StaticText(self, label="Sort By:"), 0, wx.ALL | wx.CENTER, 5)
         top_bar_layout.Add(self.sort_by_dropdown, 0, wx.ALL | wx.EXPAND, 5)
 
-        # Case Assignee Filter setup
-        self.case_assignee_filter = wx.Choice(self, choices=[])
-        top_bar_layout.Add(wx.StaticText(self, label="Case Assignee:"), 0, wx.ALL | wx.CENTER, 5)
-        top_bar_layout.Add(self.case_assignee_filter, 0, wx.EXPAND | wx.ALL, 5)
-
-        # Task Description Filter setup
-        self.task_description_filter = wx.Choice(self, choices=[])
-        top_bar_layout.Add(wx.StaticText(self, label="Task:"), 0, wx.ALL | wx.CENTER, 5)
-        top_bar_layout.Add(self.task_description_filter, 0, wx.EXPAND | wx.ALL, 5)
-
         # Refresh Button setup
         img = wx.Image('refreshicon.png', wx.BITMAP_TYPE_ANY)
         img = img.Scale(12, 12, wx.IMAGE_QUALITY_HIGH)  # Adjusting scale to match your UI's button size
@@ -42,11 +117,36 @@ class CaseListTab(wx.Panel):
         self.refresh_button = wx.BitmapButton(self, id=wx.ID_ANY, bitmap=refresh_icon)
         top_bar_layout.Add(self.refresh_button, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
 
+        # Bulk update of the selected cases
+        self.bulk_update_button = wx.Button(self, label="Update Selected...")
+        top_bar_layout.Add(self.bulk_update_button, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.quote_button = wx.Button(self, label="Quote Selected...")
+        top_bar_layout.Add(self.quote_button, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        # What the last refresh changed
+        self.refresh_status_text = wx.StaticText(self, label="")
+        top_bar_layout.Add(self.refresh_status_text, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
         # Add the top bar to the layout
         layout.Add(top_bar_layout, 0, wx.EXPAND | wx.ALL, 5)
 
+        # Filter bar: a dropdown per filterable column, combined, and a search box
+        filter_bar_layout = wx.BoxSizer(wx.HORIZONTAL)
+        self.filters = {}  # BAQ column -> dropdown
+        for key, label, _ in FILTER_COLUMNS:
+            self.filters[key] = wx.Choice(self, choices=["All"])
+            self.filters[key].SetSelection(0)
+            filter_bar_layout.Add(wx.StaticText(self, label=label), 0, wx.ALL | wx.CENTER, 5)
+            filter_bar_layout.Add(self.filters[key], 0, wx.EXPAND | wx.ALL, 5)
+
+        self.search_box = wx.SearchCtrl(self, size=(220, -1))
+        self.search_box.SetDescriptiveText("Search description, customer, project")
+        self.search_box.ShowCancelButton(True)
+        filter_bar_layout.Add(self.search_box, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        layout.Add(filter_bar_layout, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
+
         # Setup for the cases list
-        self.cases_list = wx.ListCtrl(self, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
+        self.cases_list = VirtualCaseList(self, self.get_cell_text)
         columns = [("Case", 100), ("Case Owner", 100), ("Case Assignee", 100), ("Customer", 150), ("Project", 100),
                    ("Description", 200), ("Task", 150), ("Task Start Date", 100),
                    ("Task Due Date", 100), ("Task Status", 100), ("Task Set", 100),
@@ -62,41 +162,122 @@ class CaseListTab(wx.Panel):
         self.SetSizer(layout)
 
         # Bind event handlers
-        self.case_assignee_filter.Bind(wx.EVT_CHOICE, self.on_filter_changed)
-        self.task_description_filter.Bind(wx.EVT_CHOICE, self.on_filter_changed)
+        for choice in self.filters.values():
+            choice.Bind(wx.EVT_CHOICE, self.on_filter_changed)
+        self.search_box.Bind(wx.EVT_TEXT, self.on_filter_changed)
+        self.search_box.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, self.on_search_cancelled)
         self.sort_by_dropdown.Bind(wx.EVT_CHOICE, self.on_sort_by_changed)
         self.refresh_button.Bind(wx.EVT_BUTTON, self.on_refresh_clicked)
+        self.bulk_update_button.Bind(wx.EVT_BUTTON, self.on_bulk_update_clicked)
+        self.quote_button.Bind(wx.EVT_BUTTON, self.on_quote_clicked)
+        self.cases_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_case_selected)
+        self.cases_list.Bind(wx.EVT_MOTION, self.on_cases_list_motion)
+        self.cases_list.Bind(wx.EVT_LEAVE_WINDOW, self.on_cases_list_leave)
+
+    def load_stored_cases(self):
+        """
+        Show the cases saved by the last successful load, if any.
+        """
+        try:
+            cases, saved_at = self.case_store.load_case_tasks()
+            if cases:
+                self.show_cases(cases, status=f"Saved {format_saved_at(saved_at)}. Refreshing...")
+            else:
+                self.refresh_status_text.SetLabel("Loading cases...")
+        except Exception as e:
+            logger.error(f"Unable to load saved cases: {e}")
 
     def load_cases(self):
+        """
+        Fetch the cases from Epicor a page at a time on a background thread. Rows show up as pages arrive. Calling
+        it while a fetch is running abandons that fetch and starts again.
+        """
+        if not self.is_loading:
+            self.loading_baseline = CaseSnapshot()
+            self.loading_baseline.apply(self.cases)
+            self.cases_before_load = list(self.cases)
+        self.is_loading = True
+        self.load_generation += 1
+        threading.Thread(target=self.fetch_cases_in_background, args=(self.load_generation,), daemon=True).start()
+
+    def fetch_cases_in_background(self, generation):
         try:
-            # Save the current selections
-            current_assignee_selection = self.case_assignee_filter.GetStringSelection()
-            current_task_selection = self.task_description_filter.GetStringSelection()
-            current_sort_selection = self.sort_by_dropdown.GetStringSelection()
+            cases = []
+            shown, shown_at = 0, 0.0
+            for page in self.epicor_service.iter_case_pages(self.case_page_size, select=CASE_COLUMN_KEYS,
+                                                            orderby=CASE_PAGE_ORDER):
+                if generation != self.load_generation:
+                    return
+                cases.extend(page)
+                if len(cases) >= 2 * shown or time.monotonic() - shown_at >= CASE_PAGE_REDRAW_SECONDS:
+                    shown, shown_at = len(cases), time.monotonic()
+                    wx.CallAfter(self.on_case_page_fetched, generation, list(cases))
+            if generation != self.load_generation:
+                return
+            self.case_store.save_case_tasks(cases)
+            wx.CallAfter(self.on_cases_fetched, generation, cases)
+        except Exception as e:
+            wx.CallAfter(self.on_cases_fetch_failed, generation, e)
 
-            # Reload your cases data
-            self.cases = self.epicor_service.fetch_cases()
+    def on_case_page_fetched(self, generation, cases):
+        if generation != self.load_generation:
+            return
+        # Pages come in case number order. Keep showing what we had for the cases not fetched yet.
+        last_case_number = cases[-1].get('HDCase_HDCaseNum') if cases else None
+        not_fetched_yet = []
+        if isinstance(last_case_number, int):
+            not_fetched_yet = [case for case in self.cases_before_load
+                               if isinstance(case.get('HDCase_HDCaseNum'), int) and
+                               case['HDCase_HDCaseNum'] > last_case_number]
+        self.show_cases(cases + not_fetched_yet, status=f"Loading... {len(cases)} cases so far")
 
-            # Repopulate the dropdowns
-            case_assignees = sorted(
-                set(case.get('SalesRep1_Name', 'Unknown') for case in self.cases if case.get('SalesRep1_Name')))
-            task_descriptions = sorted(set(case.get('Task_TaskDescription') or 'No Description' for case in self.cases))
+    def on_cases_fetched(self, generation, cases):
+        if generation != self.load_generation:
+            return
+        self.is_loading = False
+        self.show_cases(cases, status=self.loading_baseline.apply(cases).summary())
 
-            self.case_assignee_filter.Clear()
-            self.case_assignee_filter.AppendItems(["All"] + case_assignees)
-            self.task_description_filter.Clear()
-            self.task_description_filter.AppendItems(["All"] + task_descriptions)
+    def on_cases_fetch_failed(self, generation, error):
+        if generation != self.load_generation:
+            return
+        self.is_loading = False
+        logger.error(f"Unable to load cases: {error}")
+        _, saved_at = self.case_store.load_case_tasks()
+        if saved_at:
+            self.refresh_status_text.SetLabel(f"Offline. Showing cases saved {format_saved_at(saved_at)}")
+        else:
+            self.refresh_status_text.SetLabel("Unable to load cases")
+        self.Layout()
 
-            # Restore the selections
-            if current_assignee_selection in case_assignees or current_assignee_selection == "All":
-                self.case_assignee_filter.SetStringSelection(current_assignee_selection)
-            else:
-                self.case_assignee_filter.SetSelection(0)
+    def show_cases(self, cases, status=None):
+        """
+        Bring the list in line with the given cases, keeping filters and sort order.
+        :param status: What to say next to the refresh button. Defaults to what changed since the last call.
+        """
+        try:
+            # Save the current selections
+            current_filter_selections = {key: choice.GetStringSelection() for key, choice in self.filters.items()}
+            current_sort_selection = self.sort_by_dropdown.GetStringSelection()
 
-            if current_task_selection in task_descriptions or current_task_selection == "All":
-                self.task_description_filter.SetStringSelection(current_task_selection)
-            else:
-                self.task_description_filter.SetSelection(0)
+            # Take the new cases and work out what changed since last time
+            self.cases = cases
+            delta = self.snapshot.apply(self.cases)
+            self.case_table = CaseTable(self.cases)
+            self.case_keys = [self.snapshot.key_for(case) for case in self.cases]
+
+            # Repopulate the dropdowns from the indexes and restore the selections
+            for key, _, blank_label in FILTER_COLUMNS:
+                index = self.case_table.index(key)
+                values = sorted(value for value in index if value is not None)
+                if None in index:
+                    values.append(blank_label)
+                choice = self.filters[key]
+                choice.Clear()
+                choice.AppendItems(["All"] + values)
+                if current_filter_selections[key] in values:
+                    choice.SetStringSelection(current_filter_selections[key])
+                else:
+                    choice.SetSelection(0)
 
             if current_sort_selection in self.sort_by_choices:
                 self.sort_by_dropdown.SetStringSelection(current_sort_selection)
@@ -108,74 +289,209 @@ class CaseListTab(wx.Panel):
                 sort_column_index = self.sort_by_choices.index(current_sort_selection)
                 self.sort_cases(sort_column_index)
 
-            # Update the list to reflect changes
-            self.update_cases_list()
+            # Update the list to reflect changes. Only rows that changed get formatted again after the first load.
+            if delta.is_initial:
+                self.row_values.clear()
+                self.update_cases_list()
+            else:
+                self.patch_cases_list(delta)
+            self.refresh_status_text.SetLabel(status or delta.summary())
+            self.Layout()
         except Exception as e:
-            print(e)
+            logger.error(f"Unable to show cases: {e}")
+
+    @staticmethod
+    def get_row_values(case):
+        # Prepare row values with appropriate handling of None values and formatting
+        row_values = [
+            str(case.get('HDCase_HDCaseNum', 'Unknown')),
+            case.get('SalesRep_Name', 'No Case Owner'),
+            case.get('SalesRep1_Name', 'No Case Assignee'),
+            case.get('Customer_Name', 'No Customer'),
+            case.get('Project_ProjectID', 'No Project'),
+            case.get('HDCase_Description', 'No Description'),
+            case.get('Task_TaskDescription', 'No Task'),
+            case.get('Task_StartDate', 'No Start Date'),
+            case.get('Task_DueDate', 'No Due Date'),
+            case.get('Task_StatusCode', 'No Status'),
+            case.get('HDCase_TaskSetID', 'No Task Set'),
+            str(case.get('HDCase_Quantity', 'No Quoted Hours')),
+            str(case.get('ProjPhase_TotEstLbrHrs', 'No Job Est Hours')),
+            str(case.get('ProjPhase_TotActLbrHrs', 'No Act Hours')),
+            str(case.get('Calculated_LaborHours', 'No Lab Hours')),
+            str(case.get('HDCase_EstimatedHrs_c', 'No Case Est Hours')),
+            str(case.get('Calculated_RemainingHours', 'No Remain Hours')),
+            str(case.get('Calculated_DaysSinceLastComment', 'No Days Since Last Comment')),
+            case.get('HDCase_RequestDate_c', 'No Request Date'),
+            case.get('HDCase_DevStartDate_c', 'No Dev Start Date'),
+            case.get('HDCase_DeliveryDate_c', 'No Delivery Date'),
+            str(case.get('Calculated_SchedHoursRemaining', 'No Sched Hrs Remain')),
+            str(case.get('Calculated_DaysTillDueDate', 'No Days Till Due')),
+        ]
+        # Convert all values to strings and handle None cases
+        return [str(value) if value is not None else 'N/A' for value in row_values]
+
+    def get_cell_text(self, index, column):
+        if index >= len(self.displayed_keys):
+            return ''
+        key = self.displayed_keys[index]
+        values = self.row_values.get(key)
+        if values is None:
+            values = self.row_values[key] = self.get_row_values(self.snapshot.rows[key])
+        return values[column]
 
     def update_cases_list(self):
-        self.cases_list.DeleteAllItems()
-        for case in self.cases:
-            if self.should_case_be_displayed(case):
-                # Prepare row values with appropriate handling of None values and formatting
-                row_values = [
-                    str(case.get('HDCase_HDCaseNum', 'Unknown')),
-                    case.get('SalesRep_Name', 'No Case Owner'),
-                    case.get('SalesRep1_Name', 'No Case Assignee'),
-                    case.get('Customer_Name', 'No Customer'),
-                    case.get('Project_ProjectID', 'No Project'),
-                    case.get('HDCase_Description', 'No Description'),
-                    case.get('Task_TaskDescription', 'No Task'),
-                    case.get('Task_StartDate', 'No Start Date'),
-                    case.get('Task_DueDate', 'No Due Date'),
-                    case.get('Task_StatusCode', 'No Status'),
-                    case.get('HDCase_TaskSetID', 'No Task Set'),
-                    str(case.get('HDCase_Quantity', 'No Quoted Hours')),
-                    str(case.get('ProjPhase_TotEstLbrHrs', 'No Job Est Hours')),
-                    str(case.get('ProjPhase_TotActLbrHrs', 'No Act Hours')),
-                    str(case.get('Calculated_LaborHours', 'No Lab Hours')),
-                    str(case.get('HDCase_EstimatedHrs_c', 'No Case Est Hours')),
-                    str(case.get('Calculated_RemainingHours', 'No Remain Hours')),
-                    str(case.get('Calculated_DaysSinceLastComment', 'No Days Since Last Comment')),
-                    case.get('HDCase_RequestDate_c', 'No Request Date'),
-                    case.get('HDCase_DevStartDate_c', 'No Dev Start Date'),
-                    case.get('HDCase_DeliveryDate_c', 'No Delivery Date'),
-                    str(case.get('Calculated_SchedHoursRemaining', 'No Sched Hrs Remain')),
-                    str(case.get('Calculated_DaysTillDueDate', 'No Days Till Due')),
-                ]
-                # Convert all values to strings and handle None cases
-                row_values = [str(value) if value is not None else 'N/A' for value in row_values]
-
-                index = self.cases_list.InsertItem(self.cases_list.GetItemCount(), row_values[0])
-                for col, value in enumerate(row_values[1:], 1):
-                    self.cases_list.SetItem(index, col, value)
-
-    def should_case_be_displayed(self, case):
-        selected_assignee = self.case_assignee_filter.GetStringSelection()
-        selected_task = self.task_description_filter.GetStringSelection()
-        return ((selected_assignee == "All" or selected_assignee == case.get('SalesRep1_Name', '')) and
-                (selected_task == "All" or selected_task == case.get('Task_TaskDescription', '')))
+        """
+        Work out which rows to show, in order, and have the list redraw what's on screen. The selection follows
+        its cases rather than staying on the same row numbers.
+        """
+        selected_indexes = self.get_selected_indexes()
+        selected_keys = [self.displayed_keys[index] for index in selected_indexes if index < len(self.displayed_keys)]
+        for index in selected_indexes:
+            self.cases_list.Select(index, False)
+
+        matches = self.case_table.filter(self.get_active_filters(), self.search_box.GetValue())
+        self.displayed_keys = [self.case_keys[index] for index in self.case_table.ordered(matches, self.sort_key)]
+        self.cases_list.SetItemCount(len(self.displayed_keys))
+
+        if selected_keys:
+            positions = {key: index for index, key in enumerate(self.displayed_keys)}
+            self.restoring_selection = True
+            try:
+                for key in selected_keys:
+                    if key in positions:
+                        self.cases_list.Select(positions[key])
+            finally:
+                self.restoring_selection = False
+        self.hovered_index = -1
+        self.cases_list.Refresh()
+
+    def get_selected_indexes(self):
+        indexes = []
+        index = self.cases_list.GetFirstSelected()
+        while index != -1:
+            indexes.append(index)
+            index = self.cases_list.GetNextSelected(index)
+        return indexes
+
+    def patch_cases_list(self, delta):
+        """
+        Drop the formatted values of the rows that changed, then redraw.
+        :param delta: What changed since the previous load
+        """
+        for key in delta.updated + delta.removed:
+            self.row_values.pop(key, None)
+        self.update_cases_list()
+
+    def get_active_filters(self):
+        """
+        Column -> value for every dropdown not on All. A blank value is None.
+        """
+        filters = {}
+        for key, _, blank_label in FILTER_COLUMNS:
+            selection = self.filters[key].GetStringSelection()
+            if selection and selection != "All":
+                filters[key] = None if selection == blank_label else selection
+        return filters
 
     def on_filter_changed(self, event):
         self.update_cases_list()
 
+    def on_search_cancelled(self, event):
+        self.search_box.SetValue('')
+
     def on_refresh_clicked(self, event):
-        # Reload your case data and refresh the list
+        # Reload your case data and refresh the list. A load already running is abandoned.
         self.load_cases()
 
+    def get_row_case_number(self, index):
+        """
+        Case number shown on a row of the list, or None.
+        """
+        if not 0 <= index < len(self.displayed_keys):
+            return None
+        return self.snapshot.rows[self.displayed_keys[index]].get('HDCase_HDCaseNum')
+
+    def on_case_selected(self, event):
+        # Selecting a case is a strong hint it's about to be opened. Fetch it now.
+        case_number = None if self.restoring_selection else self.get_row_case_number(event.GetIndex())
+        if case_number is not None:
+            self.prefetcher.request(case_number)
+        event.Skip()
+
+    def on_cases_list_motion(self, event):
+        # Hovering is a weaker hint. Only fetch once the pointer has settled on a row.
+        index, _ = self.cases_list.HitTest(event.GetPosition())
+        if index != self.hovered_index:
+            self.hovered_index = index
+            case_number = self.get_row_case_number(index)
+            if case_number is not None:
+                self.prefetcher.request(case_number, delay=self.prefetch_hover_delay)
+            else:
+                self.prefetcher.cancel()
+        event.Skip()
+
+    def on_cases_list_leave(self, event):
+        # The pointer left before settling. Don't fetch the row it passed over last.
+        self.hovered_index = -1
+        self.prefetcher.cancel()
+        event.Skip()
+
+    def get_selected_case_numbers(self):
+        """
+        Case numbers of the selected rows, in display order. A case listed for several tasks is only returned once.
+        """
+        case_numbers = []
+        for index in self.get_selected_indexes():
+            case_number = self.get_row_case_number(index)
+            if case_number is not None and case_number not in case_numbers:
+                case_numbers.append(case_number)
+        return case_numbers
+
+    def on_bulk_update_clicked(self, event):
+        case_numbers = self.get_selected_case_numbers()
+        if not case_numbers:
+            wx.MessageBox('Select the cases to update first', 'Update Selected', wx.OK | wx.ICON_INFORMATION)
+            return
+
+        dlg = BulkUpdateDialog(self, self.epicor_service, case_numbers)
+        dlg.ShowModal()
+        any_case_updated = dlg.any_case_updated
+        dlg.Destroy()
+
+        # Tasks and hours have moved on. Pick up the changes.
+        if any_case_updated:
+            self.load_cases()
+
+    def on_quote_clicked(self, event):
+        # Finish an interrupted batch before starting another, so no case gets two quotes
+        for journal in QuoteJournal.find_unfinished():
+            remaining = sum(1 for state in journal.states.values() if not state.is_complete)
+            message = f"A quoting batch started {format_saved_at(journal.created_at)} has {remaining} cases left. " \
+                      f"Resume it?"
+            if wx.MessageBox(message, 'Quote Selected', wx.YES_NO | wx.ICON_QUESTION) == wx.YES:
+                self.show_quote_batch(journal)
+                return
+
+        case_numbers = self.get_selected_case_numbers()
+        if not case_numbers:
+            wx.MessageBox('Select the cases to quote first', 'Quote Selected', wx.OK | wx.ICON_INFORMATION)
+            return
+        self.show_quote_batch(QuoteJournal.create(case_numbers))
+
+    def show_quote_batch(self, journal):
+        dlg = QuoteBatchDialog(self, self.epicor_service, journal)
+        dlg.ShowModal()
+        any_case_quoted = dlg.any_case_quoted
+        dlg.Destroy()
+        if any_case_quoted:
+            self.load_cases()
+
     def on_sort_by_changed(self, event):
         sort_column = self.sort_by_dropdown.GetSelection()
         self.sort_cases(sort_column)
         self.update_cases_list()
 
     def sort_cases(self, col_index):
-        column_keys = ["HDCase_HDCaseNum", "SalesRep_Name", "SalesRep1_Name", "Customer_Name", "Project_ProjectID",
-                       "HDCase_Description", "Task_TaskDescription", "Task_StartDate", "Task_DueDate",
-                       "Task_StatusCode", "HDCase_TaskSetID", "HDCase_Quantity", "ProjPhase_TotEstLbrHrs",
-                       "ProjPhase_TotActLbrHrs", "Calculated_LaborHours", "HDCase_EstimatedHrs_c",
-                       "Calculated_RemainingHours", "Calculated_DaysSinceLastComment", "HDCase_RequestDate_c",
-                       "HDCase_DevStartDate_c", "HDCase_DeliveryDate_c", "Calculated_SchedHoursRemaining",
-                       "Calculated_DaysTillDueDate"]
-        sort_key = column_keys[col_index]
-
-        self.cases.sort(key=lambda x: x.get(sort_key, '') or '')
+        # Numbers, dates and text each sort as what they are. The order is worked out once per load and column.
+        self.sort_key = CASE_COLUMN_KEYS[col_index]
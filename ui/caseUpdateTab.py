@@ -4,9 +4,21 @@ import re
 from services.epicorService import EpicorService
 from services.loggingService import LoggingService
 from services.caseService import CaseService
+from services.workflowService import Workflow, WorkflowStep, build_case_update_steps, CASE_UPDATE_UNIT_PRICE
 
 logger = LoggingService.get_logger(__name__)
 
+# Summary line for each step that worked
+STEP_SUCCESS_MESSAGES = {
+    'price': '- Hours added successfully',
+    'quote': '- Quote {result} created successfully',
+    'quote_price': '- Quote priced and marked quoted successfully',
+    'quote_attach': '- Quote attached successfully',
+    'complete': '- Task completed successfully',
+    'assign': '- Next task assigned successfully',
+    'comment': '- Case comment added successfully',
+}
+
 
 class CaseUpdateTab(wx.Panel):
     def __init__(self, parent, case_tab):
@@ -14,6 +26,8 @@ class CaseUpdateTab(wx.Panel):
         self.case_tab = case_tab
         self.epicor_service = EpicorService()
         self.case_service = CaseService()
+        self.workflow = None
+        self.step_rows = {}
         self.init_ui()
 
     def get_case_number(self):
@@ -61,6 +75,18 @@ class CaseUpdateTab(wx.Panel):
         vbox.Add(self.update_case_button, flag=wx.EXPAND | wx.ALL, border=5)
         self.update_case_button.Bind(wx.EVT_BUTTON, self.on_update_case_button_clicked)
 
+        # Progress of each step of the update
+        self.steps_list = wx.ListCtrl(self, style=wx.LC_REPORT | wx.BORDER_SUNKEN, size=(-1, 130))
+        self.steps_list.InsertColumn(0, "Step", width=220)
+        self.steps_list.InsertColumn(1, "Status", width=80)
+        self.steps_list.InsertColumn(2, "Details", width=300)
+        vbox.Add(self.steps_list, flag=wx.EXPAND | wx.ALL, border=5)
+
+        self.retry_button = wx.Button(self, label="Retry Failed Steps")
+        vbox.Add(self.retry_button, flag=wx.EXPAND | wx.ALL, border=5)
+        self.retry_button.Bind(wx.EVT_BUTTON, self.on_retry_button_clicked)
+        self.retry_button.Disable()
+
         self.SetSizer(vbox)
 
     def refresh_data(self):
@@ -86,47 +112,73 @@ class CaseUpdateTab(wx.Panel):
     def on_update_case_button_clicked(self, event):
         try:
             case_number = self.get_case_number()
+            if case_number is None:
+                wx.MessageBox('Enter a case number first', 'Error', wx.OK | wx.ICON_ERROR)
+                return
+
             quantity_str = self.quantity_text.GetValue()
-            unit_price = 215
-            hours_updated = False
-            if quantity_str:
-                quantity = float(quantity_str)
-                self.epicor_service.update_case_part_and_price(case_number, quantity, unit_price)
-                hours_updated = True
-            quote_attached = False
-            quote_number = None
-            if self.create_attach_quote_checkbox.IsChecked():
-                quote_number = self.case_service.create_and_attach_quote_to_case(case_number)
-                if quote_number:
-                    quote_attached = True
-            assign_next_to_name = self.assignee_input.GetValue()
-            task_completed = False
-            task_assigned = False
-            if self.complete_task_checkbox.IsChecked():
-                is_task_complete = self.epicor_service.complete_current_case_task(case_number)
-                if is_task_complete:
-                    task_completed = True
-                    if assign_next_to_name:
-                        assign_response = self.epicor_service.assign_current_case_task(case_number, assign_next_to_name)
-                        if assign_response:
-                            task_assigned = True
-            case_comment = self.case_comment_text.GetValue()
-            comment_added = False
-            if case_comment:
-                self.epicor_service.add_case_comment(case_number, case_comment)
-                comment_added = True
-            message = 'Case Update Summary:\n'
-            if hours_updated:
-                message += f'- Hours added successfully\n'
-            if quote_attached:
-                message += f'- Quote {quote_number} created and attached successfully\n'
-            if task_completed:
-                message += '- Task completed successfully\n'
-            if task_assigned:
-                message += '- Next task assigned successfully\n'
-            if comment_added:
-                message += '- Case comment added successfully\n'
-            wx.MessageBox(message, 'Case Update Status', wx.OK | wx.ICON_INFORMATION)
+            steps = build_case_update_steps(
+                self.epicor_service, self.case_service, case_number,
+                quantity=float(quantity_str) if quantity_str else None,
+                create_quote=self.create_attach_quote_checkbox.IsChecked(),
+                complete_task=self.complete_task_checkbox.IsChecked(),
+                assign_to=self.assignee_input.GetValue(),
+                comment=self.case_comment_text.GetValue(),
+                unit_price=CASE_UPDATE_UNIT_PRICE
+            )
+            if not steps:
+                wx.MessageBox('Nothing to update', 'Case Update Status', wx.OK | wx.ICON_INFORMATION)
+                return
+
+            self.workflow = Workflow(steps,
+                                     on_step_changed=lambda step: wx.CallAfter(self.on_step_changed, step),
+                                     on_finished=lambda workflow: wx.CallAfter(self.on_workflow_finished, workflow))
+            self.show_steps(steps)
+            self.set_running(True)
+            self.workflow.start()
         except Exception as e:
+            self.set_running(False)
             error_message = str(e) + '\n\n' + traceback.format_exc()
             wx.MessageBox(error_message, 'Error', wx.OK | wx.ICON_ERROR)
+
+    def on_retry_button_clicked(self, event):
+        if self.workflow is None or self.workflow.is_running:
+            return
+        self.set_running(True)
+        self.workflow.retry_failed()
+
+    def set_running(self, running):
+        self.update_case_button.Enable(not running)
+        self.retry_button.Enable(not running and self.workflow is not None and not self.workflow.succeeded)
+
+    def show_steps(self, steps):
+        self.steps_list.DeleteAllItems()
+        self.step_rows = {}
+        for row, step in enumerate(steps):
+            self.steps_list.InsertItem(row, step.label)
+            self.steps_list.SetItem(row, 1, step.status)
+            self.step_rows[step.name] = row
+
+    def on_step_changed(self, step: WorkflowStep):
+        row = self.step_rows.get(step.name)
+        if row is None:
+            return
+        self.steps_list.SetItem(row, 1, step.status)
+        self.steps_list.SetItem(row, 2, step.error or '')
+
+    def on_workflow_finished(self, workflow: Workflow):
+        if workflow is not self.workflow:
+            return
+        self.set_running(False)
+
+        message = 'Case Update Summary:\n'
+        for step in workflow.steps.values():
+            if step.status == 'Done':
+                message += STEP_SUCCESS_MESSAGES[step.name].format(result=step.result) + '\n'
+            elif step.status == 'Failed':
+                message += f'- {step.label} failed: {step.error}\n'
+            elif step.error:
+                message += f'- {step.label} skipped: {step.error}\n'
+
+        icon = wx.ICON_INFORMATION if workflow.succeeded else wx.ICON_WARNING
+        wx.MessageBox(message, 'Case Update Status', wx.OK | icon)
@@ -128,12 +128,10 @@ class DesignNeedTab(wx.Panel):
         return combined_files
 
     def load_design_need(self, x_file_ref_num):
-        file_content = self.epicor_service.download_file(x_file_ref_num)
-        if file_content:
-            temp_file_path = os.path.join(tempfile.gettempdir(), f"temp_{x_file_ref_num}.docx")
-            with open(temp_file_path, 'wb') as temp_file:
-                temp_file.write(file_content)
-                print(f"File written to {temp_file_path} with size {len(file_content)} bytes")
+        temp_file_path = os.path.join(tempfile.gettempdir(), f"temp_{x_file_ref_num}.docx")
+        file_size = self.epicor_service.download_file_to_path(x_file_ref_num, temp_file_path)
+        if file_size:
+            print(f"File written to {temp_file_path} with size {file_size} bytes")
 
             sections = self.doc_service.extract_all_sections_from_design_doc(temp_file_path)
             design_need = sections.get("Need", "")
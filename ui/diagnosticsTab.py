@@ -0,0 +1,89 @@
+import wx
+from services.metricsService import MetricsService
+from services.caseCacheService import CaseCache
+
+# How often the numbers refresh while the tab is open
+REFRESH_INTERVAL_MS = 2000
+
+
+def format_bytes(size):
+    if size is None:
+        return ''
+    for unit in ['B', 'KB', 'MB']:
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class DiagnosticsTab(wx.Panel):
+    def __init__(self, parent):
+        super(DiagnosticsTab, self).__init__(parent)
+        self.metrics_service = MetricsService.get_instance()
+        self.case_cache = CaseCache.get_instance()
+        self.init_ui()
+
+        self.refresh_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_refresh_timer, self.refresh_timer)
+        self.refresh_timer.Start(REFRESH_INTERVAL_MS)
+
+    def init_ui(self):
+        vbox = wx.BoxSizer(wx.VERTICAL)
+
+        # Per-endpoint numbers
+        self.metrics_list = wx.ListCtrl(self, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
+        columns = [("Endpoint", 250), ("Calls", 60), ("Errors", 60), ("Last Status", 80), ("p50 ms", 70),
+                   ("p95 ms", 70), ("p99 ms", 70), ("Avg Request", 90), ("Avg Response", 90)]
+        for i, (col, width) in enumerate(columns):
+            self.metrics_list.InsertColumn(i, col, width=width)
+        vbox.Add(self.metrics_list, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
+
+        # Case cache hit rate
+        self.cache_stats_text = wx.StaticText(self, label="")
+        vbox.Add(self.cache_stats_text, flag=wx.EXPAND | wx.ALL, border=5)
+
+        hbox = wx.BoxSizer(wx.HORIZONTAL)
+        export_button = wx.Button(self, label="Export")
+        export_button.Bind(wx.EVT_BUTTON, self.on_export_button_clicked)
+        hbox.Add(export_button, flag=wx.RIGHT, border=5)
+        reset_button = wx.Button(self, label="Reset")
+        reset_button.Bind(wx.EVT_BUTTON, self.on_reset_button_clicked)
+        hbox.Add(reset_button)
+        vbox.Add(hbox, flag=wx.ALL, border=5)
+
+        self.SetSizer(vbox)
+
+    def on_refresh_timer(self, event):
+        if self.IsShownOnScreen():
+            self.refresh_data()
+
+    def refresh_data(self):
+        rows = self.metrics_service.snapshot()
+
+        self.metrics_list.DeleteAllItems()
+        for i, row in enumerate(rows):
+            values = [row['endpoint'], str(row['calls']), str(row['errors']), str(row['last_status']),
+                      str(row['p50_ms']), str(row['p95_ms']), str(row['p99_ms']),
+                      format_bytes(row['avg_request_bytes']), format_bytes(row['avg_response_bytes'])]
+            self.metrics_list.InsertItem(i, values[0])
+            for col, value in enumerate(values[1:], 1):
+                self.metrics_list.SetItem(i, col, value)
+
+        stats = self.case_cache.stats()
+        self.cache_stats_text.SetLabel(f"Case cache: {stats['hits']} hits, {stats['misses']} misses "
+                                       f"({stats['hit_rate']:.0%}), {stats['evictions']} evictions, "
+                                       f"{stats['entries']} entries, TTL {stats['ttl']}s")
+
+    def on_export_button_clicked(self, event):
+        dlg = wx.DirDialog(self, "Export metrics to:", style=wx.DD_DEFAULT_STYLE)
+        if dlg.ShowModal() == wx.ID_OK:
+            try:
+                paths = self.metrics_service.dump(dlg.GetPath())
+                wx.MessageBox("Metrics written to:\n" + "\n".join(paths), "Export", wx.OK | wx.ICON_INFORMATION)
+            except Exception as e:
+                wx.MessageBox(f"Unable to export metrics: {e}", "Error", wx.OK | wx.ICON_ERROR)
+        dlg.Destroy()
+
+    def on_reset_button_clicked(self, event):
+        self.metrics_service.reset()
+        self.refresh_data()
@@ -4,6 +4,7 @@ import subprocess
 import shutil
 from configparser import ConfigParser
 from services.epicorService import EpicorService
+from services.downloadManagerService import DownloadManager, DownloadJob
 
 # Load configuration
 config = ConfigParser()
@@ -29,6 +30,10 @@ class DownloadTab(wx.Panel):
         super(DownloadTab, self).__init__(parent)
         self.case_tab = case_tab
         self.last_case_number = None
+        self.download_manager = DownloadManager(
+            epicor_service,
+            on_progress=lambda job: wx.CallAfter(self.on_download_progress, job),
+            on_finished=lambda jobs: wx.CallAfter(self.on_download_finished, jobs))
         self.init_ui()
         self.refresh_data()
 
@@ -50,6 +55,20 @@ class DownloadTab(wx.Panel):
         vbox.Add(self.download_button, flag=wx.EXPAND | wx.ALL, border=5)
         self.download_button.Bind(wx.EVT_BUTTON, self.on_download_button_click)
 
+        # Download progress, cancel and open-when-done
+        progress_hbox = wx.BoxSizer(wx.HORIZONTAL)
+        self.download_gauge = wx.Gauge(self, range=1000)
+        progress_hbox.Add(self.download_gauge, proportion=1, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=5)
+        self.cancel_download_button = wx.Button(self, label="Cancel")
+        self.cancel_download_button.Disable()
+        self.cancel_download_button.Bind(wx.EVT_BUTTON, self.on_cancel_download_click)
+        progress_hbox.Add(self.cancel_download_button, flag=wx.RIGHT, border=5)
+        self.open_when_done_checkbox = wx.CheckBox(self, label="Open files when finished")
+        progress_hbox.Add(self.open_when_done_checkbox, flag=wx.ALIGN_CENTER_VERTICAL)
+        vbox.Add(progress_hbox, flag=wx.EXPAND | wx.ALL, border=5)
+        self.download_status_text = wx.StaticText(self, label="")
+        vbox.Add(self.download_status_text, flag=wx.EXPAND | wx.LEFT | wx.RIGHT, border=5)
+
         # 'Create Design Doc' button
         self.create_design_doc_button = wx.Button(self, label="Create Design Doc")
         vbox.Add(self.create_design_doc_button, flag=wx.EXPAND | wx.ALL, border=5)
@@ -79,7 +98,7 @@ class DownloadTab(wx.Panel):
     def populate_attachments_list(self, attachments):
         self.attachments.ClearAll()
 
-        cols = list(['FileName', 'DocTypeID', 'XFileRefNum'])
+        cols = list(['FileName', 'DocTypeID', 'XFileRefNum', 'Status'])
         col_width = wx.LIST_AUTOSIZE_USEHEADER
 
         for i in range(0, len(cols)):
@@ -100,17 +119,87 @@ class DownloadTab(wx.Panel):
 
     def on_download_button_click(self, event):
         """
-        Download button clicked. Download all attachments.
+        Download button clicked. Download all supporting attachments in the background.
         :param event:
         :return:
         """
+        if self.download_manager.is_running:
+            return
+
+        case_num = self.get_case_number()
+        if not case_num:
+            wx.MessageBox('No case number selected')
+            return
+        case_folder_path = os.path.join(DOC_PATH, str(case_num))
+
+        jobs = []
+        reserved_names = set()
         for i in range(0, self.attachments.GetItemCount()):
             # Only download 'Supporting' docs or uncategorized.
             # We don't want to download things that have already been sent out, sign-offs, etc.
             doc_type_id = self.attachments.GetItem(i, 1).GetText()
-            print(doc_type_id)
             if doc_type_id == '' or doc_type_id == 'Supp':
-                self.download_file_by_list_index(i)
+                # Renaming asks the user, so settle every file name here on the UI thread before starting
+                filename = self.attachments.GetItem(i, 0).GetText()
+                filename = self.ask_to_rename_design_docs(case_folder_path, filename, case_num, reserved_names)
+                reserved_names.add(filename)
+                xFileRefNum = int(self.attachments.GetItem(i, 2).GetText())
+                jobs.append(DownloadJob(case_num, filename, xFileRefNum, row=i))
+                self.attachments.SetItem(i, 3, 'Queued')
+
+        if not jobs:
+            wx.MessageBox('No supporting documents to download')
+            return
+
+        self.download_button.Disable()
+        self.cancel_download_button.Enable()
+        self.download_gauge.SetValue(0)
+        self.download_status_text.SetLabel(f"Downloading {len(jobs)} files...")
+        self.download_manager.start(jobs)
+
+    def on_cancel_download_click(self, event):
+        self.download_manager.cancel()
+        self.download_status_text.SetLabel("Cancelling...")
+
+    def on_download_progress(self, job):
+        """
+        Update the file's row and the overall gauge. Runs on the UI thread.
+        :param job: Job that changed
+        """
+        if job.case_number == self.last_case_number and job.row is not None \
+                and job.row < self.attachments.GetItemCount():
+            status = f"{int(job.fraction * 100)}%" if job.status == 'Downloading' else job.status
+            self.attachments.SetItem(job.row, 3, status)
+
+        self.download_gauge.SetValue(int(self.download_manager.overall_fraction * 1000))
+
+    def on_download_finished(self, jobs):
+        """
+        Report the batch result and open the files if asked. Runs on the UI thread.
+        :param jobs: Every job in the batch
+        """
+        self.download_button.Enable()
+        self.cancel_download_button.Disable()
+
+        done = [job for job in jobs if job.status == 'Done']
+        failed = [job for job in jobs if job.status == 'Failed']
+        cancelled = [job for job in jobs if job.status == 'Cancelled']
+
+        summary = f"{len(done)} downloaded"
+        if failed:
+            summary += f", {len(failed)} failed"
+        if cancelled:
+            summary += f", {len(cancelled)} cancelled"
+        self.download_status_text.SetLabel(summary)
+
+        if failed:
+            details = '\n'.join(f"- {job.filename}: {job.error}" for job in failed)
+            wx.MessageBox(f"Some files could not be downloaded:\n{details}", 'Download Errors',
+                          wx.OK | wx.ICON_WARNING)
+
+        if self.open_when_done_checkbox.IsChecked():
+            for job in done:
+                open_file(job.path)
 
     def on_activate_list_item(self, event):
         """
@@ -135,20 +224,19 @@ class DownloadTab(wx.Panel):
         # If this looks like a design doc, ask the user if the want to up the revision. V1, V2, etc
         filename = self.ask_to_rename_design_docs(case_folder_path, filename, case_num)
 
-        content = epicor_service.download_file_by_xRefNum(xFileRefNum)
-        if content:
-            file_path = epicor_service.save_attachment(case_num, filename, content)
-            if file_path:
-                open_file(file_path)
+        file_path = epicor_service.download_attachment(case_num, filename, xFileRefNum)
+        if file_path:
+            open_file(file_path)
         else:
             print(f"No content to write for: {filename}")
 
-    def ask_to_rename_design_docs(self, case_folder_path, filename, case_num):
+    def ask_to_rename_design_docs(self, case_folder_path, filename, case_num, reserved_names=()):
         """
         See if we have existing design docs. If this looks like a design doc, ask to rename it as the next version.
         :param case_folder_path: Path to the case folder
         :param filename: File we're downloading
         :param case_num: Case number
+        :param reserved_names: Names already claimed by downloads that haven't landed on disk yet
         :return: Chosen file name.
         """
 
@@ -163,7 +251,8 @@ class DownloadTab(wx.Panel):
         proposed_design_file_name = f"Design - Case {case_num} V{design_version}.docx"
 
         # Let's start with V1 and find the next revision.
-        while os.path.exists(os.path.join(case_folder_path, proposed_design_file_name)):
+        while os.path.exists(os.path.join(case_folder_path, proposed_design_file_name)) \
+                or proposed_design_file_name in reserved_names:
             design_version += 1
             proposed_design_file_name = f"Design - Case {case_num} V{design_version}.docx"
 
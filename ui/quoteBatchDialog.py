@@ -0,0 +1,98 @@
+import wx
+from services.quoteBatchService import QuoteBatch, QuoteBatchResult, QuoteJournal
+
+
+class QuoteBatchDialog(wx.Dialog):
+    def __init__(self, parent, epicor_service, journal: QuoteJournal):
+        super(QuoteBatchDialog, self).__init__(parent, title=f"Quote {len(journal.case_numbers)} Cases",
+                                               size=(700, 450), style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.journal = journal
+        self.quote_batch = QuoteBatch(epicor_service, journal,
+                                      on_case_changed=lambda result: wx.CallAfter(self.on_case_changed, result),
+                                      on_finished=lambda results: wx.CallAfter(self.on_batch_finished, results))
+        self.any_case_quoted = False
+
+        vbox = wx.BoxSizer(wx.VERTICAL)
+
+        # Result per case
+        self.results_list = wx.ListCtrl(self, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
+        self.results_list.InsertColumn(0, "Case", width=80)
+        self.results_list.InsertColumn(1, "Quote", width=80)
+        self.results_list.InsertColumn(2, "Status", width=80)
+        self.results_list.InsertColumn(3, "Details", width=420)
+        for result in self.quote_batch.results:
+            self.results_list.InsertItem(result.row, str(result.case_number))
+            self.set_result_row(result)
+        vbox.Add(self.results_list, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
+
+        self.status_text = wx.StaticText(self, label="")
+        vbox.Add(self.status_text, flag=wx.EXPAND | wx.ALL, border=5)
+
+        hbox = wx.BoxSizer(wx.HORIZONTAL)
+        resuming = any(state.steps or state.intents for state in journal.states.values())
+        self.run_button = wx.Button(self, label="Resume Quoting" if resuming else "Quote Cases")
+        self.run_button.Bind(wx.EVT_BUTTON, self.on_run_button_clicked)
+        hbox.Add(self.run_button)
+        self.cancel_button = wx.Button(self, label="Cancel")
+        self.cancel_button.Bind(wx.EVT_BUTTON, self.on_cancel_button_clicked)
+        self.cancel_button.Disable()
+        hbox.Add(self.cancel_button, flag=wx.LEFT, border=5)
+        self.forget_button = wx.Button(self, label="Forget Batch")
+        self.forget_button.Bind(wx.EVT_BUTTON, self.on_forget_button_clicked)
+        hbox.Add(self.forget_button, flag=wx.LEFT, border=5)
+        self.close_button = wx.Button(self, wx.ID_CLOSE, label="Close")
+        self.close_button.Bind(wx.EVT_BUTTON, self.on_close)
+        hbox.Add(self.close_button, flag=wx.LEFT, border=5)
+        vbox.Add(hbox, flag=wx.ALIGN_CENTER | wx.TOP | wx.BOTTOM, border=10)
+
+        self.SetSizer(vbox)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+    def set_result_row(self, result: QuoteBatchResult):
+        self.results_list.SetItem(result.row, 1, str(result.state.quote_number or ''))
+        self.results_list.SetItem(result.row, 2, result.status)
+        self.results_list.SetItem(result.row, 3, result.details)
+
+    def on_run_button_clicked(self, event):
+        self.run_button.Disable()
+        self.forget_button.Disable()
+        self.cancel_button.Enable()
+        self.status_text.SetLabel("Quoting...")
+        self.quote_batch.start()
+
+    def on_cancel_button_clicked(self, event):
+        self.quote_batch.cancel()
+        self.status_text.SetLabel("Cancelling. Cases already running stop after their current step...")
+
+    def on_forget_button_clicked(self, event):
+        message = ("Stop offering to resume this batch? Cases that weren't quoted will have to be quoted again, and "
+                   "cases marked Check need looking at by hand.")
+        if wx.MessageBox(message, 'Forget Batch', wx.YES_NO | wx.ICON_QUESTION) == wx.YES:
+            self.journal.archive()
+            self.EndModal(wx.ID_CLOSE)
+
+    def on_case_changed(self, result: QuoteBatchResult):
+        self.set_result_row(result)
+        if result.status == 'Done':
+            self.any_case_quoted = True
+
+    def on_batch_finished(self, results):
+        self.cancel_button.Disable()
+        counts = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        self.status_text.SetLabel(', '.join(f"{count} {status.lower()}" for status, count in counts.items()))
+
+        if not self.journal.is_complete:
+            self.forget_button.Enable()
+            retryable = sum(count for status, count in counts.items() if status not in ('Done', 'Check'))
+            if retryable:
+                self.run_button.SetLabel(f"Retry {retryable} Cases")
+                self.run_button.Enable()
+
+    def on_close(self, event):
+        if self.quote_batch.is_running:
+            wx.MessageBox('Wait for the running cases to finish, or cancel first', 'Quote Cases',
+                          wx.OK | wx.ICON_INFORMATION)
+            return
+        self.EndModal(wx.ID_CLOSE)
@@ -103,8 +103,8 @@ class SettingsTab(wx.Panel):
         # Check configuration variables
         check_config_vars(config_vars)
 
-        # Save configuration
-        self.config['DEFAULT'] = config_vars
+        # Save configuration. Update rather than replace so advanced keys set by hand (HTTP_POOL_*, etc.) survive
+        self.config['DEFAULT'].update(config_vars)
         self.config['DEFAULT']['ALWAYS_ON_TOP'] = str(self.ALWAYS_ON_TOP.GetValue())  # Save the state of the checkbox
 
         with open(os.path.expanduser('~/.myapp.cfg'), 'w') as configfile:
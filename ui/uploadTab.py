@@ -2,9 +2,10 @@ import sys
 import subprocess
 import wx
 import os
-import base64
 from configparser import ConfigParser
 from services.epicorService import EpicorService
+from services.uploadBatchService import UploadBatch, UploadFileResult
+from services.uploadManifestService import UploadManifest
 
 # Load configuration
 config = ConfigParser()
@@ -16,25 +17,11 @@ DOC_PATH = config.get('DEFAULT', 'DOC_PATH', fallback=None)
 epicor_service = EpicorService()
 
 
-def handle_upload_response(response):
-    if response is not None:
-        if response.status_code == 200:
-            wx.MessageBox('File uploaded successfully!', 'Success', wx.OK | wx.ICON_INFORMATION)
-        else:
-            # This will handle cases like 400, 403, 500, etc.
-            wx.MessageBox(f'Failed to upload file. Server responded with: {response.status_code}', 'Error',
-                          wx.OK | wx.ICON_ERROR)
-
-        print('Response HTTP Status Code:', response.status_code)
-        print('Response HTTP Response Body:', response.content)
-    else:
-        wx.MessageBox('HTTP Request failed', 'Error', wx.OK | wx.ICON_ERROR)
-
-
 class UploadTab(wx.Panel):
     def __init__(self, parent, case_tab):
         super(UploadTab, self).__init__(parent)
         self.case_tab = case_tab
+        self.upload_batch = None
         self.init_ui()
         self.refresh_data()
 
@@ -44,17 +31,25 @@ class UploadTab(wx.Panel):
         self.files_list = wx.ListCtrl(self, style=wx.LC_REPORT)
         vbox.Add(self.files_list, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
 
-        self.files_list.InsertColumn(0, 'Files')
-        self.files_list.SetColumnWidth(0, 350)
+        self.insert_columns()
 
-        upload_button = wx.Button(self, label="Upload")
-        vbox.Add(upload_button, flag=wx.EXPAND | wx.ALL, border=5)
+        self.status_text = wx.StaticText(self, label="")
+        vbox.Add(self.status_text, flag=wx.EXPAND | wx.ALL, border=5)
+
+        self.upload_button = wx.Button(self, label="Upload")
+        vbox.Add(self.upload_button, flag=wx.EXPAND | wx.ALL, border=5)
 
         self.SetSizer(vbox)
 
-        upload_button.Bind(wx.EVT_BUTTON, self.on_upload_button_clicked)
+        self.upload_button.Bind(wx.EVT_BUTTON, self.on_upload_button_clicked)
         self.files_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_file_double_clicked)  # Bind the double-click event
 
+    def insert_columns(self):
+        self.files_list.InsertColumn(0, 'Files')
+        self.files_list.SetColumnWidth(0, 350)
+        self.files_list.InsertColumn(1, 'Upload', width=90)
+        self.files_list.InsertColumn(2, 'Details', width=300)
+
     def get_case_number(self):
         case_number_str = self.case_tab.get_case_number()
         if not case_number_str:  # Add this check
@@ -81,41 +76,86 @@ class UploadTab(wx.Panel):
         files = os.listdir(case_folder_path)
         print(files)
         self.files_list.ClearAll()
-        self.files_list.InsertColumn(0, 'Files')
-        self.files_list.SetColumnWidth(0, 350)
+        self.insert_columns()
         for i, file in enumerate(files):
             self.files_list.InsertItem(i, file)
 
     def on_upload_button_clicked(self, event):
-        selected_index = self.files_list.GetFirstSelected()
-        if selected_index == -1:
+        if self.upload_batch is not None and self.upload_batch.is_running:
+            wx.MessageBox('Wait for the running upload to finish', 'Upload', wx.OK | wx.ICON_INFORMATION)
+            return
+
+        rows = []
+        index = self.files_list.GetFirstSelected()
+        while index != -1:
+            rows.append(index)
+            index = self.files_list.GetNextSelected(index)
+        if not rows:
             wx.MessageBox('No file selected')
             return
 
-        file_name = self.files_list.GetItem(selected_index, 0).GetText()
+        case_num = self.get_case_number()
+        if case_num is None:
+            wx.MessageBox("Case number is not valid.", "Error")
+            return
 
-        doc_type = self.get_document_type()
-        if doc_type:
-            self.upload_document(file_name, doc_type)
+        # One doc type for everything selected
+        doc_type = self.get_document_type(len(rows))
+        if not doc_type:
+            return
 
-    def get_document_type(self):
-        doc_type_dialog = wx.SingleChoiceDialog(self, "What type of document is this?", "Document Type",
-                                                ["Design Doc", "Supporting Doc"])
+        case_folder_path = os.path.join(DOC_PATH, str(case_num))
+        paths = [os.path.join(case_folder_path, self.files_list.GetItemText(row)) for row in rows]
+        try:
+            self.upload_batch = UploadBatch(
+                epicor_service, case_num, paths, doc_type, manifest=UploadManifest.get_instance(),
+                on_file_changed=lambda result: wx.CallAfter(self.on_file_changed, rows, result),
+                on_finished=lambda results: wx.CallAfter(self.on_upload_finished, results)
+            )
+        except OSError as e:
+            wx.MessageBox(f"Unable to read file: {e}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        self.upload_button.Disable()
+        self.status_text.SetLabel(f"Uploading {len(rows)} files...")
+        self.upload_batch.start()
+
+    def on_file_changed(self, rows, result: UploadFileResult):
+        row = rows[result.row]
+        if row < self.files_list.GetItemCount():
+            self.files_list.SetItem(row, 1, result.status)
+            self.files_list.SetItem(row, 2, result.details)
+
+    def on_upload_finished(self, results):
+        self.upload_button.Enable()
+        counts = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        summary = ', '.join(f"{count} {status.lower()}" for status, count in counts.items())
+        self.status_text.SetLabel(summary)
+
+        failed = [result for result in results if result.status == 'Failed']
+        skipped = [result for result in results if result.status == 'Skipped']
+        skipped_details = '\n'.join(f"{result.file_name}: {result.details}" for result in skipped)
+        if failed:
+            details = '\n'.join(f"{result.file_name}: {result.error}" for result in failed)
+            if skipped:
+                details += f"\n\nSkipped as duplicates:\n{skipped_details}"
+            wx.MessageBox(f'Some files were not uploaded ({summary}):\n\n{details}', 'Error', wx.OK | wx.ICON_ERROR)
+        elif skipped:
+            uploaded = len(results) - len(skipped)
+            wx.MessageBox(f'{uploaded} files uploaded. {len(skipped)} skipped as duplicates:\n\n'
+                          f'{skipped_details}', 'Success', wx.OK | wx.ICON_INFORMATION)
+        else:
+            wx.MessageBox(f'{len(results)} files uploaded successfully!', 'Success', wx.OK | wx.ICON_INFORMATION)
+
+    def get_document_type(self, file_count=1):
+        question = "What type of document is this?" if file_count == 1 else \
+            f"What type of documents are these {file_count} files?"
+        doc_type_dialog = wx.SingleChoiceDialog(self, question, "Document Type", ["Design Doc", "Supporting Doc"])
         if doc_type_dialog.ShowModal() == wx.ID_OK:
             choice = doc_type_dialog.GetStringSelection()
             return "OGDocs" if choice == "Design Doc" else "Supp"
 
-    def upload_document(self, file_name, doc_type):
-        case_num = self.get_case_number()
-        case_folder_path = os.path.join(DOC_PATH, str(case_num))
-        file_path = os.path.join(case_folder_path, file_name)
-
-        with open(file_path, 'rb') as f:
-            encoded_content = base64.b64encode(f.read()).decode('utf-8')
-
-        handle_upload_response(
-            epicor_service.upload_document_logic(case_num, file_name, doc_type, encoded_content))
-
     def on_file_double_clicked(self, event):
         # New event handler for double-click
         selected_index = event.GetIndex()